@@ -0,0 +1,56 @@
+"""
+Cached lookup of a school's current academic year.
+
+Almost every teacher-facing request filters by the current year, so the
+year is cached per school. The cache is cleared from the AcademicYear
+post_save/post_delete signals whenever a year that is (or was) current
+changes.
+
+The clear only reaches every process through a shared cache (CACHE_URL).
+With the per-process fallback cache, other processes keep the old year
+until it expires, so it is only cached for a few seconds there.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import AcademicYear
+
+
+CURRENT_YEAR_CACHE_TIMEOUT = 60 * 60  # 1 hour
+LOCAL_CURRENT_YEAR_CACHE_TIMEOUT = 10  # seconds, without a shared cache
+
+# Cached when a school has no current year, since None means a cache miss
+NO_CURRENT_YEAR = 'none'
+
+
+def _cache_key(school_id):
+    return f'current_academic_year:{school_id}'
+
+
+def _cache_timeout():
+    return CURRENT_YEAR_CACHE_TIMEOUT if settings.CACHE_URL else LOCAL_CURRENT_YEAR_CACHE_TIMEOUT
+
+
+def get_current_academic_year(school):
+    """
+    Return the current AcademicYear of a school, or None.
+    
+    Args:
+        school: School instance or ID
+    """
+    school_id = getattr(school, 'pk', school)
+    year = cache.get(_cache_key(school_id))
+    if year is None:
+        year = AcademicYear.objects.filter(school_id=school_id, is_current=True).first()
+        cache.set(_cache_key(school_id), year or NO_CURRENT_YEAR, _cache_timeout())
+    return None if year == NO_CURRENT_YEAR else year
+
+
+def clear_current_academic_year(school_id):
+    """
+    Drop a school's cached current year now and again once the surrounding
+    transaction commits, so a concurrent request cannot re-cache the old row.
+    """
+    cache.delete(_cache_key(school_id))
+    transaction.on_commit(lambda: cache.delete(_cache_key(school_id)))
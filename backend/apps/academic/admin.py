@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     AcademicYear, Class, Section, Subject,
-    Teacher, ClassTeacher, SubjectTeacher, Student
+    Teacher, ClassTeacher, SubjectTeacher, Student, ImportJob, MaterialUpload
 )
 
 
@@ -53,3 +53,16 @@ class StudentAdmin(admin.ModelAdmin):
     list_display = ['user', 'admission_number', 'current_class', 'current_section', 'status']
     list_filter = ['school', 'current_class', 'status']
     search_fields = ['user__first_name', 'user__last_name', 'admission_number']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'school', 'import_type', 'status', 'valid_count', 'committed_rows', 'created_at']
+    list_filter = ['import_type', 'status']
+    exclude = ['valid_rows', 'invalid_rows']
+
+
+@admin.register(MaterialUpload)
+class MaterialUploadAdmin(admin.ModelAdmin):
+    list_display = ['id', 'school', 'file_name', 'status', 'received_bytes', 'total_size', 'created_at']
+    list_filter = ['status']
@@ -0,0 +1,230 @@
+"""
+Utility functions for bulk class teacher and subject teacher assignment.
+
+A whole assignment matrix for an academic year is validated in memory
+against one snapshot of the school's sections, subjects, teachers and
+existing assignments, then written in a single transaction with bulk
+operations, so the number of queries does not grow with the matrix.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import ClassTeacher, Section, Subject, SubjectTeacher, Teacher
+
+
+class AssignmentError(ValueError):
+    """Raised when an assignment matrix has conflicts; errors lists them per row."""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} assignments could not be saved.')
+        self.errors = errors
+
+
+def _load_snapshot(school, academic_year):
+    sections = {
+        s.id: s for s in Section.objects.filter(school_class__school=school).select_related('school_class')
+    }
+    subjects = {s.id: s for s in Subject.objects.filter(school=school)}
+    subject_classes = defaultdict(set)
+    for subject_id, class_id in Subject.classes.through.objects.filter(
+        subject__school=school
+    ).values_list('subject_id', 'class_id'):
+        subject_classes[subject_id].add(class_id)
+    teachers = {
+        teacher_id: f'{first_name} {last_name}'.strip()
+        for teacher_id, first_name, last_name in Teacher.objects.filter(
+            school=school, user__is_active=True
+        ).values_list('id', 'user__first_name', 'user__last_name')
+    }
+    subject_teachers = {
+        (st.section_id, st.subject_id): st
+        for st in SubjectTeacher.objects.filter(section__school_class__school=school, academic_year=academic_year)
+    }
+    class_teachers = {
+        ct.section_id: ct
+        for ct in ClassTeacher.objects.filter(section__school_class__school=school)
+    }
+    return {
+        'sections': sections,
+        'subjects': subjects,
+        'subject_classes': subject_classes,
+        'teachers': teachers,
+        'subject_teachers': subject_teachers,
+        'class_teachers': class_teachers,
+    }
+
+
+def _validate_subject_teachers(rows, snapshot, errors):
+    seen = set()
+    for index, row in enumerate(rows):
+        section = snapshot['sections'].get(row['section'])
+        subject = snapshot['subjects'].get(row['subject'])
+        row_errors = []
+        if section is None:
+            row_errors.append(f"Section {row['section']} not found.")
+        if subject is None:
+            row_errors.append(f"Subject {row['subject']} not found.")
+        if row['teacher'] not in snapshot['teachers']:
+            row_errors.append(f"Teacher {row['teacher']} not found or inactive.")
+        if section and subject:
+            taught_in = snapshot['subject_classes'][subject.id]
+            if taught_in and section.school_class_id not in taught_in:
+                row_errors.append(f'{subject.name} is not taught in {section.school_class.name}.')
+            if (section.id, subject.id) in seen:
+                row_errors.append(f'{subject.name} is assigned more than once for {section}.')
+            seen.add((section.id, subject.id))
+        for error in row_errors:
+            errors.append({'type': 'subject_teachers', 'row': index, 'error': error})
+
+
+def _validate_class_teachers(rows, snapshot, academic_year, errors):
+    # Final state after applying the rows: section -> (teacher, year)
+    final = {
+        section_id: (ct.teacher_id, ct.academic_year_id)
+        for section_id, ct in snapshot['class_teachers'].items()
+    }
+    seen_sections = set()
+    for index, row in enumerate(rows):
+        row_errors = []
+        if row['section'] not in snapshot['sections']:
+            row_errors.append(f"Section {row['section']} not found.")
+        if row['teacher'] not in snapshot['teachers']:
+            row_errors.append(f"Teacher {row['teacher']} not found or inactive.")
+        if row['section'] in seen_sections:
+            row_errors.append(f"Section {row['section']} is assigned more than once.")
+        seen_sections.add(row['section'])
+        final[row['section']] = (row['teacher'], academic_year.id)
+        for error in row_errors:
+            errors.append({'type': 'class_teachers', 'row': index, 'error': error})
+
+    # One class teacher per teacher per year, including swaps within the rows
+    sections_by_teacher = defaultdict(list)
+    for section_id, (teacher_id, year_id) in final.items():
+        if year_id == academic_year.id:
+            sections_by_teacher[teacher_id].append(section_id)
+    for index, row in enumerate(rows):
+        if row['teacher'] in snapshot['teachers'] and len(sections_by_teacher[row['teacher']]) > 1:
+            errors.append({
+                'type': 'class_teachers',
+                'row': index,
+                'error': f"{snapshot['teachers'][row['teacher']]} would be class teacher "
+                         f"of more than one section."
+            })
+
+
+def bulk_assign(school, academic_year, subject_teachers=(), class_teachers=()):
+    """
+    Apply an assignment matrix for an academic year in one transaction.
+
+    Subject teacher rows are {section, subject, teacher}; an existing
+    (section, subject) assignment for the year gets the new teacher. Class
+    teacher rows are {section, teacher}; a section keeps one class teacher
+    record, which is moved to this year and teacher.
+
+    Args:
+        school: School instance
+        academic_year: AcademicYear instance
+        subject_teachers: List of subject teacher rows (IDs)
+        class_teachers: List of class teacher rows (IDs)
+
+    Returns:
+        dict with created/updated/unchanged counts per assignment type
+
+    Raises:
+        AssignmentError: if any row conflicts; nothing is saved
+    """
+    snapshot = _load_snapshot(school, academic_year)
+    errors = []
+    _validate_subject_teachers(subject_teachers, snapshot, errors)
+    _validate_class_teachers(class_teachers, snapshot, academic_year, errors)
+    if errors:
+        raise AssignmentError(errors)
+
+    st_create, st_update, st_unchanged = [], [], 0
+    for row in subject_teachers:
+        existing = snapshot['subject_teachers'].get((row['section'], row['subject']))
+        if existing is None:
+            st_create.append(SubjectTeacher(
+                section_id=row['section'], subject_id=row['subject'],
+                teacher_id=row['teacher'], academic_year=academic_year
+            ))
+        elif existing.teacher_id != row['teacher']:
+            existing.teacher_id = row['teacher']
+            st_update.append(existing)
+        else:
+            st_unchanged += 1
+
+    ct_replace, ct_unchanged, ct_updated = [], 0, 0
+    for row in class_teachers:
+        existing = snapshot['class_teachers'].get(row['section'])
+        if existing and existing.teacher_id == row['teacher'] and existing.academic_year_id == academic_year.id:
+            ct_unchanged += 1
+            continue
+        ct_updated += bool(existing)
+        ct_replace.append(ClassTeacher(
+            section_id=row['section'], teacher_id=row['teacher'], academic_year=academic_year
+        ))
+
+    with transaction.atomic():
+        SubjectTeacher.objects.bulk_create(st_create)
+        SubjectTeacher.objects.bulk_update(st_update, ['teacher'])
+        # Replace whole rows so swapping teachers between sections never
+        # trips the one-section-per-teacher constraint halfway through
+        ClassTeacher.objects.filter(section_id__in=[ct.section_id for ct in ct_replace]).delete()
+        ClassTeacher.objects.bulk_create(ct_replace)
+
+    return {
+        'academic_year': academic_year.name,
+        'subject_teachers': {
+            'created': len(st_create), 'updated': len(st_update), 'unchanged': st_unchanged
+        },
+        'class_teachers': {
+            'created': len(ct_replace) - ct_updated, 'updated': ct_updated, 'unchanged': ct_unchanged
+        },
+    }
+
+
+def copy_assignments(school, from_year, to_year):
+    """
+    Copy a year's assignments forward to another year.
+
+    Subject assignments are copied for every (section, subject) that has
+    no assignment in to_year yet. A section has a single class teacher
+    record, so class teachers of from_year are moved to to_year. Teachers
+    who are no longer active are skipped.
+
+    Returns:
+        dict as returned by bulk_assign, plus skipped counts
+    """
+    active_teachers = set(
+        Teacher.objects.filter(school=school, user__is_active=True).values_list('id', flat=True)
+    )
+    assigned = set(
+        SubjectTeacher.objects.filter(
+            section__school_class__school=school, academic_year=to_year
+        ).values_list('section_id', 'subject_id')
+    )
+
+    subject_teachers, skipped_subject = [], 0
+    for section_id, subject_id, teacher_id in SubjectTeacher.objects.filter(
+        section__school_class__school=school, academic_year=from_year
+    ).values_list('section_id', 'subject_id', 'teacher_id'):
+        if (section_id, subject_id) in assigned or teacher_id not in active_teachers:
+            skipped_subject += 1
+            continue
+        subject_teachers.append({'section': section_id, 'subject': subject_id, 'teacher': teacher_id})
+
+    class_teachers, skipped_class = [], 0
+    for section_id, teacher_id in ClassTeacher.objects.filter(
+        section__school_class__school=school, academic_year=from_year
+    ).values_list('section_id', 'teacher_id'):
+        if teacher_id not in active_teachers:
+            skipped_class += 1
+            continue
+        class_teachers.append({'section': section_id, 'teacher': teacher_id})
+
+    summary = bulk_assign(school, to_year, subject_teachers, class_teachers)
+    summary['subject_teachers']['skipped'] = skipped_subject
+    summary['class_teachers']['skipped'] = skipped_class
+    return summary
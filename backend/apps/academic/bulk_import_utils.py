@@ -3,13 +3,27 @@ Utility functions for bulk student import.
 """
 import csv
 import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils.dateparse import parse_date
 
 from .models import Class, Section, Student
+from .search_utils import student_search_text
 
 User = get_user_model()
 
+# Rows inserted per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Below this many passwords a process pool costs more than it saves
+MIN_PARALLEL_HASHES = 16
+
 
 REQUIRED_COLUMNS = [
     'admission_number', 'first_name', 'last_name', 'class', 'section',
@@ -19,38 +33,23 @@ REQUIRED_COLUMNS = [
 OPTIONAL_COLUMNS = ['parent_email', 'address', 'roll_number']
 
 
-def parse_csv_file(file_content, school):
-    """
-    Parse CSV file and validate each row.
-    Returns dict with valid_rows and invalid_rows.
+def validate_student_rows(rows, school):
     """
-    valid_rows = []
-    invalid_rows = []
-    
-    # Decode if bytes
-    if isinstance(file_content, bytes):
-        file_content = file_content.decode('utf-8-sig')
-    
-    # Parse CSV
-    reader = csv.DictReader(io.StringIO(file_content))
-    
-    # Validate headers
-    headers = reader.fieldnames or []
-    missing_headers = [col for col in REQUIRED_COLUMNS if col not in headers]
-    if missing_headers:
-        return {
-            'error': f"Missing required columns: {', '.join(missing_headers)}",
-            'valid_rows': [],
-            'invalid_rows': []
-        }
+    Validate import rows one at a time.
     
+    Args:
+        rows: Iterable of (row_number, dict) pairs from open_import_file
+        school: School the students are imported into
+    
+    Yields:
+        Row dicts with 'errors' for invalid rows or 'resolved' for valid ones
+    """
     # Cache classes and sections for this school
     classes_cache = {c.name.lower(): c for c in Class.objects.filter(school=school)}
     sections_cache = {}
-    for cls in classes_cache.values():
-        for section in cls.sections.all():
-            key = f"{cls.name.lower()}_{section.name.lower()}"
-            sections_cache[key] = section
+    for section in Section.objects.filter(school_class__school=school).select_related('school_class'):
+        key = f"{section.school_class.name.lower()}_{section.name.lower()}"
+        sections_cache[key] = section
     
     # Get existing admission numbers
     existing_admissions = set(
@@ -60,7 +59,7 @@ def parse_csv_file(file_content, school):
     # Track admission numbers in this batch to detect duplicates
     batch_admissions = set()
     
-    for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
+    for row_num, row in rows:
         errors = []
         
         # Strip whitespace from all values
@@ -73,11 +72,11 @@ def parse_csv_file(file_content, school):
         
         # Skip further validation if basic fields missing
         if errors:
-            invalid_rows.append({
+            yield {
                 'row_number': row_num,
                 'data': row,
                 'errors': errors
-            })
+            }
             continue
         
         # Validate admission number uniqueness
@@ -105,8 +104,7 @@ def parse_csv_file(file_content, school):
         # Validate date of birth
         dob = row['date_of_birth']
         try:
-            parsed_dob = datetime.strptime(dob, '%Y-%m-%d').date()
-            row['date_of_birth_parsed'] = parsed_dob
+            datetime.strptime(dob, '%Y-%m-%d')
         except ValueError:
             errors.append("Date of birth must be in YYYY-MM-DD format")
         
@@ -119,91 +117,151 @@ def parse_csv_file(file_content, school):
                 errors.append("Parent phone must be exactly 10 digits")
         
         if errors:
-            invalid_rows.append({
+            yield {
                 'row_number': row_num,
                 'data': row,
                 'errors': errors
-            })
+            }
         else:
-            # Add resolved references
-            row['class_obj'] = classes_cache[class_name]
-            row['section_obj'] = sections_cache[section_key]
-            row['gender_normalized'] = gender
             batch_admissions.add(admission)
-            valid_rows.append({
+            yield {
                 'row_number': row_num,
-                'data': row
-            })
+                'data': row,
+                # Resolved references, JSON-safe so rows can be stored on an ImportJob
+                'resolved': {
+                    'class_id': classes_cache[class_name].id,
+                    'section_id': sections_cache[section_key].id,
+                    'gender': gender,
+                    'date_of_birth': dob
+                }
+            }
+
+
+def _init_hasher_process():
+    # Worker processes started with 'spawn' need Django configured
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords):
+    """
+    Hash passwords in parallel.
     
-    return {
-        'valid_rows': valid_rows,
-        'invalid_rows': invalid_rows
-    }
+    PBKDF2 dominates import time, so the work is spread across a process
+    pool. Falls back to threads (hashlib releases the GIL) when running in
+    a daemonic process such as a Celery prefork worker, and hashes inline
+    for small batches or single-core hosts.
+    """
+    passwords = list(passwords)
+    workers = getattr(settings, 'IMPORT_HASH_WORKERS', None) or os.cpu_count() or 1
+    workers = min(workers, len(passwords))
+    if workers <= 1 or len(passwords) < MIN_PARALLEL_HASHES:
+        return [make_password(password) for password in passwords]
+    
+    chunksize = max(1, len(passwords) // (workers * 4))
+    if multiprocessing.current_process().daemon:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(make_password, passwords))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hasher_process) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def _student_email(row, row_num, school, taken_emails):
+    """Email generated from the admission number, made unique if already taken."""
+    admission = row['admission_number'].lower().replace(' ', '')
+    email = f"{admission}@{school.code.lower()}.student"
+    if email in taken_emails:
+        email = f"{admission}_{row_num}@{school.code.lower()}.student"
+    return email
+
+
+def _build_student(row_info, user, school):
+    row = row_info['data']
+    resolved = row_info['resolved']
+    return Student(
+        user=user,
+        school=school,
+        admission_number=row['admission_number'],
+        current_class_id=resolved['class_id'],
+        current_section_id=resolved['section_id'],
+        date_of_birth=parse_date(resolved['date_of_birth']),
+        gender=resolved['gender'],
+        parent_name=row['parent_name'],
+        parent_phone=row['parent_phone'],
+        parent_email=row.get('parent_email', ''),
+        address=row.get('address', ''),
+        # bulk_create skips Student.save
+        search_text=student_search_text(
+            user.first_name, user.last_name, row['admission_number'], row['parent_phone']
+        )
+    )
 
 
-def create_students_from_rows(valid_rows, school):
+def import_student_chunk(rows, school, hashed_passwords):
     """
-    Create student records from validated rows.
-    Returns success and error counts.
+    Insert one chunk of validated rows with two bulk_create statements.
+    
+    Runs in its own transaction, so a failed chunk leaves no partial users.
+    Returns the created Student instances.
     """
-    success_count = 0
-    error_count = 0
-    errors = []
+    candidate_emails = [
+        _student_email(row_info['data'], row_info['row_number'], school, ())
+        for row_info in rows
+    ]
+    taken_emails = set(
+        User.objects.filter(email__in=candidate_emails).values_list('email', flat=True)
+    )
     
-    for row_info in valid_rows:
+    users = []
+    for row_info, password in zip(rows, hashed_passwords):
         row = row_info['data']
-        row_num = row_info['row_number']
-        
+        email = _student_email(row, row_info['row_number'], school, taken_emails)
+        users.append(User(
+            email=User.objects.normalize_email(email),
+            password=password,
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            role='student',
+            school=school
+        ))
+    
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+        return Student.objects.bulk_create([
+            _build_student(row_info, user, school)
+            for row_info, user in zip(rows, users)
+        ])
+
+
+def commit_student_chunk(rows, school):
+    """
+    Hash default passwords and insert one chunk of validated rows.
+    
+    If the chunk fails as a whole, its rows are retried one at a time so a
+    single bad row does not reject the others.
+    
+    Returns (created students, per-row errors).
+    """
+    passwords = hash_passwords(
+        f"Student@{row_info['data']['admission_number']}" for row_info in rows
+    )
+    
+    try:
+        return import_student_chunk(rows, school, passwords), []
+    except (IntegrityError, DatabaseError):
+        pass
+    
+    students = []
+    errors = []
+    for row_info, password in zip(rows, passwords):
         try:
-            # Generate email from admission number
-            email = f"{row['admission_number'].lower().replace(' ', '')}@{school.code.lower()}.student"
-            
-            # Check if email already exists
-            if User.objects.filter(email=email).exists():
-                email = f"{row['admission_number'].lower().replace(' ', '')}_{row_num}@{school.code.lower()}.student"
-            
-            # Generate default password
-            default_password = f"Student@{row['admission_number']}"
-            
-            # Create user
-            user = User.objects.create_user(
-                email=email,
-                password=default_password,
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                role='student',
-                school=school
-            )
-            
-            # Create student profile (roll_number auto-assigned by signal)
-            Student.objects.create(
-                user=user,
-                school=school,
-                admission_number=row['admission_number'],
-                current_class=row['class_obj'],
-                current_section=row['section_obj'],
-                date_of_birth=row.get('date_of_birth_parsed'),
-                gender=row['gender_normalized'],
-                parent_name=row['parent_name'],
-                parent_phone=row['parent_phone'],
-                parent_email=row.get('parent_email', ''),
-                address=row.get('address', '')
-            )
-            
-            success_count += 1
-            
-        except Exception as e:
-            error_count += 1
+            students += import_student_chunk([row_info], school, [password])
+        except (IntegrityError, DatabaseError) as e:
             errors.append({
-                'row_number': row_num,
+                'row_number': row_info['row_number'],
                 'error': str(e)
             })
-    
-    return {
-        'success_count': success_count,
-        'error_count': error_count,
-        'errors': errors
-    }
+    return students, errors
 
 
 def generate_sample_csv():
@@ -0,0 +1,89 @@
+"""
+Student directory export.
+
+Rows come from a single values_list() query joined to user, class and
+section, iterated in chunks and yielded one student at a time, so exporting
+a whole school does not build model instances or hold the rows in memory.
+"""
+from datetime import date
+
+
+DIRECTORY_CHUNK_SIZE = 2000
+
+# Column key -> (header, queryset field)
+DIRECTORY_COLUMNS = {
+    'admission_number': ('Admission No.', 'admission_number'),
+    'roll_number': ('Roll No.', 'roll_number'),
+    'first_name': ('First Name', 'user__first_name'),
+    'last_name': ('Last Name', 'user__last_name'),
+    'email': ('Email', 'user__email'),
+    'phone': ('Phone', 'user__phone'),
+    'class': ('Class', 'current_class__name'),
+    'section': ('Section', 'current_section__name'),
+    'status': ('Status', 'status'),
+    'is_active': ('Login Active', 'user__is_active'),
+    'admission_date': ('Admission Date', 'admission_date'),
+    'date_of_birth': ('Date of Birth', 'date_of_birth'),
+    'gender': ('Gender', 'gender'),
+    'blood_group': ('Blood Group', 'blood_group'),
+    'address': ('Address', 'address'),
+    'parent_name': ('Parent Name', 'parent_name'),
+    'parent_phone': ('Parent Phone', 'parent_phone'),
+    'parent_email': ('Parent Email', 'parent_email'),
+    'parent_occupation': ('Parent Occupation', 'parent_occupation'),
+    'emergency_contact_name': ('Emergency Contact', 'emergency_contact_name'),
+    'emergency_contact_phone': ('Emergency Phone', 'emergency_contact_phone'),
+}
+
+DEFAULT_DIRECTORY_COLUMNS = [
+    'admission_number', 'roll_number', 'first_name', 'last_name', 'class', 'section',
+    'gender', 'date_of_birth', 'parent_name', 'parent_phone', 'status',
+]
+
+
+def parse_directory_columns(value):
+    """
+    Parse a comma-separated column list.
+
+    Raises:
+        ValueError: if a column is unknown
+    """
+    if not value:
+        return list(DEFAULT_DIRECTORY_COLUMNS)
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    unknown = [column for column in columns if column not in DIRECTORY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def build_student_directory(queryset, columns):
+    """
+    Build the directory export for a Student queryset.
+
+    Args:
+        queryset: Filtered Student queryset (its ordering is kept)
+        columns: Column keys from DIRECTORY_COLUMNS
+
+    Returns:
+        (header, rows) where rows is a generator of lists
+    """
+    header = [DIRECTORY_COLUMNS[column][0] for column in columns]
+    fields = [DIRECTORY_COLUMNS[column][1] for column in columns]
+
+    def rows():
+        values = queryset.values_list(*fields).iterator(chunk_size=DIRECTORY_CHUNK_SIZE)
+        for row in values:
+            yield [_cell(value) for value in row]
+
+    return header, rows()
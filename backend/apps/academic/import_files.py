@@ -0,0 +1,133 @@
+"""
+Streaming readers and compressed row storage for bulk imports.
+
+Uploads are read row by row (CSV line by line, XLSX through openpyxl's
+read-only mode) and validated rows are spilled to gzip-compressed JSON-lines
+files, so an import never holds the whole file or its uncompressed rows in
+memory. The compressed rows are stored in the database (ImportRowFile).
+"""
+import csv
+import gzip
+import io
+import json
+import tempfile
+from datetime import date, datetime
+from itertools import islice
+
+
+IMPORT_FILE_EXTENSIONS = ('.csv', '.xlsx')
+
+PREVIEW_PAGE_SIZE = 50
+
+
+def is_supported_import_file(name):
+    return name.lower().endswith(IMPORT_FILE_EXTENSIONS)
+
+
+def open_import_file(uploaded_file):
+    """
+    Open an uploaded CSV or XLSX file for streaming.
+
+    Returns:
+        (headers, rows) where rows lazily yields (row_number, dict) pairs.
+        Row numbers match the spreadsheet (the header is row 1) and blank
+        rows are skipped.
+    """
+    uploaded_file.seek(0)
+    if uploaded_file.name.lower().endswith('.xlsx'):
+        return _open_xlsx(uploaded_file)
+    return _open_csv(uploaded_file)
+
+
+def _open_csv(uploaded_file):
+    # File iteration yields one line at a time; csv joins quoted multi-line fields
+    reader = csv.DictReader(line.decode('utf-8-sig') for line in uploaded_file)
+    headers = [header.strip() for header in reader.fieldnames or []]
+    reader.fieldnames = headers
+
+    def rows():
+        for row_num, row in enumerate(reader, start=2):
+            row.pop(None, None)  # Values beyond the header
+            if any(row.values()):
+                yield row_num, row
+
+    return headers, rows()
+
+
+def _open_xlsx(uploaded_file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    values = workbook.active.iter_rows(values_only=True)
+    headers = [_cell_text(value) for value in next(values, ())]
+
+    def rows():
+        try:
+            for row_num, cells in enumerate(values, start=2):
+                row = dict(zip(headers, (_cell_text(cell) for cell in cells)))
+                if any(row.values()):
+                    yield row_num, row
+        finally:
+            workbook.close()
+
+    return headers, rows()
+
+
+def _cell_text(value):
+    """Spreadsheet cell as the text a CSV export would contain."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        # Phone numbers and IDs typed as numbers come back as floats
+        return str(int(value))
+    return str(value).strip()
+
+
+class RowSpool:
+    """Append-only gzip JSON-lines file that rows are spilled to while validating."""
+
+    def __init__(self):
+        self.count = 0
+        self._file = tempfile.TemporaryFile()
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb')
+
+    def append(self, row):
+        self._gzip.write(json.dumps(row, separators=(',', ':')).encode() + b'\n')
+        self.count += 1
+
+    def to_bytes(self):
+        """Finish writing and return the compressed rows."""
+        self._gzip.close()
+        self._file.seek(0)
+        data = self._file.read()
+        self._file.close()
+        return data
+
+
+def read_rows(data, start=0, stop=None):
+    """Lazily read rows spilled by RowSpool from their compressed bytes, from index start."""
+    if not data:
+        return
+    with gzip.open(io.BytesIO(data), 'rt') as lines:
+        for line in islice(lines, start, stop):
+            yield json.loads(line)
+
+
+def read_rows_page(data, page, page_size=PREVIEW_PAGE_SIZE):
+    """One page (1-based) of stored rows."""
+    start = (page - 1) * page_size
+    return list(read_rows(data, start, start + page_size))
+
+
+def iter_chunks(rows, size):
+    """Group an iterable into lists of at most size items."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,229 @@
+"""
+Persisted, resumable bulk imports.
+
+Preview streams the upload through the row validator once and spills valid
+and invalid rows to compressed files stored in the database with an
+ImportJob, where the worker can read them. Confirm queues a Celery task
+that commits the stored rows in chunks; each chunk and the job's progress
+are saved in one transaction, so a failed job resumes from the last
+committed chunk. A running job whose progress has not been saved for
+STALE_IMPORT_JOB_TIMEOUT is taken to have lost its worker and can be
+resumed the same way.
+
+The stored rows hold personal data, so they are deleted when the job
+completes (the invalid rows already when it fails), and expire_import_jobs
+deletes those of jobs left unfinished for IMPORT_ROWS_RETENTION.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import bulk_import_utils, teacher_import_utils
+from .bulk_import_utils import IMPORT_CHUNK_SIZE, commit_student_chunk, validate_student_rows
+from .import_files import RowSpool, iter_chunks, open_import_file, read_rows
+from .models import ImportJob, ImportRowFile
+from .roll_number_utils import recalculate_roll_numbers_for_sections
+from .teacher_import_utils import commit_teacher_chunk, validate_teacher_rows
+
+
+# No chunk takes this long, so a running job that has not saved progress
+# since then belongs to a worker that crashed or was killed
+STALE_IMPORT_JOB_TIMEOUT = timedelta(minutes=10)
+
+# Unfinished jobs keep their rows for resuming or confirming this long
+IMPORT_ROWS_RETENTION = timedelta(days=7)
+
+
+def _finalize_students(job):
+    # bulk_create skips the roll number signals; renumber every target section
+    # (including ones committed before a resume) once at the end
+    recalculate_roll_numbers_for_sections(
+        {row['resolved']['section_id'] for row in read_rows(row_data(job, ImportRowFile.Kind.VALID))}
+    )
+
+
+IMPORTERS = {
+    ImportJob.ImportType.STUDENTS: {
+        'required_columns': bulk_import_utils.REQUIRED_COLUMNS,
+        'validate': validate_student_rows,
+        'commit_chunk': commit_student_chunk,
+        'finalize': _finalize_students,
+    },
+    ImportJob.ImportType.TEACHERS: {
+        'required_columns': teacher_import_utils.REQUIRED_COLUMNS,
+        'validate': validate_teacher_rows,
+        'commit_chunk': commit_teacher_chunk,
+        'finalize': None,
+    },
+}
+
+
+def preview_row(row_info):
+    """Row as shown in the preview, without resolved internal references."""
+    return {key: value for key, value in row_info.items() if key != 'resolved'}
+
+
+def row_data(job, kind):
+    """Compressed valid or invalid rows of a job, or None once they are deleted."""
+    return ImportRowFile.objects.filter(job=job, kind=kind).values_list('data', flat=True).first()
+
+
+def create_import_job(uploaded_file, school, user, import_type):
+    """
+    Validate an uploaded CSV/XLSX file row by row and store it as an ImportJob.
+
+    Raises:
+        ValueError: if the file is missing required columns
+    """
+    importer = IMPORTERS[import_type]
+    headers, rows = open_import_file(uploaded_file)
+    missing_headers = [col for col in importer['required_columns'] if col not in headers]
+    if missing_headers:
+        raise ValueError(f"Missing required columns: {', '.join(missing_headers)}")
+
+    valid_rows = RowSpool()
+    invalid_rows = RowSpool()
+    for row_info in importer['validate'](rows, school):
+        if 'errors' in row_info:
+            invalid_rows.append(row_info)
+        else:
+            valid_rows.append(row_info)
+
+    with transaction.atomic():
+        job = ImportJob.objects.create(
+            school=school,
+            created_by=user,
+            import_type=import_type,
+            valid_count=valid_rows.count,
+            invalid_count=invalid_rows.count
+        )
+        ImportRowFile.objects.bulk_create([
+            ImportRowFile(job=job, kind=ImportRowFile.Kind.VALID, data=valid_rows.to_bytes()),
+            ImportRowFile(job=job, kind=ImportRowFile.Kind.INVALID, data=invalid_rows.to_bytes()),
+        ])
+    return job
+
+
+def _resumable_filter():
+    stale_before = timezone.now() - STALE_IMPORT_JOB_TIMEOUT
+    return (
+        Q(status__in=[ImportJob.Status.QUEUED, ImportJob.Status.FAILED])
+        | Q(status=ImportJob.Status.RUNNING, updated_at__lt=stale_before)
+    )
+
+
+def is_resumable(job):
+    """Failed jobs and running jobs whose worker stopped making progress can be resumed."""
+    if job.status == ImportJob.Status.FAILED:
+        return True
+    return (
+        job.status == ImportJob.Status.RUNNING
+        and job.updated_at < timezone.now() - STALE_IMPORT_JOB_TIMEOUT
+    )
+
+
+def _still_claimed(job):
+    """Lock the job and check that no other worker has claimed it since its last save."""
+    return ImportJob.objects.select_for_update().filter(
+        pk=job.pk, status=ImportJob.Status.RUNNING, updated_at=job.updated_at
+    ).exists()
+
+
+def queue_import_job(job):
+    """Mark a job as queued and start the commit task once the change is committed."""
+    from .tasks import commit_import_job
+
+    job.status = ImportJob.Status.QUEUED
+    job.error_message = ''
+    job.save(update_fields=['status', 'error_message', 'updated_at'])
+    transaction.on_commit(lambda: commit_import_job.delay(job.id))
+    return job
+
+
+def run_import_job(job, chunk_size=None):
+    """
+    Commit a job's stored rows in chunks, starting from committed_rows.
+
+    Returns the job. A failure marks the job as failed and keeps the
+    progress of every chunk committed before it.
+    """
+    # Claim the job so a duplicate task cannot run it concurrently; a stale
+    # running job is claimed from its lost worker
+    now = timezone.now()
+    claimed = ImportJob.objects.filter(_resumable_filter(), pk=job.pk).update(
+        status=ImportJob.Status.RUNNING, started_at=job.started_at or now, updated_at=now
+    )
+    job.refresh_from_db()
+    if not claimed:
+        return job
+
+    importer = IMPORTERS[job.import_type]
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    progress_fields = [
+        'committed_rows', 'success_count', 'error_count', 'errors', 'elapsed_seconds', 'updated_at'
+    ]
+    # Run time is added to that of earlier runs of a resumed job
+    started = time.monotonic() - job.elapsed_seconds
+
+    try:
+        rows = read_rows(row_data(job, ImportRowFile.Kind.VALID), start=job.committed_rows)
+        for chunk in iter_chunks(rows, chunk_size):
+            with transaction.atomic():
+                if not _still_claimed(job):
+                    # Reclaimed after this worker stalled; the new run continues it
+                    job.refresh_from_db()
+                    return job
+                created, errors = importer['commit_chunk'](chunk, job.school)
+                job.committed_rows += len(chunk)
+                job.success_count += len(created)
+                job.error_count += len(errors)
+                job.errors = job.errors + errors
+                job.elapsed_seconds = round(time.monotonic() - started, 3)
+                job.save(update_fields=progress_fields)
+
+        if importer['finalize']:
+            importer['finalize'](job)
+    except Exception as e:
+        job.status = ImportJob.Status.FAILED
+        job.error_message = str(e)
+        with transaction.atomic():
+            job.save(update_fields=['status', 'error_message', 'updated_at'])
+            # Only the valid rows are needed to resume
+            job.row_files.filter(kind=ImportRowFile.Kind.INVALID).delete()
+        return job
+
+    job.elapsed_seconds = round(time.monotonic() - started, 3)
+    job.status = ImportJob.Status.COMPLETED
+    job.completed_at = timezone.now()
+    with transaction.atomic():
+        job.save(update_fields=['status', 'completed_at', 'elapsed_seconds', 'updated_at'])
+        job.row_files.all().delete()
+    return job
+
+
+def expire_import_jobs(retention=None):
+    """
+    Delete the stored rows of jobs left unfinished (never confirmed, failed
+    and not resumed, or stalled) for the retention period, and mark them expired.
+
+    Returns the number of expired jobs.
+    """
+    now = timezone.now()
+    stale = ImportJob.objects.filter(
+        status__in=[
+            ImportJob.Status.PREVIEWED, ImportJob.Status.QUEUED,
+            ImportJob.Status.RUNNING, ImportJob.Status.FAILED
+        ],
+        updated_at__lt=now - (retention or IMPORT_ROWS_RETENTION)
+    )
+    with transaction.atomic():
+        job_ids = list(stale.select_for_update().values_list('id', flat=True))
+        ImportRowFile.objects.filter(job_id__in=job_ids).delete()
+        return ImportJob.objects.filter(id__in=job_ids).update(
+            status=ImportJob.Status.EXPIRED,
+            error_message='The import was not finished in time; upload the file again.',
+            updated_at=now
+        )
@@ -0,0 +1,25 @@
+"""
+Management command to delete the stored rows of abandoned import jobs.
+Run it daily (e.g. from cron) so unfinished imports do not keep personal data.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.academic.import_jobs import IMPORT_ROWS_RETENTION, expire_import_jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete the stored rows of import jobs left unfinished and mark them expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=IMPORT_ROWS_RETENTION.days,
+            help='Expire jobs not updated for this many days',
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_import_jobs(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} import jobs.'))
@@ -0,0 +1,88 @@
+"""
+Management command to promote students into a new academic year.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academic.models import AcademicYear
+from apps.academic.promotion_utils import PromotionError, promote_students
+from apps.academic.serializers import PromotionSerializer
+
+
+class Command(BaseCommand):
+    help = 'Promote students into a new academic year using a class/section mapping'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--school',
+            type=int,
+            required=True,
+            help='School ID',
+        )
+        parser.add_argument(
+            '--year',
+            required=True,
+            help='Name of the target academic year (e.g. 2025-26)',
+        )
+        parser.add_argument(
+            '--mapping',
+            required=True,
+            help='JSON file with a list of moves: {"from_class", "from_section", "to_class", "to_section", "graduate"}',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would change',
+        )
+        parser.add_argument(
+            '--set-current',
+            action='store_true',
+            help='Make the target year the current academic year',
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            year = AcademicYear.objects.select_related('school').get(
+                school_id=options['school'], name=options['year']
+            )
+        except AcademicYear.DoesNotExist:
+            raise CommandError(f"Academic year {options['year']} not found for school {options['school']}.")
+        
+        try:
+            with open(options['mapping']) as mapping_file:
+                moves = json.load(mapping_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read mapping {options['mapping']}: {e}")
+        
+        # Same validation as the promote API
+        serializer = PromotionSerializer(data={
+            'moves': moves,
+            'dry_run': options['dry_run'],
+            'set_current': options['set_current']
+        })
+        if not serializer.is_valid():
+            raise CommandError(f'Invalid mapping: {json.dumps(serializer.errors)}')
+        
+        try:
+            summary = promote_students(
+                year.school, year,
+                serializer.validated_data['moves'],
+                dry_run=serializer.validated_data['dry_run'],
+                set_current=serializer.validated_data['set_current']
+            )
+        except PromotionError as e:
+            raise CommandError(str(e))
+        
+        for move in summary['moves']:
+            self.stdout.write(
+                f"  Class {move['to_class']} / Section {move['to_section']}: {move['count']} students"
+            )
+        
+        prefix = 'Dry run (nothing saved):' if summary['dry_run'] else 'Done!'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n{prefix} {summary['promoted']} promoted, {summary['graduated']} graduated "
+                f"into {summary['academic_year']}."
+            )
+        )
@@ -0,0 +1,143 @@
+"""
+Cached per-section study material feed.
+
+Each section has a version counter in the cache, bumped after any material
+of the section is saved or deleted. Feeds are cached per (section, subject)
+under the current version, so a change simply moves readers to a new key
+and no feed has to be invalidated explicitly. The version also serves as
+the ETag, which lets an unchanged feed be answered without loading it.
+
+The counter starts from the clock (in milliseconds) when it is missing from
+the cache, so a version lost to eviction or expiry is never handed out
+again.
+
+Bumps only reach every process through a shared cache (CACHE_URL). With the
+per-process fallback cache, versions and feeds expire after a few seconds,
+so other processes cannot keep serving (or answering 304 for) a stale feed.
+"""
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import StudyMaterial
+
+
+FEED_CACHE_TIMEOUT = 60 * 60  # 1 hour
+LOCAL_FEED_CACHE_TIMEOUT = 10  # seconds, without a shared cache
+
+# Changes since a cursor also include items updated shortly before it, so a
+# material saved in a transaction that committed after the cursor was issued
+# is not missed; clients apply changes by id
+FEED_CHANGES_OVERLAP = timedelta(minutes=1)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a feed cursor cannot be parsed."""
+
+
+def _version_key(section_id):
+    return f'material_feed_version:{section_id}'
+
+
+def _feed_key(section_id, subject_id, version):
+    return f'material_feed:{section_id}:{subject_id or "all"}:{version}'
+
+
+def _cache_timeout():
+    return FEED_CACHE_TIMEOUT if settings.CACHE_URL else LOCAL_FEED_CACHE_TIMEOUT
+
+
+def get_feed_version(section_id):
+    """Current feed version of a section."""
+    key = _version_key(section_id)
+    version = cache.get(key)
+    if version is None:
+        version = int(time.time() * 1000)
+        cache.add(key, version, _cache_timeout())
+        version = cache.get(key, version)
+    return version
+
+
+def bump_feed_version(section_id):
+    try:
+        cache.incr(_version_key(section_id))
+    except ValueError:
+        # Missing key: starting again from the clock is already a newer version
+        get_feed_version(section_id)
+
+
+def schedule_feed_bump(*section_ids):
+    """Bump the feed versions of sections once the surrounding transaction commits."""
+    section_ids = {section_id for section_id in section_ids if section_id}
+    if section_ids:
+        transaction.on_commit(lambda: [bump_feed_version(section_id) for section_id in section_ids])
+
+
+def feed_etag(section_id, subject_id, version):
+    return f'"{section_id}-{subject_id or 0}-{version}"'
+
+
+def get_material_feed(section_id, subject_id=None, version=None):
+    """
+    Serialized materials of a section (optionally one subject), newest first.
+
+    Returns:
+        dict with version, built_at and items
+    """
+    from .serializers import StudyMaterialSerializer
+
+    if version is None:
+        version = get_feed_version(section_id)
+    key = _feed_key(section_id, subject_id, version)
+    feed = cache.get(key)
+    if feed is None:
+        built_at = timezone.now()
+        queryset = StudyMaterial.objects.filter(section_id=section_id).select_related(
+            'section__school_class', 'subject', 'created_by'
+        )
+        if subject_id:
+            queryset = queryset.filter(subject_id=subject_id)
+        feed = {
+            'version': version,
+            'built_at': built_at,
+            'items': [dict(item) for item in StudyMaterialSerializer(queryset, many=True).data],
+        }
+        cache.set(key, feed, _cache_timeout())
+    return feed
+
+
+def feed_cursor(feed):
+    """Cursor for a feed: its version and build time in milliseconds."""
+    return f"{feed['version']}.{int(feed['built_at'].timestamp() * 1000)}"
+
+
+def parse_feed_cursor(cursor):
+    """
+    Returns:
+        (version, built_at)
+
+    Raises:
+        InvalidCursor: if the cursor is malformed
+    """
+    version, _, built_at = cursor.partition('.')
+    if not version.isdigit() or not built_at.isdigit():
+        raise InvalidCursor('Invalid cursor.')
+    return int(version), datetime.fromtimestamp(int(built_at) / 1000, tz=dt_timezone.utc)
+
+
+def feed_changes(feed, since):
+    """
+    Items of a feed updated since a cursor's build time, and the ids of all
+    current items; ids the client holds that are missing were deleted.
+    """
+    threshold = since - FEED_CHANGES_OVERLAP
+    return {
+        'cursor': feed_cursor(feed),
+        'changed': [item for item in feed['items'] if parse_datetime(item['updated_at']) > threshold],
+        'ids': [item['id'] for item in feed['items']],
+    }
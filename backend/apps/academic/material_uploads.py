@@ -0,0 +1,190 @@
+"""
+Chunked, resumable study material uploads.
+
+A client opens an upload session with the file's name and size, then sends
+the file as raw chunks, each at the offset the server has received so far.
+Each chunk is stored as a MaterialUploadChunk row, so a dropped connection
+only costs the chunk in flight and the chunks are reachable from the Celery
+worker, which need not share a disk with the web process. Completing the
+session queues a task that assembles the chunks, moves the file to media
+storage and creates the StudyMaterial, keeping the transfer to the storage
+backend out of the request.
+"""
+import mimetypes
+import tempfile
+
+from django.core.files import File
+from django.db import transaction
+
+from .models import MaterialUpload, MaterialUploadChunk, StudyMaterial
+
+
+# Largest chunk accepted per request, and the size clients are told to send
+MATERIAL_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+MATERIAL_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadOffsetError(ValueError):
+    """Raised when a chunk does not start where the received bytes end."""
+
+    def __init__(self, received_bytes):
+        super().__init__(f'Expected a chunk at offset {received_bytes}.')
+        self.received_bytes = received_bytes
+
+
+def _read_chunk(stream, length):
+    data = bytearray()
+    while len(data) < length:
+        block = stream.read(min(COPY_BUFFER_SIZE, length - len(data)))
+        if not block:
+            break
+        data += block
+    return bytes(data)
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Store one chunk of an upload.
+
+    The chunk is read from the client before the session row is locked, so
+    a slow client never holds a transaction open. Concurrent chunks for the
+    same upload are then applied one at a time.
+
+    Args:
+        upload: MaterialUpload instance
+        offset: Byte offset the chunk starts at
+        stream: File-like object with the chunk body
+        length: Declared chunk length in bytes
+
+    Returns:
+        The refreshed MaterialUpload
+
+    Raises:
+        UploadOffsetError: if offset is not the current resume point
+        ValueError: if the upload is not accepting chunks or the chunk is invalid
+    """
+    if length <= 0 or length > MATERIAL_UPLOAD_CHUNK_SIZE:
+        raise ValueError(f'Chunks must be between 1 and {MATERIAL_UPLOAD_CHUNK_SIZE} bytes.')
+
+    data = _read_chunk(stream, length)
+    if len(data) != length:
+        raise ValueError(f'Chunk was {len(data)} bytes, expected {length}.')
+
+    with transaction.atomic():
+        upload = MaterialUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != MaterialUpload.Status.UPLOADING:
+            raise ValueError(f'Upload is {upload.status}, not accepting chunks.')
+        if offset != upload.received_bytes:
+            raise UploadOffsetError(upload.received_bytes)
+        if offset + length > upload.total_size:
+            raise ValueError('Chunk extends past the declared file size.')
+
+        MaterialUploadChunk.objects.create(upload=upload, offset=offset, data=data)
+        upload.received_bytes += length
+        upload.save(update_fields=['received_bytes', 'updated_at'])
+    return upload
+
+
+def queue_material_upload(upload):
+    """Mark a fully received upload as queued and start the transfer once committed."""
+    from .tasks import transfer_material_upload
+
+    upload.status = MaterialUpload.Status.QUEUED
+    upload.error_message = ''
+    upload.save(update_fields=['status', 'error_message', 'updated_at'])
+    transaction.on_commit(lambda: transfer_material_upload.delay(upload.id))
+    return upload
+
+
+def run_material_transfer(upload):
+    """
+    Assemble an upload's chunks, move the file to media storage and create
+    its StudyMaterial.
+
+    Returns the upload. A failure marks it as failed, deletes any file
+    already stored and keeps the chunks, so the transfer can be queued again.
+    """
+    # Claim the upload so a duplicate task cannot transfer it twice
+    claimed = MaterialUpload.objects.filter(
+        pk=upload.pk, status__in=[MaterialUpload.Status.QUEUED, MaterialUpload.Status.FAILED]
+    ).update(status=MaterialUpload.Status.TRANSFERRING)
+    upload.refresh_from_db()
+    if not claimed:
+        return upload
+
+    material = StudyMaterial(
+        school_id=upload.school_id,
+        title=upload.title,
+        description=upload.description,
+        section_id=upload.section_id,
+        subject_id=upload.subject_id,
+        created_by_id=upload.created_by_id
+    )
+    try:
+        # Assembled in a temporary file on the worker, one chunk in memory at a time
+        with tempfile.TemporaryFile() as assembled:
+            chunks = upload.chunks.order_by('offset').values_list('data', flat=True)
+            for data in chunks.iterator(chunk_size=1):
+                assembled.write(data)
+            if assembled.tell() != upload.total_size:
+                raise ValueError(f'Assembled {assembled.tell()} of {upload.total_size} bytes.')
+            assembled.seek(0)
+            material.file.save(upload.file_name, File(assembled), save=False)
+        with transaction.atomic():
+            material.save()
+            upload.material = material
+            upload.status = MaterialUpload.Status.COMPLETED
+            upload.save(update_fields=['material', 'status', 'updated_at'])
+            upload.chunks.all().delete()
+    except Exception as e:
+        if material.file:
+            # The stored file is not rolled back with the transaction
+            material.file.delete(save=False)
+        upload.status = MaterialUpload.Status.FAILED
+        upload.error_message = str(e)
+        upload.save(update_fields=['status', 'error_message', 'updated_at'])
+        return upload
+
+    return upload
+
+
+def signed_file_url(field_file):
+    """
+    Direct URL for a stored file, signed where the storage backend supports it.
+
+    Cloudinary URLs carry a signature so they cannot be altered to reach other
+    resources; other backends return their own URL (for FileSystemStorage,
+    the MEDIA_URL path served by the web server). Bytes never pass through
+    Django either way.
+    """
+    if not field_file:
+        return None
+    storage = field_file.storage
+    if type(storage).__module__.startswith('cloudinary_storage.'):
+        from cloudinary.utils import cloudinary_url
+
+        url, _ = cloudinary_url(
+            field_file.name,
+            resource_type=cloudinary_resource_type(field_file.name),
+            sign_url=True,
+            secure=True
+        )
+        return url
+    return storage.url(field_file.name)
+
+
+def cloudinary_resource_type(name):
+    """
+    Cloudinary resource type of a file, from its extension.
+
+    Cloudinary stores images and PDFs as 'image' and videos as 'video';
+    anything else can only be stored as 'raw'.
+    """
+    content_type, _ = mimetypes.guess_type(name)
+    if content_type and (content_type.startswith('image/') or content_type == 'application/pdf'):
+        return 'image'
+    if content_type and content_type.startswith('video/'):
+        return 'video'
+    return 'raw'
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:38
+
+import apps.academic.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0002_featuretoggle_notes_enabled_school_account_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('academic', '0005_enforce_one_class_teacher_per_teacher'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('import_type', models.CharField(choices=[('students', 'Students'), ('teachers', 'Teachers')], max_length=20)),
+                ('status', models.CharField(choices=[('previewed', 'Previewed'), ('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='previewed', max_length=20)),
+                ('file', models.FileField(storage=apps.academic.models.ImportFileStorage(), upload_to='imports/%Y/%m/')),
+                ('valid_rows', models.JSONField(default=list)),
+                ('invalid_rows', models.JSONField(default=list)),
+                ('valid_count', models.PositiveIntegerField(default=0)),
+                ('invalid_count', models.PositiveIntegerField(default=0)),
+                ('committed_rows', models.PositiveIntegerField(default=0)),
+                ('success_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(default=list)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to='schools.school')),
+            ],
+            options={
+                'db_table': 'import_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:41
+
+import apps.academic.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0006_import_jobs'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='importjob',
+            name='invalid_rows',
+        ),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='valid_rows',
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='invalid_rows_file',
+            field=models.FileField(blank=True, storage=apps.academic.models.ImportFileStorage(), upload_to='imports/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='valid_rows_file',
+            field=models.FileField(blank=True, storage=apps.academic.models.ImportFileStorage(), upload_to='imports/%Y/%m/'),
+        ),
+    ]
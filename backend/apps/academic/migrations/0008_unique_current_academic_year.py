@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+def keep_latest_current_year(apps, schema_editor):
+    """Leave only the latest-starting current year per school before adding the constraint."""
+    AcademicYear = apps.get_model('academic', 'AcademicYear')
+    seen_schools = set()
+    for year in AcademicYear.objects.filter(is_current=True).order_by('school_id', '-start_date', '-id'):
+        if year.school_id in seen_schools:
+            AcademicYear.objects.filter(pk=year.pk).update(is_current=False)
+        seen_schools.add(year.school_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0007_import_job_row_files'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_current_year, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='academicyear',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('school',), name='unique_current_academic_year_per_school'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:50
+
+import re
+
+from django.db import migrations, models
+
+
+# Frozen copy of apps.academic.search_utils.student_search_text as of this
+# migration, cut to the column's original max_length (0015 widens it)
+_NUMBER_LIKE = re.compile(r'^[\d()+\-./]+$')
+
+
+def _normalize_token(token):
+    if _NUMBER_LIKE.match(token):
+        return re.sub(r'\D', '', token)
+    return token
+
+
+def student_search_text(*values):
+    text = ' '.join(str(value) for value in values if value).lower()
+    return ' '.join(filter(None, (_normalize_token(token) for token in text.split())))[:255]
+
+
+def fill_search_text(apps, schema_editor):
+    Student = apps.get_model('academic', 'Student')
+    batch = []
+    for student in Student.objects.select_related('user').iterator(chunk_size=2000):
+        student.search_text = student_search_text(
+            student.user.first_name, student.user.last_name,
+            student.admission_number, student.parent_phone
+        )
+        batch.append(student)
+        if len(batch) >= 2000:
+            Student.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    Student.objects.bulk_update(batch, ['search_text'])
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN trigram indexes serve LIKE '%term%'; other databases use students_search_text_idx
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS students_search_text_trgm '
+        'ON students USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS students_search_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0008_unique_current_academic_year'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['school', 'search_text'], name='students_search_text_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['school', 'roll_number'], name='students_roll_number_idx'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
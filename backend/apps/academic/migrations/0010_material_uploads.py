@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('schools', '0002_featuretoggle_notes_enabled_school_account_type'),
+        ('academic', '0009_student_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('queued', 'Queued'), ('transferring', 'Transferring'), ('completed', 'Completed'), ('failed', 'Failed')], default='uploading', max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('file_name', models.CharField(max_length=255)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('received_bytes', models.PositiveBigIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='material_uploads', to=settings.AUTH_USER_MODEL)),
+                ('material', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='academic.studymaterial')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='material_uploads', to='schools.school')),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='academic.section')),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='academic.subject')),
+            ],
+            options={
+                'db_table': 'material_uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0011_studymaterial_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='elapsed_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
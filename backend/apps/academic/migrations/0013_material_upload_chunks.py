@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0012_import_job_elapsed_seconds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialUploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('offset', models.PositiveBigIntegerField()),
+                ('data', models.BinaryField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='academic.materialupload')),
+            ],
+            options={
+                'db_table': 'material_upload_chunks',
+                'ordering': ['offset'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='materialuploadchunk',
+            constraint=models.UniqueConstraint(fields=('upload', 'offset'), name='unique_material_upload_chunk_offset'),
+        ),
+    ]
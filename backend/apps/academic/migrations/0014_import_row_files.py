@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+UNFINISHED_STATUSES = ['previewed', 'queued', 'running', 'failed']
+
+
+def move_row_files(apps, schema_editor):
+    # Rows of unfinished jobs move into the database; every file written to
+    # the web host's disk is deleted, as they hold personal data
+    ImportJob = apps.get_model('academic', 'ImportJob')
+    ImportRowFile = apps.get_model('academic', 'ImportRowFile')
+    for job in ImportJob.objects.iterator(chunk_size=200):
+        for kind, field_file in [('valid', job.valid_rows_file), ('invalid', job.invalid_rows_file)]:
+            if not field_file:
+                continue
+            if job.status in UNFINISHED_STATUSES:
+                try:
+                    with field_file.open('rb') as stored:
+                        ImportRowFile.objects.create(job=job, kind=kind, data=stored.read())
+                except OSError:
+                    pass
+            field_file.delete(save=False)
+        if job.file:
+            job.file.delete(save=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0013_material_upload_chunks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('previewed', 'Previewed'), ('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('expired', 'Expired')], default='previewed', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ImportRowFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('valid', 'Valid rows'), ('invalid', 'Invalid rows')], max_length=10)),
+                ('data', models.BinaryField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_files', to='academic.importjob')),
+            ],
+            options={
+                'db_table': 'import_row_files',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importrowfile',
+            constraint=models.UniqueConstraint(fields=('job', 'kind'), name='unique_import_row_file_kind'),
+        ),
+        migrations.RunPython(move_row_files, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='file',
+        ),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='invalid_rows_file',
+        ),
+        migrations.RemoveField(
+            model_name='importjob',
+            name='valid_rows_file',
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:55
+
+import re
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+# Frozen copy of apps.academic.search_utils.student_search_text as of this migration
+_NUMBER_LIKE = re.compile(r'^[\d()+\-./]+$')
+
+
+def _normalize_token(token):
+    if _NUMBER_LIKE.match(token):
+        return re.sub(r'\D', '', token)
+    return token
+
+
+def student_search_text(*values):
+    text = ' '.join(str(value) for value in values if value).lower()
+    return ' '.join(filter(None, (_normalize_token(token) for token in text.split())))
+
+
+def refill_cut_search_text(apps, schema_editor):
+    # Only values that filled the old 255-character column may have been cut
+    Student = apps.get_model('academic', 'Student')
+    students = Student.objects.annotate(search_length=Length('search_text')).filter(search_length__gte=255)
+    batch = []
+    for student in students.select_related('user').iterator(chunk_size=2000):
+        student.search_text = student_search_text(
+            student.user.first_name, student.user.last_name,
+            student.admission_number, student.parent_phone
+        )
+        batch.append(student)
+        if len(batch) >= 2000:
+            Student.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    Student.objects.bulk_update(batch, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0014_import_row_files'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(refill_cut_search_text, migrations.RunPython.noop),
+    ]
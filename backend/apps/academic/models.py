@@ -2,11 +2,16 @@
 Models for Academic management.
 Classes, Sections, Students, Teachers, Subjects.
 """
-from django.db import models
+import os
+
+from django.db import models, transaction
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from apps.core.tracking import FieldTrackerMixin
 
 
-class AcademicYear(models.Model):
+class AcademicYear(FieldTrackerMixin, models.Model):
     """Academic year for the school."""
     school = models.ForeignKey(
         'schools.School',
@@ -18,19 +23,29 @@ class AcademicYear(models.Model):
     end_date = models.DateField()
     is_current = models.BooleanField(default=False)
     
+    tracked_fields = ['is_current']
+    
     class Meta:
         db_table = 'academic_years'
         unique_together = ['school', 'name']
         ordering = ['-start_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['school'],
+                condition=models.Q(is_current=True),
+                name='unique_current_academic_year_per_school'
+            )
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.school.name}"
     
     def save(self, *args, **kwargs):
         # Ensure only one current year per school
-        if self.is_current:
-            AcademicYear.objects.filter(school=self.school, is_current=True).exclude(pk=self.pk).update(is_current=False)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self.is_current:
+                AcademicYear.objects.filter(school=self.school, is_current=True).exclude(pk=self.pk).update(is_current=False)
+            super().save(*args, **kwargs)
 
 
 class Class(models.Model):
@@ -201,9 +216,13 @@ class SubjectTeacher(models.Model):
         return f"{self.teacher.full_name} - {self.subject.name} ({self.section})"
 
 
-class Student(models.Model):
+class Student(FieldTrackerMixin, models.Model):
     """Student profile linked to User."""
     
+    # Section and status changes trigger roll number recalculation;
+    # admission number and parent phone changes refresh search_text
+    tracked_fields = ['current_section_id', 'status', 'admission_number', 'parent_phone']
+    
     class Status(models.TextChoices):
         ACTIVE = 'active', 'Active'
         INACTIVE = 'inactive', 'Inactive'
@@ -268,14 +287,38 @@ class Student(models.Model):
         default=Status.ACTIVE
     )
     
+    # Normalized name, admission number and parent phone (see search_utils)
+    search_text = models.TextField(blank=True, default='', editable=False)
+    
     class Meta:
         db_table = 'students'
         unique_together = ['school', 'admission_number']
         ordering = ['current_class__numeric_value', 'current_section__name', 'roll_number']
+        indexes = [
+            models.Index(fields=['school', 'search_text'], name='students_search_text_idx'),
+            models.Index(fields=['school', 'roll_number'], name='students_roll_number_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.admission_number})"
     
+    def save(self, *args, **kwargs):
+        # Refresh search_text when its inputs may have changed; avoid loading the user otherwise
+        if (
+            self._state.adding
+            or Student.user.is_cached(self)
+            or self.has_changed('admission_number')
+            or self.has_changed('parent_phone')
+        ):
+            self.search_text = self.build_search_text()
+        super().save(*args, **kwargs)
+    
+    def build_search_text(self):
+        from .search_utils import student_search_text
+        return student_search_text(
+            self.user.first_name, self.user.last_name, self.admission_number, self.parent_phone
+        )
+    
     @property
     def full_name(self):
         return self.user.get_full_name()
@@ -291,11 +334,13 @@ class Student(models.Model):
         return None
 
 
-class StudyMaterial(models.Model):
+class StudyMaterial(FieldTrackerMixin, models.Model):
     """
     Study materials/Notes uploaded by teachers.
     Part of the Paid Feature set.
     """
+    tracked_fields = ['section_id']
+    
     school = models.ForeignKey(
         'schools.School',
         on_delete=models.CASCADE,
@@ -329,6 +374,7 @@ class StudyMaterial(models.Model):
         related_name='uploaded_materials'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'study_materials'
@@ -336,3 +382,212 @@ class StudyMaterial(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.school.name}"
+
+
+class MaterialUpload(models.Model):
+    """
+    Resumable chunked upload of a study material file.
+    Chunks are stored as MaterialUploadChunk rows; once complete, a
+    background task assembles them, moves the file to media storage and
+    creates the StudyMaterial.
+    """
+    
+    class Status(models.TextChoices):
+        UPLOADING = 'uploading', 'Uploading'
+        QUEUED = 'queued', 'Queued'
+        TRANSFERRING = 'transferring', 'Transferring'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+    
+    school = models.ForeignKey(
+        'schools.School',
+        on_delete=models.CASCADE,
+        related_name='material_uploads'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='material_uploads'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.UPLOADING
+    )
+    
+    # StudyMaterial fields, applied when the transfer completes
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, null=True, blank=True)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
+    
+    # received_bytes is the resume point for the next chunk
+    file_name = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    
+    material = models.OneToOneField(
+        StudyMaterial,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload'
+    )
+    error_message = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'material_uploads'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.file_name} upload #{self.pk} ({self.status})"
+
+
+class MaterialUploadChunk(models.Model):
+    """One received chunk of a MaterialUpload, kept until the transfer completes."""
+    
+    upload = models.ForeignKey(
+        MaterialUpload,
+        on_delete=models.CASCADE,
+        related_name='chunks'
+    )
+    offset = models.PositiveBigIntegerField()
+    data = models.BinaryField()
+    
+    class Meta:
+        db_table = 'material_upload_chunks'
+        ordering = ['offset']
+        constraints = [
+            models.UniqueConstraint(fields=['upload', 'offset'], name='unique_material_upload_chunk_offset')
+        ]
+    
+    def __str__(self):
+        return f"Chunk at {self.offset} of upload #{self.upload_id}"
+
+
+class ImportFileStorage(FileSystemStorage):
+    """
+    Former private storage of import files on the web host's disk.
+    Only referenced by the migrations that created and later moved those files.
+    """
+    
+    @property
+    def base_location(self):
+        return settings.IMPORT_FILES_ROOT
+    
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+    
+    @property
+    def base_url(self):
+        return None
+
+
+class ImportJob(models.Model):
+    """
+    Bulk student/teacher import.
+    The uploaded file is parsed and validated once at preview time; the
+    validated rows are stored with the job (see ImportRowFile) and committed
+    later in chunks by a background task, which can resume from the last
+    committed chunk.
+    """
+    
+    class ImportType(models.TextChoices):
+        STUDENTS = 'students', 'Students'
+        TEACHERS = 'teachers', 'Teachers'
+    
+    class Status(models.TextChoices):
+        PREVIEWED = 'previewed', 'Previewed'
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+        EXPIRED = 'expired', 'Expired'
+    
+    school = models.ForeignKey(
+        'schools.School',
+        on_delete=models.CASCADE,
+        related_name='import_jobs'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='import_jobs'
+    )
+    import_type = models.CharField(max_length=20, choices=ImportType.choices)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PREVIEWED
+    )
+    
+    # Validated at preview time
+    valid_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+    
+    # Commit progress; committed_rows is the resume point
+    committed_rows = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list)
+    error_message = models.TextField(blank=True)
+    # Time spent committing rows, summed over resumed runs
+    elapsed_seconds = models.FloatField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'import_jobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_import_type_display()} import #{self.pk} ({self.status})"
+    
+    @property
+    def progress(self):
+        if not self.valid_count:
+            return 100 if self.status == self.Status.COMPLETED else 0
+        return round(self.committed_rows * 100 / self.valid_count)
+    
+    @property
+    def rows_per_second(self):
+        if not self.elapsed_seconds:
+            return None
+        return round(self.success_count / self.elapsed_seconds, 1)
+
+
+class ImportRowFile(models.Model):
+    """
+    Valid or invalid rows of an ImportJob as a gzip JSON-lines file.
+    Kept in the database so the worker reads them wherever it runs; deleted
+    once they are no longer needed, as they hold personal data.
+    """
+    
+    class Kind(models.TextChoices):
+        VALID = 'valid', 'Valid rows'
+        INVALID = 'invalid', 'Invalid rows'
+    
+    job = models.ForeignKey(
+        ImportJob,
+        on_delete=models.CASCADE,
+        related_name='row_files'
+    )
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    data = models.BinaryField()
+    
+    class Meta:
+        db_table = 'import_row_files'
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'kind'], name='unique_import_row_file_kind')
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} of import #{self.job_id}"
@@ -0,0 +1,173 @@
+"""
+Utility functions for year-end student promotion.
+
+A promotion maps (class, section) sources to (class, section) targets, or
+marks them as graduating. Active students of every source are read once,
+then moved with one UPDATE per target and graduated with one UPDATE, all in
+a single transaction. Roll numbers are recalculated once per touched
+section at the end instead of through per-student signals.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Class, Section, Student
+from .roll_number_utils import recalculate_roll_numbers_for_sections
+
+
+# Student IDs per UPDATE ... WHERE id IN (...) statement
+PROMOTION_BATCH_SIZE = 1000
+
+
+class PromotionError(ValueError):
+    """Raised when a promotion mapping cannot be applied."""
+
+
+GRADUATE = 'graduate'
+
+
+def _resolve_moves(school, moves):
+    """
+    Resolve a promotion mapping into per-source rules.
+    
+    Each move is a dict with from_class and optional from_section, and
+    either graduate=True or to_class with optional to_section. When a
+    whole class moves without to_section, each section goes to the
+    section of the same name in the target class.
+    
+    Returns:
+        (rules, target_section) where rules maps (class_id, section_id or None)
+        to GRADUATE or (to_class_id, to_section_id or None), and
+        target_section(rule, section_id) gives the destination of a student
+    """
+    classes = {c.id: c for c in Class.objects.filter(school=school)}
+    sections = {s.id: s for s in Section.objects.filter(school_class__school=school)}
+    sections_by_name = {(s.school_class_id, s.name.lower()): s.id for s in sections.values()}
+    
+    def get_class(class_id):
+        if class_id not in classes:
+            raise PromotionError(f'Class {class_id} not found.')
+        return classes[class_id]
+    
+    def check_section(section_id, school_class):
+        section = sections.get(section_id)
+        if not section or section.school_class_id != school_class.id:
+            raise PromotionError(f'Section {section_id} not found in {school_class.name}.')
+    
+    rules = {}
+    for move in moves:
+        from_class = get_class(move['from_class'])
+        from_section_id = move.get('from_section') or None
+        if from_section_id:
+            check_section(from_section_id, from_class)
+        
+        key = (from_class.id, from_section_id)
+        if key in rules:
+            raise PromotionError(f'{from_class.name} is mapped more than once.')
+        
+        if move.get('graduate'):
+            rules[key] = GRADUATE
+            continue
+        
+        to_class = get_class(move['to_class'])
+        to_section_id = move.get('to_section') or None
+        if to_section_id:
+            check_section(to_section_id, to_class)
+        rules[key] = (to_class.id, to_section_id)
+    
+    def target_section(rule, section_id):
+        to_class_id, to_section_id = rule
+        if to_section_id or section_id is None:
+            return to_class_id, to_section_id
+        # Whole-class move: keep the section name (5-A -> 6-A)
+        name = sections[section_id].name
+        target = sections_by_name.get((to_class_id, name.lower()))
+        if target is None:
+            raise PromotionError(f'Section {name} does not exist in {classes[to_class_id].name}.')
+        return to_class_id, target
+    
+    return rules, target_section
+
+
+def promote_students(school, academic_year, moves, dry_run=False, set_current=False):
+    """
+    Promote students into a new academic year.
+    
+    Args:
+        school: School instance
+        academic_year: Target AcademicYear instance
+        moves: List of move dicts (see _resolve_moves)
+        dry_run: Only report what would change
+        set_current: Make academic_year the current year
+    
+    Returns:
+        dict with per-target counts and totals
+    
+    Raises:
+        PromotionError: if the mapping is invalid
+    """
+    rules, target_section = _resolve_moves(school, moves)
+    
+    source_class_ids = {class_id for class_id, _ in rules}
+    students = Student.objects.filter(
+        school=school,
+        status=Student.Status.ACTIVE,
+        current_class_id__in=source_class_ids
+    ).order_by().values_list('id', 'current_class_id', 'current_section_id')
+    
+    # Snapshot every source first so chained moves (5 -> 6, 6 -> 7) move each student once
+    moved = defaultdict(list)
+    graduated = []
+    for student_id, class_id, section_id in students:
+        # A section-specific rule overrides the rule for its whole class
+        rule = rules.get((class_id, section_id)) or rules.get((class_id, None))
+        if rule is None:
+            continue
+        if rule == GRADUATE:
+            graduated.append((student_id, section_id))
+        else:
+            moved[target_section(rule, section_id)].append((student_id, section_id))
+    
+    # Sections that lose or gain students
+    source_sections = {section_id for rows in [*moved.values(), graduated] for _, section_id in rows}
+    target_sections = {section_id for _, section_id in moved}
+    touched_sections = (source_sections | target_sections) - {None}
+    
+    summary = {
+        'academic_year': academic_year.name,
+        'dry_run': dry_run,
+        'promoted': sum(len(rows) for rows in moved.values()),
+        'graduated': len(graduated),
+        'sections_renumbered': len(touched_sections),
+        'moves': [
+            {'to_class': class_id, 'to_section': section_id, 'count': len(rows)}
+            for (class_id, section_id), rows in moved.items()
+        ],
+    }
+    if dry_run:
+        return summary
+    
+    with transaction.atomic():
+        for (class_id, section_id), rows in moved.items():
+            _update_in_batches(
+                [student_id for student_id, _ in rows],
+                current_class_id=class_id, current_section_id=section_id
+            )
+        _update_in_batches(
+            [student_id for student_id, _ in graduated],
+            status=Student.Status.GRADUATED, roll_number=None
+        )
+        recalculate_roll_numbers_for_sections(touched_sections)
+        
+        if set_current:
+            academic_year.is_current = True
+            academic_year.save()
+    
+    return summary
+
+
+def _update_in_batches(student_ids, **values):
+    for start in range(0, len(student_ids), PROMOTION_BATCH_SIZE):
+        Student.objects.filter(
+            id__in=student_ids[start:start + PROMOTION_BATCH_SIZE]
+        ).update(**values)
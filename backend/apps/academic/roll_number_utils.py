@@ -2,9 +2,23 @@
 Utility functions for automatic roll number assignment.
 Roll numbers are assigned alphabetically within a Class + Section.
 """
+import threading
+import weakref
+from contextlib import contextmanager
+
 from django.db import transaction
 
 
+ROLL_NUMBER_BATCH_SIZE = 500
+
+_deferred = threading.local()
+
+# Recalculation waiting for the current transaction to commit, per database
+# alias. Values are weak references: Django drops the on_commit callbacks of a
+# rolled back transaction or savepoint, and the entry goes with them.
+_queued = threading.local()
+
+
 def get_sort_key(student):
     """
     Generate sort key for lexicographical ordering.
@@ -26,31 +40,130 @@ def recalculate_roll_numbers(section, academic_year=None):
     Returns:
         dict with count of updated students
     """
+    return recalculate_roll_numbers_for_sections([section.pk])[section.pk]
+
+
+def recalculate_roll_numbers_for_sections(section_ids):
+    """
+    Recalculate roll numbers for several sections at once.
+    
+    Loads the active students of every section in one query and writes the
+    changed roll numbers with a single bulk_update, which does not fire
+    pre_save/post_save for the updated students.
+    
+    Args:
+        section_ids: Iterable of Section IDs
+    
+    Returns:
+        dict of section_id -> {'total_students', 'updated_count'}
+    """
     from .models import Student
     
-    # Get all active students in this section
+    section_ids = {section_id for section_id in section_ids if section_id}
+    students_by_section = {section_id: [] for section_id in section_ids}
+    if not section_ids:
+        return students_by_section
+    
     students = Student.objects.filter(
-        current_section=section,
+        current_section_id__in=section_ids,
         status='active'
-    ).select_related('user')
-    
-    # Sort students alphabetically by first name, then last name
-    sorted_students = sorted(students, key=get_sort_key)
+    ).select_related('user').order_by().only(
+        'roll_number', 'current_section', 'user__first_name', 'user__last_name'
+    )
+    for student in students:
+        students_by_section[student.current_section_id].append(student)
     
-    # Assign roll numbers sequentially
-    updated_count = 0
-    with transaction.atomic():
-        for index, student in enumerate(sorted_students, start=1):
+    results = {}
+    changed = []
+    for section_id, section_students in students_by_section.items():
+        # Sort students alphabetically by first name, then last name
+        section_students.sort(key=get_sort_key)
+        updated_count = 0
+        for index, student in enumerate(section_students, start=1):
             new_roll = str(index)
             if student.roll_number != new_roll:
                 student.roll_number = new_roll
-                student.save(update_fields=['roll_number'])
+                changed.append(student)
                 updated_count += 1
+        results[section_id] = {
+            'total_students': len(section_students),
+            'updated_count': updated_count
+        }
+    
+    if changed:
+        Student.objects.bulk_update(changed, ['roll_number'], batch_size=ROLL_NUMBER_BATCH_SIZE)
     
-    return {
-        'total_students': len(sorted_students),
-        'updated_count': updated_count
-    }
+    return results
+
+
+class RollNumberRecalculation:
+    """on_commit callback that recalculates every section queued in a transaction."""
+    
+    def __init__(self, alias):
+        self.alias = alias
+        self.section_ids = set()
+    
+    def __call__(self):
+        queued = _queued_recalculations()
+        if queued.get(self.alias) is self:
+            del queued[self.alias]
+        recalculate_roll_numbers_for_sections(self.section_ids)
+
+
+def _queued_recalculations():
+    if not hasattr(_queued, 'recalculations'):
+        _queued.recalculations = weakref.WeakValueDictionary()
+    return _queued.recalculations
+
+
+def schedule_roll_number_recalculation(*section_ids, using=None):
+    """
+    Queue roll number recalculation for sections.
+    
+    Inside deferred_roll_numbers() the sections are collected until the block
+    exits. Inside a transaction they are coalesced into a single recalculation
+    that runs on commit. Otherwise they are recalculated immediately.
+    """
+    section_ids = {section_id for section_id in section_ids if section_id}
+    if not section_ids:
+        return
+    
+    pending = getattr(_deferred, 'section_ids', None)
+    if pending is not None:
+        pending.update(section_ids)
+        return
+    
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        recalculate_roll_numbers_for_sections(section_ids)
+        return
+    
+    queued = _queued_recalculations()
+    recalculation = queued.get(connection.alias)
+    if recalculation is None:
+        recalculation = queued[connection.alias] = RollNumberRecalculation(connection.alias)
+        transaction.on_commit(recalculation, using=using)
+    recalculation.section_ids.update(section_ids)
+
+
+@contextmanager
+def deferred_roll_numbers():
+    """
+    Collect roll number recalculations made inside the block and apply them
+    once per section on exit, e.g. around bulk imports and promotions.
+    """
+    if getattr(_deferred, 'section_ids', None) is not None:
+        # Nested block: the outermost one applies the changes
+        yield
+        return
+    
+    _deferred.section_ids = set()
+    try:
+        yield
+    finally:
+        section_ids = _deferred.section_ids
+        _deferred.section_ids = None
+        schedule_roll_number_recalculation(*section_ids)
 
 
 def recalculate_roll_numbers_for_class(school_class):
@@ -63,10 +176,9 @@ def recalculate_roll_numbers_for_class(school_class):
     Returns:
         dict with results per section
     """
-    results = {}
-    for section in school_class.sections.all():
-        results[section.name] = recalculate_roll_numbers(section)
-    return results
+    sections = dict(school_class.sections.values_list('id', 'name'))
+    results = recalculate_roll_numbers_for_sections(sections)
+    return {sections[section_id]: result for section_id, result in results.items()}
 
 
 def assign_roll_number_for_student(student):
@@ -102,10 +214,8 @@ def handle_student_section_change(student, old_section, new_section):
         old_section: Previous Section instance (can be None)
         new_section: New Section instance (can be None)
     """
-    # Recalculate for old section (student was removed)
-    if old_section:
-        recalculate_roll_numbers(old_section)
-    
-    # Recalculate for new section (student was added)
-    if new_section:
-        recalculate_roll_numbers(new_section)
+    # Old section lost the student, new section gained them
+    schedule_roll_number_recalculation(
+        old_section.pk if old_section else None,
+        new_section.pk if new_section else None
+    )
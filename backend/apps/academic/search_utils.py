@@ -0,0 +1,87 @@
+"""
+Student search for the front desk.
+
+Each student stores a normalized search_text (lowercased first and last
+name, admission number and parent phone), so a lookup is a substring match
+on one column of the students table instead of an OR across joined tables.
+On PostgreSQL the column has a pg_trgm GIN index that serves LIKE '%term%';
+on SQLite the (school, search_text) index lets the scan read the index
+instead of the table. Admission and roll numbers are also looked up exactly.
+"""
+import re
+
+from django.db.models import Q
+
+
+STUDENT_SEARCH_LIMIT = 20
+MIN_SEARCH_LENGTH = 2
+
+# Phone numbers and numeric IDs are matched without separators ("98765-43210")
+_NUMBER_LIKE = re.compile(r'^[\d()+\-./]+$')
+
+
+def _normalize_token(token):
+    if _NUMBER_LIKE.match(token):
+        return re.sub(r'\D', '', token)
+    return token
+
+
+def normalize_search_text(*values):
+    """Lowercase, whitespace-separated tokens of the given values."""
+    text = ' '.join(str(value) for value in values if value).lower()
+    return ' '.join(filter(None, (_normalize_token(token) for token in text.split())))
+
+
+def student_search_text(first_name, last_name, admission_number, parent_phone):
+    """Value stored in Student.search_text; starts with the name so it also sorts by name."""
+    return normalize_search_text(first_name, last_name, admission_number, parent_phone)
+
+
+def search_students(school, query, limit=STUDENT_SEARCH_LIMIT):
+    """
+    Return the top matches for a free-text query within a school.
+    
+    Students whose admission number, then roll number, equals the query come
+    first (both are index lookups), followed by students whose search text
+    contains every query token, in name order. Ordering by search_text lets
+    the database walk the (school, search_text) index and stop at the limit
+    instead of sorting every match.
+    
+    Args:
+        school: School instance
+        query: Text typed by the user
+        limit: Maximum number of students returned
+    
+    Returns:
+        List of Student instances with user, class and section loaded
+    """
+    from .models import Student
+    
+    query = query.strip()
+    terms = normalize_search_text(query).split()
+    if len(query) < MIN_SEARCH_LENGTH or not terms:
+        return []
+    
+    students = Student.objects.filter(school=school).select_related(
+        'user', 'current_class', 'current_section'
+    ).order_by('search_text')
+    
+    exact = []
+    if len(terms) == 1:
+        # Unordered, separate lookups so each uses its (school, ...) index; ordering
+        # by search_text or OR-ing them makes SQLite walk every student instead
+        exact = list(students.filter(admission_number__in={query, query.upper()}).order_by())
+        # Every section has a student with a given roll number: pick the first by name
+        # from (id, search_text) pairs and load only those
+        by_roll_number = sorted(
+            Student.objects.filter(school=school, roll_number=query)
+            .exclude(id__in=[student.id for student in exact])
+            .order_by().values_list('search_text', 'id')
+        )[:limit - len(exact)]
+        exact += students.filter(id__in=[student_id for _, student_id in by_roll_number])
+    
+    contains = Q()
+    for term in terms:
+        contains &= Q(search_text__contains=term)
+    rest = students.filter(contains).exclude(id__in=[student.id for student in exact])
+    return exact + list(rest[:limit - len(exact)])
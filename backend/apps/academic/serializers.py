@@ -1,13 +1,16 @@
 """
 Serializers for Academic management.
 """
+import os
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Prefetch
 
 from .models import (
     AcademicYear, Class, Section, Subject,
-    Teacher, ClassTeacher, SubjectTeacher, Student
+    Teacher, ClassTeacher, SubjectTeacher, Student, ImportJob, MaterialUpload
 )
 
 User = get_user_model()
@@ -30,6 +33,9 @@ class SectionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
     
     def get_student_count(self, obj):
+        # Annotated by the viewset querysets; count directly for a single new section
+        if hasattr(obj, 'active_student_count'):
+            return obj.active_student_count
         return obj.students.filter(status='active').count()
 
 
@@ -51,6 +57,8 @@ class ClassSerializer(serializers.ModelSerializer):
         return value
     
     def get_student_count(self, obj):
+        if hasattr(obj, 'active_student_count'):
+            return obj.active_student_count
         return Student.objects.filter(current_class=obj, status='active').count()
 
 
@@ -90,6 +98,24 @@ class TeacherListSerializer(serializers.ModelSerializer):
         return [{'id': s.id, 'name': s.name} for s in obj.subjects.all()]
 
 
+def teacher_detail_prefetches():
+    """
+    Prefetches for TeacherSerializer, so serializing any number of teachers
+    takes a fixed number of queries.
+    """
+    return [
+        Prefetch('subjects', queryset=Subject.objects.prefetch_related('classes')),
+        Prefetch(
+            'class_teacher_of',
+            queryset=ClassTeacher.objects.select_related('section__school_class').order_by('id')
+        ),
+        Prefetch(
+            'subject_assignments',
+            queryset=SubjectTeacher.objects.select_related('section__school_class', 'subject')
+        ),
+    ]
+
+
 class TeacherSerializer(serializers.ModelSerializer):
     """Full teacher serializer."""
     full_name = serializers.CharField(read_only=True)
@@ -113,7 +139,8 @@ class TeacherSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user']
     
     def get_class_teacher_of(self, obj):
-        assignment = obj.class_teacher_of.first()
+        # all() reads the prefetched assignments (first() would query again)
+        assignment = next(iter(obj.class_teacher_of.all()), None)
         if assignment:
             return {
                 'section_id': assignment.section.id,
@@ -122,7 +149,7 @@ class TeacherSerializer(serializers.ModelSerializer):
         return None
     
     def get_subject_assignments_data(self, obj):
-        assignments = obj.subject_assignments.select_related('section', 'subject')
+        assignments = obj.subject_assignments.all()
         return [{
             'section': str(a.section),
             'subject': a.subject.name
@@ -371,6 +398,33 @@ class SubjectTeacherSerializer(serializers.ModelSerializer):
         return str(obj.section)
 
 
+class BulkSubjectTeacherRowSerializer(serializers.Serializer):
+    section = serializers.IntegerField()
+    subject = serializers.IntegerField()
+    teacher = serializers.IntegerField()
+
+
+class BulkClassTeacherRowSerializer(serializers.Serializer):
+    section = serializers.IntegerField()
+    teacher = serializers.IntegerField()
+
+
+class BulkAssignmentSerializer(serializers.Serializer):
+    """
+    Serializer for bulk assignment requests.
+    Rows hold plain IDs; they are checked against one snapshot in assignment_utils.
+    """
+    academic_year = serializers.IntegerField(required=False)
+    subject_teachers = BulkSubjectTeacherRowSerializer(many=True, required=False, default=list)
+    class_teachers = BulkClassTeacherRowSerializer(many=True, required=False, default=list)
+
+
+class CopyAssignmentsSerializer(serializers.Serializer):
+    """Serializer for copying a year's assignments forward."""
+    from_year = serializers.IntegerField()
+    to_year = serializers.IntegerField()
+
+
 class SchoolDashboardSerializer(serializers.Serializer):
     """Serializer for school admin dashboard stats."""
     total_students = serializers.IntegerField()
@@ -380,20 +434,114 @@ class SchoolDashboardSerializer(serializers.Serializer):
     pending_fees = serializers.DecimalField(max_digits=12, decimal_places=2)
 
 
+class PromotionMoveSerializer(serializers.Serializer):
+    """One source of a year-end promotion and where its students go."""
+    from_class = serializers.IntegerField()
+    from_section = serializers.IntegerField(required=False, allow_null=True)
+    to_class = serializers.IntegerField(required=False, allow_null=True)
+    to_section = serializers.IntegerField(required=False, allow_null=True)
+    graduate = serializers.BooleanField(default=False)
+    
+    def validate(self, data):
+        if data['graduate'] and data.get('to_class'):
+            raise serializers.ValidationError('A graduating class cannot have a target class.')
+        if not data['graduate'] and not data.get('to_class'):
+            raise serializers.ValidationError('Either to_class or graduate is required.')
+        return data
+
+
+class PromotionSerializer(serializers.Serializer):
+    """Serializer for year-end promotion requests."""
+    moves = PromotionMoveSerializer(many=True, allow_empty=False)
+    dry_run = serializers.BooleanField(default=False)
+    set_current = serializers.BooleanField(default=False)
+
+
 class StudyMaterialSerializer(serializers.ModelSerializer):
     """Serializer for Study Materials."""
     section_name = serializers.CharField(source='section.name', read_only=True)
     batch_name = serializers.CharField(source='section.school_class.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+    download_url = serializers.SerializerMethodField()
     
     class Meta:
         from .models import StudyMaterial
         model = StudyMaterial
         fields = [
-            'id', 'title', 'description', 'file', 
+            'id', 'title', 'description', 'file', 'download_url',
             'section', 'section_name', 'batch_name', 
             'subject', 'subject_name', 
-            'created_at', 'created_by_name'
+            'created_at', 'updated_at', 'created_by_name'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at', 'created_by']
+    
+    def get_download_url(self, obj):
+        from .material_uploads import signed_file_url
+        return signed_file_url(obj.file)
+
+
+class MaterialUploadSerializer(serializers.ModelSerializer):
+    """Serializer for chunked study material upload sessions."""
+    chunk_size = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = MaterialUpload
+        fields = [
+            'id', 'title', 'description', 'section', 'subject',
+            'file_name', 'total_size', 'received_bytes', 'chunk_size',
+            'status', 'material', 'error_message', 'created_at'
+        ]
+        read_only_fields = ['id', 'received_bytes', 'status', 'material', 'error_message', 'created_at']
+    
+    def get_chunk_size(self, obj):
+        from .material_uploads import MATERIAL_UPLOAD_CHUNK_SIZE
+        return MATERIAL_UPLOAD_CHUNK_SIZE
+    
+    def validate_file_name(self, value):
+        name = os.path.basename(value.replace('\\', '/')).strip()
+        if not name:
+            raise serializers.ValidationError('Invalid file name.')
+        return name
+    
+    def validate_total_size(self, value):
+        from .material_uploads import MATERIAL_UPLOAD_MAX_SIZE
+        if not 0 < value <= MATERIAL_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'File size must be between 1 and {MATERIAL_UPLOAD_MAX_SIZE} bytes.')
+        return value
+    
+    def validate(self, attrs):
+        school = self.context['request'].user.school
+        section = attrs.get('section')
+        if section and section.school_class.school_id != school.id:
+            raise serializers.ValidationError({'section': 'Section not found.'})
+        subject = attrs.get('subject')
+        if subject and subject.school_id != school.id:
+            raise serializers.ValidationError({'subject': 'Subject not found.'})
+        return attrs
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Serializer for bulk import job status and results."""
+    skipped_count = serializers.IntegerField(source='invalid_count', read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+    rows_per_second = serializers.FloatField(read_only=True)
+    message = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'import_type', 'status', 'progress', 'message',
+            'valid_count', 'skipped_count', 'committed_rows',
+            'success_count', 'error_count', 'errors', 'error_message',
+            'elapsed_seconds', 'rows_per_second',
+            'created_at', 'started_at', 'completed_at'
         ]
-        read_only_fields = ['id', 'created_at', 'created_by']
+        read_only_fields = fields
+    
+    def get_message(self, obj):
+        if obj.status == ImportJob.Status.COMPLETED:
+            return f"Import completed. {obj.success_count} {obj.import_type} created."
+        if obj.status == ImportJob.Status.FAILED:
+            return f"Import failed after {obj.committed_rows} of {obj.valid_count} rows."
+        return f"Import {obj.status}."
@@ -1,81 +1,83 @@
 """
 Django signals for the academic app.
-Handles automatic roll number assignment on student changes.
+Handles automatic roll number assignment on student changes and keeps the
+cached current academic year and study material feeds in sync.
+
+Recalculation is queued per section and coalesced until the surrounding
+transaction commits (see roll_number_utils.schedule_roll_number_recalculation).
+Changes are detected in memory through FieldTrackerMixin, so no extra
+query is made before a save.
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
-# Store original values to detect changes
-_student_original_values = {}
-
-
-@receiver(pre_save, sender='academic.Student')
-def capture_student_original_values(sender, instance, **kwargs):
-    """Capture original values before save to detect changes."""
-    if instance.pk:
-        try:
-            original = sender.objects.select_related('user').get(pk=instance.pk)
-            _student_original_values[instance.pk] = {
-                'section_id': original.current_section_id,
-                'first_name': original.user.first_name,
-                'last_name': original.user.last_name,
-            }
-        except sender.DoesNotExist:
-            pass
-
-
 @receiver(post_save, sender='academic.Student')
 def handle_student_roll_number(sender, instance, created, **kwargs):
     """
     Recalculate roll numbers when:
     - A new student is added
-    - A student's name changes
     - A student changes section
+    - A student becomes active or inactive
     """
-    from .roll_number_utils import recalculate_roll_numbers, handle_student_section_change
+    from .roll_number_utils import schedule_roll_number_recalculation
     
     if created:
         # New student - recalculate for their section
-        if instance.current_section:
-            recalculate_roll_numbers(instance.current_section)
-    else:
-        # Existing student - check what changed
-        original = _student_original_values.pop(instance.pk, None)
-        if not original:
-            return
-        
-        old_section_id = original.get('section_id')
-        new_section_id = instance.current_section_id
-        
-        # Check if section changed
-        if old_section_id != new_section_id:
-            from .models import Section
-            old_section = Section.objects.filter(pk=old_section_id).first() if old_section_id else None
-            new_section = instance.current_section
-            handle_student_section_change(instance, old_section, new_section)
-        else:
-            # Check if name changed (requires recalculation for reordering)
-            name_changed = (
-                original.get('first_name') != instance.user.first_name or
-                original.get('last_name') != instance.user.last_name
-            )
-            if name_changed and instance.current_section:
-                recalculate_roll_numbers(instance.current_section)
+        schedule_roll_number_recalculation(instance.current_section_id)
+    elif instance.has_changed('current_section_id'):
+        schedule_roll_number_recalculation(
+            instance.get_original('current_section_id'),
+            instance.current_section_id
+        )
+    elif instance.has_changed('status'):
+        schedule_roll_number_recalculation(instance.current_section_id)
 
 
 @receiver(post_save, sender='accounts.User')
 def handle_user_name_change(sender, instance, created, **kwargs):
     """
     Handle name changes via User model.
-    This covers cases where user name is updated directly.
+    Names decide the alphabetical order of roll numbers within a section
+    and are part of the student's search text.
     """
-    if created:
+    if created or instance.role != instance.Role.STUDENT:
+        return
+    
+    if not (instance.has_changed('first_name') or instance.has_changed('last_name')):
         return
     
     # Check if this user has a student profile
     if hasattr(instance, 'student_profile'):
+        from .roll_number_utils import schedule_roll_number_recalculation
         student = instance.student_profile
-        if student.current_section:
-            from .roll_number_utils import recalculate_roll_numbers
-            recalculate_roll_numbers(student.current_section)
+        student.save(update_fields=['search_text'])
+        schedule_roll_number_recalculation(student.current_section_id)
+
+
+@receiver(post_save, sender='academic.AcademicYear')
+def handle_academic_year_save(sender, instance, created, **kwargs):
+    """Clear the cached current year when a year becomes, stops being or is the current one."""
+    if instance.is_current or instance.has_changed('is_current'):
+        from .academic_year_utils import clear_current_academic_year
+        clear_current_academic_year(instance.school_id)
+
+
+@receiver(post_delete, sender='academic.AcademicYear')
+def handle_academic_year_delete(sender, instance, **kwargs):
+    if instance.is_current:
+        from .academic_year_utils import clear_current_academic_year
+        clear_current_academic_year(instance.school_id)
+
+
+@receiver(post_save, sender='academic.StudyMaterial')
+def handle_study_material_save(sender, instance, **kwargs):
+    """Move the feeds of the material's section (old and new) to a new version."""
+    from .material_feed import schedule_feed_bump
+    schedule_feed_bump(instance.section_id, instance.get_original('section_id'))
+
+
+@receiver(post_delete, sender='academic.StudyMaterial')
+def handle_study_material_delete(sender, instance, **kwargs):
+    from .material_feed import schedule_feed_bump
+    schedule_feed_bump(instance.section_id)
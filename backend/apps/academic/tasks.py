@@ -0,0 +1,43 @@
+"""
+Celery tasks for academic background jobs.
+"""
+from celery import shared_task
+
+
+@shared_task
+def commit_import_job(job_id):
+    """
+    Commit the validated rows of an ImportJob.
+    Resumes from the last committed chunk when re-run after a failure.
+    """
+    from .import_jobs import run_import_job
+    from .models import ImportJob
+
+    try:
+        job = ImportJob.objects.select_related('school').get(id=job_id)
+    except ImportJob.DoesNotExist:
+        return f"Import job {job_id} not found."
+
+    job = run_import_job(job)
+    return (
+        f"Import job {job_id} {job.status}: "
+        f"{job.success_count} created, {job.error_count} errors."
+    )
+
+
+@shared_task
+def transfer_material_upload(upload_id):
+    """
+    Move an assembled MaterialUpload to media storage.
+    Failed transfers keep the received chunks and can be queued again.
+    """
+    from .material_uploads import run_material_transfer
+    from .models import MaterialUpload
+
+    try:
+        upload = MaterialUpload.objects.get(id=upload_id)
+    except MaterialUpload.DoesNotExist:
+        return f"Material upload {upload_id} not found."
+
+    upload = run_material_transfer(upload)
+    return f"Material upload {upload_id} {upload.status}."
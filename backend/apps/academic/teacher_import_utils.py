@@ -5,7 +5,10 @@ import csv
 import io
 from datetime import datetime
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.dateparse import parse_date
 
+from .import_files import iter_chunks
 from .models import Subject, Teacher
 
 User = get_user_model()
@@ -17,177 +20,166 @@ REQUIRED_COLUMNS = [
 
 OPTIONAL_COLUMNS = ['employee_id', 'qualification', 'date_of_joining', 'subjects']
 
+# Rows whose emails are checked against existing users with one email__in query
+EMAIL_LOOKUP_CHUNK_SIZE = 500
 
-def parse_teacher_csv(file_content, school):
-    """
-    Parse CSV file and validate each row for teacher import.
-    Returns dict with valid_rows and invalid_rows.
+
+def _existing_emails(rows):
+    """Emails from a chunk of import rows that already belong to a user."""
+    emails = {(row.get('email') or '').strip().lower() for _, row in rows} - {''}
+    return set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+
+
+def validate_teacher_rows(rows, school):
     """
-    valid_rows = []
-    invalid_rows = []
-    
-    # Decode if bytes
-    if isinstance(file_content, bytes):
-        file_content = file_content.decode('utf-8-sig')
+    Validate teacher import rows one at a time.
     
-    # Parse CSV
-    reader = csv.DictReader(io.StringIO(file_content))
-    
-    # Validate headers
-    headers = reader.fieldnames or []
-    missing_headers = [col for col in REQUIRED_COLUMNS if col not in headers]
-    if missing_headers:
-        return {
-            'error': f"Missing required columns: {', '.join(missing_headers)}",
-            'valid_rows': [],
-            'invalid_rows': []
-        }
+    Args:
+        rows: Iterable of (row_number, dict) pairs from open_import_file
+        school: School the teachers are imported into
     
+    Yields:
+        Row dicts with 'errors' for invalid rows or 'resolved' for valid ones
+    """
     # Cache subjects for this school
     subjects_cache = {s.name.lower(): s for s in Subject.objects.filter(school=school)}
     
-    # Get existing emails
-    existing_emails = set(
-        User.objects.values_list('email', flat=True)
-    )
-    
     # Track emails in this batch to detect duplicates
     batch_emails = set()
     
-    for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-        errors = []
-        
-        # Strip whitespace from all values
-        row = {k: v.strip() if v else '' for k, v in row.items()}
+    for chunk in iter_chunks(rows, EMAIL_LOOKUP_CHUNK_SIZE):
+        existing_emails = _existing_emails(chunk)
         
-        # Check required fields
-        for col in REQUIRED_COLUMNS:
-            if not row.get(col):
-                errors.append(f"'{col}' is required")
-        
-        # Skip further validation if basic fields missing
-        if errors:
-            invalid_rows.append({
-                'row_number': row_num,
-                'data': row,
-                'errors': errors
-            })
-            continue
-        
-        # Validate email format and uniqueness
-        email = row['email'].lower()
-        if '@' not in email:
-            errors.append("Invalid email format")
-        elif email in existing_emails:
-            errors.append(f"Email '{email}' already exists")
-        elif email in batch_emails:
-            errors.append(f"Duplicate email '{email}' in file")
-        
-        # Parse subjects (comma-separated)
-        subject_names = row.get('subjects', '')
-        resolved_subjects = []
-        if subject_names:
-            for sname in subject_names.split(','):
-                sname = sname.strip().lower()
-                if sname and sname in subjects_cache:
-                    resolved_subjects.append(subjects_cache[sname])
-                elif sname:
-                    errors.append(f"Subject '{sname}' not found")
-        
-        # Validate date of joining if provided
-        doj = row.get('date_of_joining', '')
-        parsed_doj = None
-        if doj:
-            try:
-                parsed_doj = datetime.strptime(doj, '%Y-%m-%d').date()
-            except ValueError:
-                errors.append("Date of joining must be in YYYY-MM-DD format")
-        
-        # Validate phone (must be exactly 10 digits)
-        phone = row.get('phone', '')
-        if phone:
-            import re
-            digits_only = re.sub(r'\D', '', phone)
-            if len(digits_only) != 10:
-                errors.append("Phone must be exactly 10 digits")
-        
-        if errors:
-            invalid_rows.append({
-                'row_number': row_num,
-                'data': row,
-                'errors': errors
-            })
-        else:
-            row['email_normalized'] = email
-            row['subjects_resolved'] = resolved_subjects
-            row['date_of_joining_parsed'] = parsed_doj
-            batch_emails.add(email)
-            valid_rows.append({
-                'row_number': row_num,
-                'data': row
-            })
-    
-    return {
-        'valid_rows': valid_rows,
-        'invalid_rows': invalid_rows
-    }
+        for row_num, row in chunk:
+            errors = []
+            
+            # Strip whitespace from all values
+            row = {k: v.strip() if v else '' for k, v in row.items()}
+            
+            # Check required fields
+            for col in REQUIRED_COLUMNS:
+                if not row.get(col):
+                    errors.append(f"'{col}' is required")
+            
+            # Skip further validation if basic fields missing
+            if errors:
+                yield {
+                    'row_number': row_num,
+                    'data': row,
+                    'errors': errors
+                }
+                continue
+            
+            # Validate email format and uniqueness
+            email = row['email'].lower()
+            if '@' not in email:
+                errors.append("Invalid email format")
+            elif email in existing_emails:
+                errors.append(f"Email '{email}' already exists")
+            elif email in batch_emails:
+                errors.append(f"Duplicate email '{email}' in file")
+            
+            # Parse subjects (comma-separated)
+            subject_names = row.get('subjects', '')
+            resolved_subjects = []
+            if subject_names:
+                for sname in subject_names.split(','):
+                    sname = sname.strip().lower()
+                    if sname and sname in subjects_cache:
+                        resolved_subjects.append(subjects_cache[sname])
+                    elif sname:
+                        errors.append(f"Subject '{sname}' not found")
+            
+            # Validate date of joining if provided
+            doj = row.get('date_of_joining', '')
+            parsed_doj = None
+            if doj:
+                try:
+                    parsed_doj = datetime.strptime(doj, '%Y-%m-%d').date()
+                except ValueError:
+                    errors.append("Date of joining must be in YYYY-MM-DD format")
+            
+            # Validate phone (must be exactly 10 digits)
+            phone = row.get('phone', '')
+            if phone:
+                import re
+                digits_only = re.sub(r'\D', '', phone)
+                if len(digits_only) != 10:
+                    errors.append("Phone must be exactly 10 digits")
+            
+            if errors:
+                yield {
+                    'row_number': row_num,
+                    'data': row,
+                    'errors': errors
+                }
+            else:
+                batch_emails.add(email)
+                yield {
+                    'row_number': row_num,
+                    'data': row,
+                    # Resolved references, JSON-safe so rows can be stored on an ImportJob
+                    'resolved': {
+                        'email': email,
+                        'subject_ids': [subject.id for subject in resolved_subjects],
+                        'date_of_joining': parsed_doj.isoformat() if parsed_doj else None
+                    }
+                }
 
 
-def create_teachers_from_rows(valid_rows, school):
+def commit_teacher_chunk(rows, school):
     """
-    Create teacher records from validated rows.
-    Returns success and error counts.
+    Create teachers for one chunk of validated rows.
+    Each row runs in its own savepoint so a failed row does not abort the chunk.
+    
+    Returns (created teachers, per-row errors).
     """
-    success_count = 0
-    error_count = 0
+    teachers = []
     errors = []
     
-    for row_info in valid_rows:
+    for row_info in rows:
         row = row_info['data']
+        resolved = row_info['resolved']
         row_num = row_info['row_number']
         
         try:
-            # Generate default password
-            default_password = f"Teacher@{row['first_name']}{row_num}"
-            
-            # Create user
-            user = User.objects.create_user(
-                email=row['email_normalized'],
-                password=default_password,
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                phone=row.get('phone', ''),
-                role='teacher',
-                school=school
-            )
-            
-            # Create teacher profile
-            teacher = Teacher.objects.create(
-                user=user,
-                school=school,
-                employee_id=row.get('employee_id', ''),
-                qualification=row.get('qualification', ''),
-                date_of_joining=row.get('date_of_joining_parsed')
-            )
-            
-            # Assign subjects
-            if row.get('subjects_resolved'):
-                teacher.subjects.set(row['subjects_resolved'])
-            
-            success_count += 1
+            with transaction.atomic():
+                # Generate default password
+                default_password = f"Teacher@{row['first_name']}{row_num}"
+                
+                # Create user
+                user = User.objects.create_user(
+                    email=resolved['email'],
+                    password=default_password,
+                    first_name=row['first_name'],
+                    last_name=row['last_name'],
+                    phone=row.get('phone', ''),
+                    role='teacher',
+                    school=school
+                )
+                
+                # Create teacher profile
+                teacher = Teacher.objects.create(
+                    user=user,
+                    school=school,
+                    employee_id=row.get('employee_id', ''),
+                    qualification=row.get('qualification', ''),
+                    date_of_joining=parse_date(resolved['date_of_joining'] or '')
+                )
+                
+                # Assign subjects
+                if resolved['subject_ids']:
+                    teacher.subjects.set(resolved['subject_ids'])
             
+            teachers.append(teacher)
+        
         except Exception as e:
-            error_count += 1
             errors.append({
                 'row_number': row_num,
                 'error': str(e)
             })
     
-    return {
-        'success_count': success_count,
-        'error_count': error_count,
-        'errors': errors
-    }
+    return teachers, errors
 
 
 def generate_teacher_sample_csv():
@@ -0,0 +1,1579 @@
+"""
+Tests for academic management.
+"""
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.academic.models import (
+    AcademicYear, Class, ClassTeacher, ImportJob, ImportRowFile, MaterialUpload, Section, Student,
+    StudyMaterial, Subject, SubjectTeacher, Teacher
+)
+from apps.academic.academic_year_utils import get_current_academic_year
+from apps.academic.bulk_import_utils import commit_student_chunk, hash_passwords
+from apps.academic.import_files import PREVIEW_PAGE_SIZE, read_rows
+from apps.academic.import_jobs import (
+    IMPORTERS, IMPORT_ROWS_RETENTION, STALE_IMPORT_JOB_TIMEOUT, row_data, run_import_job
+)
+from apps.academic.roll_number_utils import deferred_roll_numbers
+from apps.academic.search_utils import search_students, student_search_text
+from apps.academic.tasks import commit_import_job, transfer_material_upload
+from apps.schools.models import School
+
+User = get_user_model()
+
+
+class RollNumberTests(TestCase):
+    """Test cases for deferred roll number recalculation."""
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+            is_current=True
+        )
+        self.school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.section_a = Section.objects.create(school_class=self.school_class, name='A')
+        self.section_b = Section.objects.create(school_class=self.school_class, name='B')
+    
+    def _create_student(self, first_name, section):
+        user = User.objects.create_user(
+            email=f'{first_name.lower()}@test.com',
+            password='StudentPass123!',
+            first_name=first_name,
+            last_name='Test',
+            role='student',
+            school=self.school
+        )
+        return Student.objects.create(
+            user=user,
+            school=self.school,
+            admission_number=f'ADM-{first_name}',
+            current_class=self.school_class,
+            current_section=section
+        )
+    
+    def _roll_numbers(self, section):
+        return list(
+            Student.objects.filter(current_section=section)
+            .order_by('roll_number')
+            .values_list('user__first_name', 'roll_number')
+        )
+    
+    def test_recalculation_is_coalesced_until_commit(self):
+        """Test that creates in a transaction trigger a single recalculation on commit."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for name in ['Charlie', 'Alice', 'Bob']:
+                    self._create_student(name, self.section_a)
+                self.assertFalse(
+                    Student.objects.filter(roll_number__isnull=False).exists()
+                )
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            self._roll_numbers(self.section_a),
+            [('Alice', '1'), ('Bob', '2'), ('Charlie', '3')]
+        )
+    
+    def test_deferred_block_recalculates_each_section_once(self):
+        """Test that a deferred block runs one read and one bulk write for all sections."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            with deferred_roll_numbers():
+                self._create_student('Dave', self.section_a)
+                self._create_student('Carol', self.section_a)
+                self._create_student('Eve', self.section_b)
+        
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(2):
+            callbacks[0]()
+        self.assertEqual(self._roll_numbers(self.section_a), [('Carol', '1'), ('Dave', '2')])
+        self.assertEqual(self._roll_numbers(self.section_b), [('Eve', '1')])
+    
+    def test_rolled_back_recalculation_is_not_reused(self):
+        """Test that sections queued after a savepoint rollback get a new recalculation."""
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self._create_student('Alice', self.section_a)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self._create_student('Bob', self.section_a)
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._roll_numbers(self.section_a), [('Bob', '1')])
+    
+    def test_section_change_renumbers_both_sections(self):
+        """Test that moving a student renumbers the old and new section."""
+        with self.captureOnCommitCallbacks(execute=True):
+            alice = self._create_student('Alice', self.section_a)
+            self._create_student('Bob', self.section_a)
+            self._create_student('Zed', self.section_b)
+        
+        alice.current_section = self.section_b
+        with self.captureOnCommitCallbacks(execute=True):
+            alice.save()
+        
+        self.assertEqual(self._roll_numbers(self.section_a), [('Bob', '1')])
+        self.assertEqual(self._roll_numbers(self.section_b), [('Alice', '1'), ('Zed', '2')])
+    
+    def test_student_save_reads_no_original_values(self):
+        """Test that change detection happens in memory without an extra query."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_student('Alice', self.section_a)
+        
+        student = Student.objects.get(user__first_name='Alice')
+        student.parent_name = 'Parent'
+        with self.assertNumQueries(1):
+            student.save()
+        
+        student.current_section = self.section_b
+        self.assertEqual(student.changed_fields, ['current_section_id'])
+    
+    def test_user_rename_renumbers_section(self):
+        """Test that renaming a student's user reorders the section."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_student('Alice', self.section_a)
+            self._create_student('Bob', self.section_a)
+        
+        user = User.objects.get(first_name='Alice')
+        user.first_name = 'Zoe'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            user.save()
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._roll_numbers(self.section_a), [('Bob', '1'), ('Zoe', '2')])
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class TemporaryRootMixin:
+    """Point a file root setting at a temporary directory removed after the test class."""
+    
+    root_setting = None
+    
+    @classmethod
+    def setUpClass(cls):
+        root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, root, ignore_errors=True)
+        root_override = override_settings(**{cls.root_setting: root})
+        root_override.enable()
+        cls.addClassCleanup(root_override.disable)
+        super().setUpClass()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class StudentImportTests(TestCase):
+    """Test cases for bulk student import jobs."""
+    
+    preview_url = '/api/school/students/preview_import/'
+    confirm_url = '/api/school/students/confirm_import/'
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='User',
+            role='school_admin',
+            school=self.school
+        )
+        self.school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        Section.objects.create(school_class=self.school_class, name='A')
+        Section.objects.create(school_class=self.school_class, name='B')
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+    
+    def _csv(self, count):
+        lines = [
+            'admission_number,first_name,last_name,class,section,gender,'
+            'date_of_birth,parent_name,parent_phone'
+        ]
+        for i in range(count):
+            section = 'A' if i % 2 else 'B'
+            lines.append(
+                f'ADM-{i:04d},Student{count - i:04d},Test,Class 5,{section},'
+                f'female,2012-05-15,Parent,9876543210'
+            )
+        return SimpleUploadedFile('students.csv', '\n'.join(lines).encode(), content_type='text/csv')
+    
+    def _preview(self, count):
+        return self.client.post(self.preview_url, {'file': self._csv(count)}, format='multipart')
+    
+    def _import(self, count):
+        """Preview, confirm and run the queued commit task in-process."""
+        job_id = self._preview(count).data['job_id']
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.confirm_url, {'job_id': job_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(callbacks), 1)
+        commit_import_job.apply(args=[job_id])
+        return ImportJob.objects.get(id=job_id)
+    
+    def test_preview_stores_validated_rows(self):
+        """Test that preview parses the file once into an ImportJob."""
+        response = self._preview(3)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['valid_count'], 3)
+        self.assertNotIn('resolved', response.data['valid_rows'][0])
+        job = ImportJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, ImportJob.Status.PREVIEWED)
+        self.assertEqual(len(list(read_rows(row_data(job, ImportRowFile.Kind.VALID)))), 3)
+        self.assertEqual(job.row_files.count(), 2)
+    
+    def test_preview_rows_are_paginated(self):
+        """Test that stored rows are served a page at a time."""
+        job_id = self._preview(PREVIEW_PAGE_SIZE + 5).data['job_id']
+        
+        response = self.client.get(f'/api/school/import-jobs/{job_id}/rows/', {'page': 2})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], PREVIEW_PAGE_SIZE + 5)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['row_number'], PREVIEW_PAGE_SIZE + 2)
+    
+    def test_xlsx_preview(self):
+        """Test that XLSX uploads are read with typed cells normalised to text."""
+        from openpyxl import Workbook
+        
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append([
+            'admission_number', 'first_name', 'last_name', 'class', 'section',
+            'gender', 'date_of_birth', 'parent_name', 'parent_phone'
+        ])
+        sheet.append(['ADM-1', 'Asha', 'Rao', 'Class 5', 'A', 'female', date(2012, 5, 15), 'Parent', 9876543210])
+        sheet.append([None] * 9)
+        sheet.append(['ADM-2', 'Ravi', 'Rao', 'Class 9', 'A', 'male', '2012-05-15', 'Parent', '9876543210'])
+        content = io.BytesIO()
+        workbook.save(content)
+        
+        upload = SimpleUploadedFile('students.xlsx', content.getvalue())
+        response = self.client.post(self.preview_url, {'file': upload}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['valid_count'], 1)
+        self.assertEqual(response.data['valid_rows'][0]['data']['date_of_birth'], '2012-05-15')
+        self.assertEqual(response.data['invalid_rows'][0]['row_number'], 4)
+    
+    def test_import_creates_students_with_roll_numbers(self):
+        """Test that imported students get passwords and per-section roll numbers."""
+        job = self._import(6)
+        
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual(job.success_count, 6)
+        self.assertEqual(job.progress, 100)
+        self.assertFalse(job.row_files.exists())
+        
+        student = Student.objects.select_related('user').get(admission_number='ADM-0000')
+        self.assertTrue(student.user.check_password('Student@ADM-0000'))
+        self.assertEqual(
+            list(
+                Student.objects.filter(current_section__name='A')
+                .order_by('roll_number').values_list('user__first_name', 'roll_number')
+            ),
+            [('Student0001', '1'), ('Student0003', '2'), ('Student0005', '3')]
+        )
+    
+    def test_import_records_throughput(self):
+        """Test that the job reports its commit time and rows per second."""
+        job = self._import(4)
+        
+        self.assertGreater(job.elapsed_seconds, 0)
+        self.assertEqual(job.rows_per_second, round(4 / job.elapsed_seconds, 1))
+        response = self.client.get(f'/api/school/import-jobs/{job.id}/')
+        self.assertEqual(response.data['rows_per_second'], job.rows_per_second)
+    
+    def test_import_query_count_does_not_grow_with_rows(self):
+        """Test that inserts are batched rather than issued per row."""
+        with CaptureQueriesContext(connection) as small:
+            self._import(5)
+        Student.objects.all().delete()
+        User.objects.filter(role='student').delete()
+        with CaptureQueriesContext(connection) as large:
+            self._import(50)
+        
+        self.assertEqual(Student.objects.count(), 50)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+    
+    def test_existing_email_gets_unique_suffix(self):
+        """Test that a taken generated email falls back to the row-number variant."""
+        User.objects.create_user(
+            email='adm-0000@tst001.student', password='x',
+            first_name='Old', last_name='User', school=self.school
+        )
+        job = self._import(1)
+        
+        self.assertEqual(job.success_count, 1)
+        self.assertTrue(User.objects.filter(email='adm-0000_2@tst001.student').exists())
+    
+    def test_failed_job_resumes_from_last_committed_chunk(self):
+        """Test that a failed job keeps committed chunks and resumes after them."""
+        job = ImportJob.objects.get(id=self._preview(5).data['job_id'])
+        job.status = ImportJob.Status.QUEUED
+        job.save()
+        
+        calls = []
+        
+        def failing_commit(rows, school):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError('worker lost')
+            return commit_student_chunk(rows, school)
+        
+        importer = {**IMPORTERS[ImportJob.ImportType.STUDENTS], 'commit_chunk': failing_commit}
+        with mock.patch.dict(IMPORTERS, {ImportJob.ImportType.STUDENTS: importer}):
+            job = run_import_job(job, chunk_size=2)
+        
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertEqual(job.committed_rows, 2)
+        self.assertEqual(Student.objects.count(), 2)
+        self.assertEqual(list(job.row_files.values_list('kind', flat=True)), [ImportRowFile.Kind.VALID])
+        
+        response = self.client.post(f'/api/school/import-jobs/{job.id}/resume/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = run_import_job(job, chunk_size=2)
+        
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual(job.success_count, 5)
+        self.assertEqual(Student.objects.count(), 5)
+        self.assertEqual(
+            set(Student.objects.values_list('roll_number', flat=True)), {'1', '2', '3'}
+        )
+    
+    def test_stalled_running_job_can_be_resumed(self):
+        """Test that a running job left by a lost worker is reclaimed after the timeout."""
+        job = ImportJob.objects.get(id=self._preview(5).data['job_id'])
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.Status.RUNNING, committed_rows=0, updated_at=timezone.now()
+        )
+        
+        response = self.client.post(f'/api/school/import-jobs/{job.id}/resume/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        job = run_import_job(job)
+        self.assertEqual(Student.objects.count(), 0)
+        
+        ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - STALE_IMPORT_JOB_TIMEOUT)
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(f'/api/school/import-jobs/{job.id}/resume/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = run_import_job(job)
+        
+        self.assertEqual(job.status, ImportJob.Status.COMPLETED)
+        self.assertEqual(Student.objects.count(), 5)
+    
+    def test_reclaimed_job_stops_the_stalled_worker(self):
+        """Test that a worker whose job was reclaimed commits no further chunks."""
+        job = ImportJob.objects.get(id=self._preview(5).data['job_id'])
+        job.status = ImportJob.Status.QUEUED
+        job.save()
+        
+        def reclaiming_commit(rows, school):
+            # Another worker resumes the job while this one is committing
+            ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.Status.QUEUED)
+            return commit_student_chunk(rows, school)
+        
+        importer = {**IMPORTERS[ImportJob.ImportType.STUDENTS], 'commit_chunk': reclaiming_commit}
+        with mock.patch.dict(IMPORTERS, {ImportJob.ImportType.STUDENTS: importer}):
+            job = run_import_job(job, chunk_size=2)
+        
+        self.assertEqual(job.status, ImportJob.Status.QUEUED)
+        self.assertEqual(Student.objects.count(), 2)
+    
+    def test_unfinished_jobs_expire_with_their_rows(self):
+        """Test that jobs left unfinished past the retention lose their stored rows."""
+        abandoned = ImportJob.objects.get(id=self._preview(2).data['job_id'])
+        recent = ImportJob.objects.get(id=self._preview(2).data['job_id'])
+        ImportJob.objects.filter(pk=abandoned.pk).update(
+            updated_at=timezone.now() - IMPORT_ROWS_RETENTION - timedelta(minutes=1)
+        )
+        
+        call_command('expire_import_jobs', stdout=io.StringIO())
+        
+        abandoned.refresh_from_db()
+        self.assertEqual(abandoned.status, ImportJob.Status.EXPIRED)
+        self.assertFalse(abandoned.row_files.exists())
+        self.assertEqual(recent.row_files.count(), 2)
+        response = self.client.post(self.confirm_url, {'job_id': abandoned.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(IMPORT_HASH_WORKERS=2)
+    def test_parallel_hashing_matches_serial(self):
+        """Test that process pool hashing produces verifiable hashes."""
+        from django.contrib.auth.hashers import check_password
+        
+        passwords = [f'Student@ADM-{i}' for i in range(20)]
+        hashes = hash_passwords(passwords)
+        
+        self.assertEqual(len(hashes), 20)
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TeacherImportTests(TestCase):
+    """Test cases for teacher import validation."""
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.other_school = School.objects.create(name='Other School', code='OTH001')
+        User.objects.create_user(
+            email='taken@school.com', password='x',
+            first_name='Taken', last_name='User', role='teacher', school=self.other_school
+        )
+    
+    def test_only_emails_in_file_are_looked_up(self):
+        """Test that existing emails are checked with email__in rather than loading all users."""
+        from apps.academic.teacher_import_utils import validate_teacher_rows
+        
+        rows = [
+            (2, {'email': 'Taken@school.com', 'first_name': 'A', 'last_name': 'B', 'phone': '9876543210'}),
+            (3, {'email': 'new@school.com', 'first_name': 'C', 'last_name': 'D', 'phone': '9876543210'}),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            results = list(validate_teacher_rows(rows, self.school))
+        
+        self.assertIn('already exists', results[0]['errors'][0])
+        self.assertEqual(results[1]['resolved']['email'], 'new@school.com')
+        user_queries = [q['sql'] for q in queries.captured_queries if '"users"' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertIn(' IN ', user_queries[0])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class PromotionTests(TestCase):
+    """Test cases for year-end promotion."""
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='User',
+            role='school_admin',
+            school=self.school
+        )
+        AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+            is_current=True
+        )
+        self.next_year = AcademicYear.objects.create(
+            school=self.school, name='2025-26',
+            start_date=date(2025, 4, 1), end_date=date(2026, 3, 31)
+        )
+        self.sections = {}
+        for numeric_value in (5, 6, 7):
+            school_class = Class.objects.create(
+                school=self.school, name=f'Class {numeric_value}', numeric_value=numeric_value
+            )
+            for name in ('A', 'B'):
+                self.sections[(numeric_value, name)] = Section.objects.create(
+                    school_class=school_class, name=name
+                )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            for numeric_value, name, first_name in [
+                (5, 'A', 'Zara'), (5, 'A', 'Adam'), (5, 'B', 'Mia'),
+                (6, 'A', 'Liam'), (6, 'B', 'Noah'), (7, 'A', 'Olivia'),
+            ]:
+                self._create_student(first_name, self.sections[(numeric_value, name)])
+        
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+    
+    def _create_student(self, first_name, section):
+        user = User.objects.create_user(
+            email=f'{first_name.lower()}@test.com',
+            password='StudentPass123!',
+            first_name=first_name,
+            last_name='Test',
+            role='student',
+            school=self.school
+        )
+        return Student.objects.create(
+            user=user,
+            school=self.school,
+            admission_number=f'ADM-{first_name}',
+            current_class=section.school_class,
+            current_section=section
+        )
+    
+    def _class_id(self, numeric_value):
+        return self.sections[(numeric_value, 'A')].school_class_id
+    
+    def _moves(self):
+        return [
+            {'from_class': self._class_id(5), 'to_class': self._class_id(6)},
+            {'from_class': self._class_id(6), 'to_class': self._class_id(7)},
+            {'from_class': self._class_id(7), 'graduate': True},
+        ]
+    
+    def _promote(self, **data):
+        return self.client.post(
+            f'/api/school/academic-years/{self.next_year.id}/promote/',
+            {'moves': self._moves(), **data}, format='json'
+        )
+    
+    def _roster(self, numeric_value, name):
+        return list(
+            Student.objects.filter(
+                current_section=self.sections[(numeric_value, name)], status=Student.Status.ACTIVE
+            )
+            .order_by('roll_number')
+            .values_list('user__first_name', 'roll_number')
+        )
+    
+    def test_chained_moves_promote_each_student_once(self):
+        """Test that 5 -> 6 -> 7 moves every student exactly one class up by section name."""
+        response = self._promote(set_current=True)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['promoted'], 5)
+        self.assertEqual(response.data['graduated'], 1)
+        self.assertEqual(self._roster(6, 'A'), [('Adam', '1'), ('Zara', '2')])
+        self.assertEqual(self._roster(6, 'B'), [('Mia', '1')])
+        self.assertEqual(self._roster(7, 'A'), [('Liam', '1')])
+        self.assertEqual(self._roster(7, 'B'), [('Noah', '1')])
+        self.assertEqual(self._roster(5, 'A'), [])
+        
+        olivia = Student.objects.get(user__first_name='Olivia')
+        self.assertEqual(olivia.status, Student.Status.GRADUATED)
+        self.assertIsNone(olivia.roll_number)
+        
+        self.next_year.refresh_from_db()
+        self.assertTrue(self.next_year.is_current)
+    
+    def test_dry_run_reports_without_saving(self):
+        """Test that a dry run returns the counts and changes nothing."""
+        response = self._promote(dry_run=True)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual(response.data['promoted'], 5)
+        self.assertEqual(self._roster(5, 'A'), [('Adam', '1'), ('Zara', '2')])
+        self.next_year.refresh_from_db()
+        self.assertFalse(self.next_year.is_current)
+    
+    def test_section_rule_overrides_class_rule(self):
+        """Test that a section-specific move takes precedence over its class move."""
+        from apps.academic.promotion_utils import promote_students
+        
+        moves = [
+            {'from_class': self._class_id(5), 'to_class': self._class_id(6)},
+            {
+                'from_class': self._class_id(5), 'from_section': self.sections[(5, 'B')].id,
+                'to_class': self._class_id(6), 'to_section': self.sections[(6, 'A')].id
+            },
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            promote_students(self.school, self.next_year, moves)
+        
+        self.assertEqual(
+            self._roster(6, 'A'), [('Adam', '1'), ('Liam', '2'), ('Mia', '3'), ('Zara', '4')]
+        )
+    
+    def test_query_count_does_not_grow_with_students(self):
+        """Test that promotion runs a fixed number of queries regardless of class size."""
+        from apps.academic.promotion_utils import promote_students
+        
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as small:
+                promote_students(self.school, self.next_year, self._moves())
+            transaction.set_rollback(True)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                self._create_student(f'Extra{i:02d}', self.sections[(5, 'A')])
+        with CaptureQueriesContext(connection) as large:
+            promote_students(self.school, self.next_year, self._moves())
+        
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+    
+    def test_invalid_mapping_is_rejected(self):
+        """Test that an unknown target section returns 400 and moves nobody."""
+        Section.objects.filter(school_class_id=self._class_id(7), name='B').delete()
+        
+        response = self._promote()
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Section B does not exist', response.data['error'])
+        self.assertEqual(self._roster(6, 'B'), [('Noah', '1')])
+    
+    def test_command_validates_mapping_like_the_api(self):
+        """Test that promote_students rejects mappings the API would reject."""
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        
+        other_school = School.objects.create(name='Other School', code='OTH001')
+        other_class = Class.objects.create(school=other_school, name='Class 6', numeric_value=6)
+        invalid_mappings = [
+            [{'from_class': self._class_id(7), 'to_class': self._class_id(6), 'graduate': True}],
+            [{'from_class': self._class_id(5)}],
+            [{'from_class': self._class_id(5), 'to_class': other_class.id}],
+            [],
+        ]
+        for moves in invalid_mappings:
+            with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as mapping_file:
+                json.dump(moves, mapping_file)
+            try:
+                with self.assertRaises(CommandError):
+                    call_command(
+                        'promote_students', school=self.school.id, year='2025-26',
+                        mapping=mapping_file.name, stdout=io.StringIO()
+                    )
+            finally:
+                os.remove(mapping_file.name)
+        
+        self.assertEqual(self._roster(5, 'A'), [('Adam', '1'), ('Zara', '2')])
+        self.assertEqual(self._roster(7, 'A'), [('Olivia', '1')])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class ClassListTests(TestCase):
+    """Test cases for class and section listings."""
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='User',
+            role='school_admin',
+            school=self.school
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+    
+    def _create_class(self, numeric_value, students_per_section=2):
+        school_class = Class.objects.create(
+            school=self.school, name=f'Class {numeric_value}', numeric_value=numeric_value
+        )
+        for name in ('A', 'B'):
+            section = Section.objects.create(school_class=school_class, name=name)
+            for i in range(students_per_section):
+                user = User.objects.create_user(
+                    email=f'{numeric_value}{name}{i}@test.com', password='x',
+                    first_name=f'S{i}', last_name='Test', role='student', school=self.school
+                )
+                Student.objects.create(
+                    user=user, school=self.school,
+                    admission_number=f'ADM-{numeric_value}{name}{i}',
+                    current_class=school_class, current_section=section,
+                    status=Student.Status.INACTIVE if i == 0 else Student.Status.ACTIVE
+                )
+        return school_class
+    
+    def _list(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries.captured_queries)
+    
+    def test_class_tree_counts_active_students(self):
+        """Test that class and section counts only include active students."""
+        self._create_class(5, students_per_section=3)
+        
+        response, _ = self._list('/api/school/classes/')
+        
+        class_data = response.data['results'][0]
+        self.assertEqual(class_data['student_count'], 4)
+        self.assertEqual([s['student_count'] for s in class_data['sections']], [2, 2])
+        self.assertEqual(class_data['sections'][0]['class_name'], 'Class 5')
+    
+    def test_class_tree_query_count_does_not_grow_with_classes(self):
+        """Test that listing classes with nested sections uses a fixed number of queries."""
+        self._create_class(5)
+        _, small = self._list('/api/school/classes/')
+        
+        for numeric_value in range(6, 12):
+            self._create_class(numeric_value)
+        _, large = self._list('/api/school/classes/')
+        
+        self.assertEqual(small, large)
+    
+    def test_section_list_query_count_does_not_grow_with_sections(self):
+        """Test that listing sections annotates counts instead of counting per row."""
+        self._create_class(5)
+        _, small = self._list('/api/school/sections/')
+        
+        for numeric_value in range(6, 12):
+            self._create_class(numeric_value)
+        response, large = self._list('/api/school/sections/')
+        
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['results']), 14)
+        self.assertTrue(all(s['student_count'] == 1 for s in response.data['results']))
+    
+    def test_listings_keep_model_ordering(self):
+        """Test that annotated listings are still ordered by class number and section name."""
+        for numeric_value in (7, 5, 6):
+            self._create_class(numeric_value, students_per_section=1)
+        
+        response, _ = self._list('/api/school/classes/')
+        self.assertEqual([c['numeric_value'] for c in response.data['results']], [5, 6, 7])
+        self.assertEqual([s['name'] for s in response.data['results'][0]['sections']], ['A', 'B'])
+        
+        response, _ = self._list('/api/school/sections/')
+        self.assertEqual([s['name'] for s in response.data['results']], ['A', 'A', 'A', 'B', 'B', 'B'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class TeacherQueryTests(TestCase):
+    """Test cases for the query cost of teacher detail and dashboard."""
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com', password='x',
+            first_name='Admin', last_name='User', role='school_admin', school=self.school
+        )
+        self.year = AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+            is_current=True
+        )
+        self.teacher_user = User.objects.create_user(
+            email='teacher@test.com', password='x',
+            first_name='Tara', last_name='Teacher', role='teacher', school=self.school
+        )
+        self.teacher = Teacher.objects.create(user=self.teacher_user, school=self.school)
+        self.client = APIClient()
+        
+        # Warm the cached current year, as any earlier request would have
+        cache.clear()
+        get_current_academic_year(self.school)
+    
+    def _assign(self, count):
+        """Give the teacher count more classes, each with a subject and a subject assignment."""
+        start = Class.objects.filter(school=self.school).count()
+        for numeric_value in range(start + 1, start + count + 1):
+            school_class = Class.objects.create(
+                school=self.school, name=f'Class {numeric_value}', numeric_value=numeric_value
+            )
+            section = Section.objects.create(school_class=school_class, name='A')
+            subject = Subject.objects.create(school=self.school, name=f'Subject {numeric_value}')
+            subject.classes.add(school_class)
+            self.teacher.subjects.add(subject)
+            SubjectTeacher.objects.create(
+                section=section, subject=subject, teacher=self.teacher, academic_year=self.year
+            )
+            if numeric_value == 1:
+                ClassTeacher.objects.create(section=section, teacher=self.teacher, academic_year=self.year)
+    
+    def test_teacher_detail_query_count_is_fixed(self):
+        """Test that a teacher detail load does not grow with assignments."""
+        self.client.force_authenticate(user=self.admin)
+        url = f'/api/school/teachers/{self.teacher.id}/'
+        
+        self._assign(1)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.data['class_teacher_of']['section_name'], 'Class 1 - A')
+        
+        self._assign(5)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['subject_assignments_data']), 6)
+        self.assertEqual(response.data['subjects_data'][0]['classes_list'][0]['name'], 'Class 1')
+    
+    def test_teacher_dashboard_query_count_is_fixed(self):
+        """Test that the teacher dashboard does not grow with assignments."""
+        self.client.force_authenticate(user=self.teacher_user)
+        
+        self._assign(1)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/school/teacher/dashboard/')
+        self.assertEqual(response.data['class_teacher_of']['section'], 'Class 1 - A')
+        
+        self._assign(5)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/school/teacher/dashboard/')
+        self.assertEqual(len(response.data['subject_assignments']), 6)
+        self.assertEqual(len(response.data['teacher']['subject_assignments_data']), 6)
+    
+    def _enroll(self, section, count):
+        start = Student.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(
+                email=f'student{i}@test.com', password='x',
+                first_name=f'Student{i:03d}', last_name='Test', role='student', school=self.school
+            )
+            Student.objects.create(
+                user=user, school=self.school, admission_number=f'ADM-{i}',
+                current_class=section.school_class, current_section=section
+            )
+    
+    def test_teacher_students_are_scoped_to_current_year(self):
+        """Test that only sections assigned in the current year are listed, grouped by section."""
+        self._assign(2)
+        sections = list(Section.objects.order_by('school_class__numeric_value'))
+        old_year = AcademicYear.objects.create(
+            school=self.school, name='2023-24',
+            start_date=date(2023, 4, 1), end_date=date(2024, 3, 31)
+        )
+        old_class = Class.objects.create(school=self.school, name='Class 9', numeric_value=9)
+        old_section = Section.objects.create(school_class=old_class, name='A')
+        SubjectTeacher.objects.create(
+            section=old_section, subject=Subject.objects.first(), teacher=self.teacher, academic_year=old_year
+        )
+        self._enroll(sections[0], 2)
+        self._enroll(sections[1], 1)
+        self._enroll(old_section, 3)
+        self.client.force_authenticate(user=self.teacher_user)
+        
+        response = self.client.get('/api/school/teacher/students/', {'group_by': 'section'})
+        
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [(group['section'], len(group['students'])) for group in response.data['results']],
+            [('Class 1 - A', 2), ('Class 2 - A', 1)]
+        )
+    
+    def test_teacher_students_group_sections_of_parallel_classes(self):
+        """Test that sections of classes sharing a numeric_value form one group each."""
+        sections = []
+        for name in ('Class 11 Arts', 'Class 11 Science'):
+            school_class = Class.objects.create(school=self.school, name=name, numeric_value=11)
+            section = Section.objects.create(school_class=school_class, name='A')
+            SubjectTeacher.objects.create(
+                section=section, subject=Subject.objects.create(school=self.school, name=name),
+                teacher=self.teacher, academic_year=self.year
+            )
+            sections.append(section)
+        for section in sections + sections:
+            self._enroll(section, 1)
+        self.client.force_authenticate(user=self.teacher_user)
+        
+        response = self.client.get('/api/school/teacher/students/', {'group_by': 'section'})
+        
+        self.assertEqual(
+            sorted((group['section'], len(group['students'])) for group in response.data['results']),
+            [('Class 11 Arts - A', 2), ('Class 11 Science - A', 2)]
+        )
+    
+    def test_teacher_students_query_count_is_fixed(self):
+        """Test that listing a page of students does not query per student."""
+        self._assign(1)
+        section = Section.objects.get()
+        self.client.force_authenticate(user=self.teacher_user)
+        
+        self._enroll(section, 1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/school/teacher/students/')
+        
+        self._enroll(section, 15)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/school/teacher/students/')
+        
+        self.assertEqual(len(response.data['results']), 16)
+        self.assertEqual(response.data['results'][0]['email'], 'student0@test.com')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class CurrentAcademicYearTests(TestCase):
+    """Test cases for the cached current academic year."""
+    
+    def setUp(self):
+        cache.clear()
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.year = AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+            is_current=True
+        )
+    
+    def _create_next_year(self, **kwargs):
+        return AcademicYear.objects.create(
+            school=self.school, name='2025-26',
+            start_date=date(2025, 4, 1), end_date=date(2026, 3, 31), **kwargs
+        )
+    
+    def test_current_year_is_cached(self):
+        """Test that repeated lookups hit the database once."""
+        with self.assertNumQueries(1):
+            self.assertEqual(get_current_academic_year(self.school), self.year)
+            self.assertEqual(get_current_academic_year(self.school.id), self.year)
+    
+    def test_current_year_is_cached_briefly_without_shared_cache(self):
+        """Test that the year is only kept for seconds in a per-process cache."""
+        from apps.academic.academic_year_utils import (
+            CURRENT_YEAR_CACHE_TIMEOUT, LOCAL_CURRENT_YEAR_CACHE_TIMEOUT
+        )
+        
+        for cache_url, timeout in [
+            ('', LOCAL_CURRENT_YEAR_CACHE_TIMEOUT),
+            ('redis://localhost:6379/1', CURRENT_YEAR_CACHE_TIMEOUT),
+        ]:
+            cache.clear()
+            with override_settings(CACHE_URL=cache_url), mock.patch.object(cache, 'set') as cache_set:
+                get_current_academic_year(self.school)
+            self.assertEqual(cache_set.call_args.args[2], timeout)
+    
+    def test_switching_current_year_invalidates_cache(self):
+        """Test that making another year current is seen by the next lookup."""
+        get_current_academic_year(self.school)
+        next_year = self._create_next_year()
+        self.assertEqual(get_current_academic_year(self.school), self.year)
+        
+        next_year.is_current = True
+        next_year.save()
+        
+        self.assertEqual(get_current_academic_year(self.school), next_year)
+        self.year.refresh_from_db()
+        self.assertFalse(self.year.is_current)
+    
+    def test_deleting_current_year_invalidates_cache(self):
+        """Test that a school without a current year resolves to None and is cached too."""
+        get_current_academic_year(self.school)
+        self.year.delete()
+        
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_current_academic_year(self.school))
+            self.assertIsNone(get_current_academic_year(self.school))
+    
+    def test_only_one_current_year_per_school(self):
+        """Test that the database rejects a second current year for a school."""
+        next_year = self._create_next_year()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AcademicYear.objects.filter(pk=next_year.pk).update(is_current=True)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class StudentSearchTests(TestCase):
+    """Test cases for student search."""
+    
+    url = '/api/school/students/search/'
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.other_school = School.objects.create(name='Other School', code='OTH001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com', password='x',
+            first_name='Admin', last_name='User', role='school_admin', school=self.school
+        )
+        self.school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.section = Section.objects.create(school_class=self.school_class, name='A')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+    
+    def _create_student(self, first_name, last_name, admission_number, parent_phone, school=None):
+        school = school or self.school
+        user = User.objects.create_user(
+            email=f'{admission_number.lower()}@{school.code.lower()}.com', password='x',
+            first_name=first_name, last_name=last_name, role='student', school=school
+        )
+        return Student.objects.create(
+            user=user, school=school, admission_number=admission_number,
+            current_class=self.school_class, current_section=self.section,
+            parent_phone=parent_phone
+        )
+    
+    def _search(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [student['admission_number'] for student in response.data]
+    
+    def test_search_matches_name_admission_number_and_phone(self):
+        """Test that partial names, admission numbers and phones (with separators) match."""
+        self._create_student('Aarav', 'Sharma', 'ADM-101', '98765-43210')
+        self._create_student('Diya', 'Patel', 'ADM-102', '9123456789')
+        
+        self.assertEqual(self._search('sharm'), ['ADM-101'])
+        self.assertEqual(self._search('AARAV SH'), ['ADM-101'])
+        self.assertEqual(self._search('adm-102'), ['ADM-102'])
+        self.assertEqual(self._search('98765 43210'), ['ADM-101'])
+        self.assertEqual(self._search('9876543210'), ['ADM-101'])
+        self.assertEqual(self._search('a'), [])
+    
+    def test_longest_values_are_kept_whole(self):
+        """Test that search text built from maximum-length fields is stored uncut."""
+        admission_number = 'A' * 50
+        student = self._create_student('F' * 100, 'L' * 100, admission_number, '9' * 20)
+        
+        self.assertEqual(len(Student.objects.get(pk=student.pk).search_text), 273)
+        self.assertEqual(self._search('9' * 20), [admission_number])
+    
+    def test_search_is_scoped_to_school_and_ranks_exact_matches_first(self):
+        """Test that other schools are excluded and exact identifiers rank first."""
+        self._create_student('Ravi', 'Kumar', 'ADM-7', '9000000001', school=self.other_school)
+        self._create_student('Zara', 'Khan', 'ADM-77', '9000000002')
+        self._create_student('Adam', 'Roy', 'ADM-7', '9000000003')
+        
+        self.assertEqual(self._search('adm-7'), ['ADM-7', 'ADM-77'])
+        self.assertEqual(self._search('ravi'), [])
+    
+    def test_name_change_updates_search_text(self):
+        """Test that renaming the student's user is reflected in search."""
+        student = self._create_student('Kabir', 'Singh', 'ADM-201', '9000000004')
+        student.user.first_name = 'Vihaan'
+        with self.captureOnCommitCallbacks(execute=True):
+            student.user.save()
+        
+        self.assertEqual(self._search('vihaan'), ['ADM-201'])
+        self.assertEqual(self._search('kabir'), [])
+    
+    def _bulk_create_students(self, count):
+        first_names = ['Aarav', 'Diya', 'Kabir', 'Ishaan', 'Meera', 'Rohan', 'Sana', 'Tara', 'Vivaan', 'Zoya']
+        last_names = ['Sharma', 'Patel', 'Singh', 'Khan', 'Iyer', 'Das', 'Gupta', 'Nair', 'Rao', 'Bose']
+        users = User.objects.bulk_create([
+            User(
+                email=f'bulk{i}@test.com', password='!', role='student', school=self.school,
+                first_name=f'{first_names[i % 10]}{i}', last_name=last_names[i // 10 % 10]
+            )
+            for i in range(count)
+        ], batch_size=5000)
+        Student.objects.bulk_create([
+            Student(
+                user=user, school=self.school, admission_number=f'ADM-{i:05d}',
+                current_class=self.school_class, current_section=self.section,
+                parent_phone=f'9{i:09d}', roll_number=str(i % 60 + 1),
+                search_text=student_search_text(
+                    user.first_name, user.last_name, f'ADM-{i:05d}', f'9{i:09d}'
+                )
+            )
+            for i, user in enumerate(users)
+        ], batch_size=5000)
+    
+    def test_search_returns_top_matches(self):
+        """Test that searches stop at the limit with exact matches first, then by name."""
+        self._bulk_create_students(1000)
+        
+        for query in ['meera', 'patel', 'adm-004', '900000', '12']:
+            results = search_students(self.school, query)
+            self.assertEqual(len(results), 20, query)
+        
+        patels = search_students(self.school, 'patel')
+        self.assertTrue(all(student.user.last_name == 'Patel' for student in patels))
+        self.assertEqual(
+            [student.search_text for student in patels], sorted(student.search_text for student in patels)
+        )
+        self.assertEqual(search_students(self.school, 'ADM-00499')[0].admission_number, 'ADM-00499')
+        by_roll_number = search_students(self.school, '12')
+        self.assertEqual({student.roll_number for student in by_roll_number[:17]}, {'12'})
+    
+    @skipUnless(os.environ.get('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS=1 to run benchmarks')
+    def test_search_top_matches_in_large_school(self):
+        """Benchmark: top-20 matches among 50,000 students in under 50 ms."""
+        import time
+        
+        self._bulk_create_students(50000)
+        
+        # Name, last name, admission number, phone and roll number lookups
+        for query in ['meera4', 'patel', 'adm-499', '900004', '12']:
+            search_students(self.school, query)  # Warm the page cache
+            started = time.perf_counter()
+            results = search_students(self.school, query)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.assertEqual(len(results), 20)
+            self.assertLess(elapsed_ms, 50, f'{query!r} took {elapsed_ms:.1f} ms')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class StudentDirectoryExportTests(TestCase):
+    """Test cases for the student directory export."""
+    
+    url = '/api/school/students/export/'
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com', password='x',
+            first_name='Admin', last_name='User', role='school_admin', school=self.school
+        )
+        self.class_5 = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.class_6 = Class.objects.create(school=self.school, name='Class 6', numeric_value=6)
+        section_5 = Section.objects.create(school_class=self.class_5, name='A')
+        section_6 = Section.objects.create(school_class=self.class_6, name='A')
+        for i, (school_class, section) in enumerate([
+            (self.class_5, section_5), (self.class_5, section_5), (self.class_6, section_6)
+        ]):
+            user = User.objects.create_user(
+                email=f'student{i}@test.com', password='x',
+                first_name=f'Student{i}', last_name='Test', role='student', school=self.school
+            )
+            Student.objects.create(
+                user=user, school=self.school, admission_number=f'ADM-{i}',
+                current_class=school_class, current_section=section,
+                date_of_birth=date(2012, 5, i + 1), parent_phone='9876543210'
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+    
+    def test_csv_export_with_selected_columns_and_filters(self):
+        """Test that the export honours the list filters and the chosen columns."""
+        response = self.client.get(self.url, {
+            'class': self.class_5.id, 'columns': 'admission_number,first_name,class,date_of_birth,is_active'
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['Admission No.', 'First Name', 'Class', 'Date of Birth', 'Login Active'])
+        self.assertEqual(sorted(rows[1:]), [
+            ['ADM-0', 'Student0', 'Class 5', '2012-05-01', 'Yes'],
+            ['ADM-1', 'Student1', 'Class 5', '2012-05-02', 'Yes'],
+        ])
+    
+    def test_export_is_a_single_query(self):
+        """Test that rows come from one joined values query regardless of size."""
+        response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.strip().splitlines()), 4)
+    
+    def test_xlsx_export(self):
+        """Test that the directory can be downloaded as a workbook."""
+        from openpyxl import load_workbook
+        
+        response = self.client.get(self.url, {'file_type': 'xlsx', 'columns': 'admission_number,section'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.title, 'Students')
+        self.assertEqual([cell.value for cell in sheet[1]], ['Admission No.', 'Section'])
+        self.assertEqual(sheet.max_row, 4)
+    
+    def test_unknown_column_is_rejected(self):
+        """Test that unknown columns return 400."""
+        response = self.client.get(self.url, {'columns': 'admission_number,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.data['error'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS)
+class BulkAssignmentTests(TestCase):
+    """Test cases for bulk subject teacher and class teacher assignment."""
+    
+    url = '/api/school/subject-teachers/bulk_assign/'
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com', password='x',
+            first_name='Admin', last_name='User', role='school_admin', school=self.school
+        )
+        self.year = AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+            is_current=True
+        )
+        self.teachers = []
+        for index in range(3):
+            user = User.objects.create_user(
+                email=f'teacher{index}@test.com', password='x',
+                first_name=f'Teacher{index}', last_name='User', role='teacher', school=self.school
+            )
+            self.teachers.append(Teacher.objects.create(user=user, school=self.school))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        cache.clear()
+        get_current_academic_year(self.school)
+    
+    def _create_matrix(self, class_count, subject_count):
+        """Create classes with one section each and subjects taught in all of them."""
+        sections = []
+        start = Class.objects.filter(school=self.school).count()
+        for numeric_value in range(start + 1, start + class_count + 1):
+            school_class = Class.objects.create(
+                school=self.school, name=f'Class {numeric_value}', numeric_value=numeric_value
+            )
+            sections.append(Section.objects.create(school_class=school_class, name='A'))
+        subjects = []
+        for index in range(subject_count):
+            subject = Subject.objects.create(school=self.school, name=f'Subject {start}-{index}')
+            subject.classes.set([section.school_class for section in sections])
+            subjects.append(subject)
+        return sections, subjects
+    
+    def _rows(self, sections, subjects, teacher):
+        return [
+            {'section': section.id, 'subject': subject.id, 'teacher': teacher.id}
+            for section in sections for subject in subjects
+        ]
+    
+    def test_matrix_query_count_does_not_grow(self):
+        """Test that a bigger matrix is saved with the same number of queries."""
+        sections, subjects = self._create_matrix(2, 2)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.post(
+                self.url, {'subject_teachers': self._rows(sections, subjects, self.teachers[0])}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['subject_teachers']['created'], 4)
+        
+        SubjectTeacher.objects.all().delete()
+        sections, subjects = self._create_matrix(8, 5)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(
+                self.url, {'subject_teachers': self._rows(sections, subjects, self.teachers[0])}, format='json'
+            )
+        self.assertEqual(response.data['subject_teachers']['created'], 40)
+        self.assertEqual(len(large), len(small))
+        
+        # Re-saving reassigns changed rows and leaves the rest alone
+        rows = self._rows(sections, subjects, self.teachers[0])
+        for row in rows[:10]:
+            row['teacher'] = self.teachers[1].id
+        response = self.client.post(self.url, {'subject_teachers': rows}, format='json')
+        self.assertEqual(response.data['subject_teachers'], {'created': 0, 'updated': 10, 'unchanged': 30})
+        self.assertEqual(SubjectTeacher.objects.filter(teacher=self.teachers[1]).count(), 10)
+    
+    def test_conflicts_save_nothing(self):
+        """Test that any invalid row rejects the whole matrix."""
+        sections, subjects = self._create_matrix(2, 1)
+        other = Subject.objects.create(school=self.school, name='Other')
+        other.classes.add(sections[0].school_class)
+        rows = self._rows(sections, subjects, self.teachers[0]) + [
+            {'section': sections[1].id, 'subject': other.id, 'teacher': self.teachers[0].id},
+            {'section': sections[0].id, 'subject': subjects[0].id, 'teacher': self.teachers[1].id},
+        ]
+        response = self.client.post(self.url, {
+            'subject_teachers': rows,
+            'class_teachers': [
+                {'section': sections[0].id, 'teacher': self.teachers[2].id},
+                {'section': sections[1].id, 'teacher': self.teachers[2].id},
+            ],
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = {(e['type'], e['row']) for e in response.data['errors']}
+        self.assertEqual(
+            errors,
+            {('subject_teachers', 2), ('subject_teachers', 3), ('class_teachers', 0), ('class_teachers', 1)}
+        )
+        self.assertFalse(SubjectTeacher.objects.exists())
+        self.assertFalse(ClassTeacher.objects.exists())
+    
+    def test_class_teacher_swap(self):
+        """Test that two sections can swap class teachers in one request."""
+        sections, _ = self._create_matrix(2, 0)
+        ClassTeacher.objects.create(section=sections[0], teacher=self.teachers[0], academic_year=self.year)
+        ClassTeacher.objects.create(section=sections[1], teacher=self.teachers[1], academic_year=self.year)
+        
+        response = self.client.post(self.url, {'class_teachers': [
+            {'section': sections[0].id, 'teacher': self.teachers[1].id},
+            {'section': sections[1].id, 'teacher': self.teachers[0].id},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['class_teachers']['updated'], 2)
+        self.assertEqual(ClassTeacher.objects.get(section=sections[0]).teacher, self.teachers[1])
+        self.assertEqual(ClassTeacher.objects.get(section=sections[1]).teacher, self.teachers[0])
+    
+    def test_copy_from_year(self):
+        """Test that assignments are copied to a new year, skipping inactive teachers."""
+        sections, subjects = self._create_matrix(2, 2)
+        for section in sections:
+            SubjectTeacher.objects.create(
+                section=section, subject=subjects[0], teacher=self.teachers[0], academic_year=self.year
+            )
+            SubjectTeacher.objects.create(
+                section=section, subject=subjects[1], teacher=self.teachers[1], academic_year=self.year
+            )
+        ClassTeacher.objects.create(section=sections[0], teacher=self.teachers[0], academic_year=self.year)
+        self.teachers[1].user.is_active = False
+        self.teachers[1].user.save()
+        next_year = AcademicYear.objects.create(
+            school=self.school, name='2025-26',
+            start_date=date(2025, 4, 1), end_date=date(2026, 3, 31)
+        )
+        
+        response = self.client.post('/api/school/subject-teachers/copy_from_year/', {
+            'from_year': self.year.id, 'to_year': next_year.id
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['subject_teachers']['created'], 2)
+        self.assertEqual(response.data['subject_teachers']['skipped'], 2)
+        self.assertEqual(SubjectTeacher.objects.filter(academic_year=next_year, teacher=self.teachers[0]).count(), 2)
+        self.assertEqual(SubjectTeacher.objects.filter(academic_year=self.year).count(), 4)
+        self.assertEqual(ClassTeacher.objects.get(section=sections[0]).academic_year, next_year)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS,
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage', MEDIA_URL='/media/'
+)
+class MaterialUploadTests(TemporaryRootMixin, TestCase):
+    """Test cases for chunked study material uploads."""
+    
+    root_setting = 'MEDIA_ROOT'
+    url = '/api/school/material-uploads/'
+    content = b'%PDF-1.4 chunked study material body'
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.school.feature_toggle.notes_enabled = True
+        self.school.feature_toggle.save()
+        self.teacher_user = User.objects.create_user(
+            email='teacher@test.com', password='x',
+            first_name='Tara', last_name='Teacher', role='teacher', school=self.school
+        )
+        school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.section = Section.objects.create(school_class=school_class, name='A')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.teacher_user)
+    
+    def _open(self):
+        response = self.client.post(self.url, {
+            'title': 'Algebra notes',
+            'section': self.section.id,
+            'file_name': '../notes.pdf',
+            'total_size': len(self.content)
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+    
+    def _send(self, upload_id, offset, data):
+        return self.client.put(
+            f'{self.url}{upload_id}/chunk/?offset={offset}', data, content_type='application/octet-stream'
+        )
+    
+    def _complete(self, upload_id):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(f'{self.url}{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(callbacks), 1)
+        transfer_material_upload.apply(args=[upload_id])
+        return MaterialUpload.objects.get(id=upload_id)
+    
+    def test_chunked_upload_resumes_and_transfers(self):
+        """Test that chunks resume from received_bytes and the file reaches media storage."""
+        upload_id = self._open()['id']
+        
+        response = self._send(upload_id, 0, self.content[:10])
+        self.assertEqual(response.data['received_bytes'], 10)
+        
+        # A client that lost track of progress is told where to continue
+        response = self._send(upload_id, 0, self.content[:10])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['received_bytes'], 10)
+        response = self.client.get(f'{self.url}{upload_id}/')
+        self.assertEqual(response.data['received_bytes'], 10)
+        
+        response = self._send(upload_id, 10, self.content[10:])
+        self.assertEqual(response.data['received_bytes'], len(self.content))
+        
+        upload = self._complete(upload_id)
+        self.assertEqual(upload.status, MaterialUpload.Status.COMPLETED)
+        material = upload.material
+        self.assertEqual(material.title, 'Algebra notes')
+        self.assertEqual(material.section, self.section)
+        self.assertEqual(material.created_by, self.teacher_user)
+        self.assertTrue(material.file.name.startswith('study_materials/notes'))
+        with material.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(upload.chunks.exists())
+    
+    def test_incomplete_or_oversized_chunks_are_rejected(self):
+        """Test that chunks past the declared size and early completion are refused."""
+        upload_id = self._open()['id']
+        
+        response = self._send(upload_id, 0, self.content + b'extra')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self._send(upload_id, 0, self.content[:5])
+        response = self.client.post(f'{self.url}{upload_id}/complete/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StudyMaterial.objects.exists())
+    
+    def test_failed_transfer_can_be_retried(self):
+        """Test that a failed transfer keeps the chunks and succeeds when queued again."""
+        upload_id = self._open()['id']
+        self._send(upload_id, 0, self.content)
+        
+        with mock.patch('django.core.files.storage.FileSystemStorage.save', side_effect=OSError('Disk full')):
+            upload = self._complete(upload_id)
+        self.assertEqual(upload.status, MaterialUpload.Status.FAILED)
+        self.assertEqual(upload.error_message, 'Disk full')
+        self.assertEqual(upload.chunks.count(), 1)
+        self.assertFalse(StudyMaterial.objects.exists())
+        
+        upload = self._complete(upload_id)
+        self.assertEqual(upload.status, MaterialUpload.Status.COMPLETED)
+    
+    def test_file_of_rolled_back_transfer_is_deleted(self):
+        """Test that a transfer failing after storing the file removes it again."""
+        upload_id = self._open()['id']
+        self._send(upload_id, 0, self.content)
+        material_dir = os.path.join(settings.MEDIA_ROOT, 'study_materials')
+        os.makedirs(material_dir, exist_ok=True)
+        stored_before = set(os.listdir(material_dir))
+        
+        with mock.patch.object(StudyMaterial, 'save', side_effect=IntegrityError('Section deleted')):
+            upload = self._complete(upload_id)
+        self.assertEqual(upload.status, MaterialUpload.Status.FAILED)
+        self.assertEqual(set(os.listdir(material_dir)), stored_before)
+        self.assertEqual(upload.chunks.count(), 1)
+    
+    def test_download_redirects_to_storage_url(self):
+        """Test that downloads redirect to the storage URL instead of streaming through Django."""
+        upload_id = self._open()['id']
+        self._send(upload_id, 0, self.content)
+        material = self._complete(upload_id).material
+        
+        response = self.client.get(f'/api/school/materials/{material.id}/')
+        self.assertEqual(response.data['download_url'], material.file.url)
+        response = self.client.get(f'/api/school/materials/{material.id}/download/')
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(response['Location'].endswith(material.file.url))
+    
+    def test_cloudinary_urls_are_signed_with_resource_type_from_extension(self):
+        """Test that Cloudinary download URLs are signed for the file's resource type."""
+        from apps.academic.material_uploads import cloudinary_resource_type, signed_file_url
+        
+        self.assertEqual(cloudinary_resource_type('study_materials/notes.pdf'), 'image')
+        self.assertEqual(cloudinary_resource_type('study_materials/photo.JPG'), 'image')
+        self.assertEqual(cloudinary_resource_type('study_materials/lecture.mp4'), 'video')
+        self.assertEqual(cloudinary_resource_type('study_materials/notes.docx'), 'raw')
+        
+        material = StudyMaterial(file='study_materials/notes.pdf')
+        material.file.storage = type('MediaCloudinaryStorage', (), {'__module__': 'cloudinary_storage.storage'})()
+        with mock.patch('cloudinary.utils.cloudinary_url', return_value=('https://signed', {})) as url:
+            self.assertEqual(signed_file_url(material.file), 'https://signed')
+        url.assert_called_once_with(
+            'study_materials/notes.pdf', resource_type='image', sign_url=True, secure=True
+        )
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=FAST_HASHERS,
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage', MEDIA_URL='/media/'
+)
+class MaterialFeedTests(TestCase):
+    """Test cases for the cached study material feed."""
+    
+    url = '/api/school/materials/feed/'
+    
+    def setUp(self):
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.school.feature_toggle.notes_enabled = True
+        self.school.feature_toggle.save()
+        self.teacher_user = User.objects.create_user(
+            email='teacher@test.com', password='x',
+            first_name='Tara', last_name='Teacher', role='teacher', school=self.school
+        )
+        self.school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.section = Section.objects.create(school_class=self.school_class, name='A')
+        self.other_section = Section.objects.create(school_class=self.school_class, name='B')
+        self.subject = Subject.objects.create(school=self.school, name='Maths')
+        student_user = User.objects.create_user(
+            email='student@test.com', password='x',
+            first_name='Sam', last_name='Student', role='student', school=self.school
+        )
+        Student.objects.create(
+            user=student_user, school=self.school, admission_number='ADM-1',
+            current_class=self.school_class, current_section=self.section
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=student_user)
+        cache.clear()
+    
+    def _add_material(self, title, section=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StudyMaterial.objects.create(
+                school=self.school, title=title, file='study_materials/notes.pdf',
+                section=section or self.section, subject=self.subject, created_by=self.teacher_user
+            )
+    
+    def test_feed_is_cached_until_the_section_changes(self):
+        """Test that a cached feed costs only the section lookup and is replaced after a change."""
+        self._add_material('Algebra')
+        self._add_material('Elsewhere', section=self.other_section)
+        response = self.client.get(self.url)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Algebra'])
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 1)
+        
+        self._add_material('Geometry')
+        response = self.client.get(self.url)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Geometry', 'Algebra'])
+    
+    def test_etag_returns_not_modified(self):
+        """Test that If-None-Match answers 304 until a material changes."""
+        material = self._add_material('Algebra')
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            material.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_changes_since_cursor(self):
+        """Test that a cursor returns new materials and the ids left after deletions."""
+        old = self._add_material('Algebra')
+        StudyMaterial.objects.filter(id=old.id).update(updated_at=timezone.now() - timedelta(days=1))
+        stale = self._add_material('Trigonometry')
+        cursor = self.client.get(self.url).data['cursor']
+        
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        new = self._add_material('Geometry')
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.delete()
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['changed']], [new.id])
+        self.assertEqual(sorted(response.data['ids']), [old.id, new.id])
+        self.assertNotEqual(response.data['cursor'], cursor)
+    
+    def test_versions_expire_briefly_without_shared_cache(self):
+        """Test that versions and feeds expire, within seconds in a per-process cache."""
+        from apps.academic.material_feed import FEED_CACHE_TIMEOUT, LOCAL_FEED_CACHE_TIMEOUT
+        
+        self._add_material('Algebra')
+        for cache_url, timeout in [('', LOCAL_FEED_CACHE_TIMEOUT), ('redis://localhost:6379/1', FEED_CACHE_TIMEOUT)]:
+            cache.clear()
+            with override_settings(CACHE_URL=cache_url), \
+                    mock.patch.object(cache, 'add', wraps=cache.add) as cache_add, \
+                    mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+                self.client.get(self.url)
+            timeouts = [
+                call.args[2] for call in cache_add.call_args_list + cache_set.call_args_list
+                if call.args[0].startswith('material_feed')
+            ]
+            self.assertEqual(timeouts, [timeout, timeout])
+    
+    def test_staff_must_choose_a_section(self):
+        """Test that staff pass a section of their own school."""
+        self._add_material('Algebra')
+        self.client.force_authenticate(user=self.teacher_user)
+        
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'section': self.section.id, 'subject': self.subject.id})
+        self.assertEqual(len(response.data['results']), 1)
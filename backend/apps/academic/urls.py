@@ -10,7 +10,7 @@ from .views import (
     TeacherViewSet, StudentViewSet,
     ClassTeacherViewSet, SubjectTeacherViewSet,
     TeacherDashboardView, TeacherStudentsView,
-    StudentProfileView, StudyMaterialViewSet
+    StudentProfileView, StudyMaterialViewSet, MaterialUploadViewSet, ImportJobViewSet
 )
 
 router = DefaultRouter()
@@ -23,6 +23,8 @@ router.register(r'students', StudentViewSet, basename='student')
 router.register(r'class-teachers', ClassTeacherViewSet, basename='class-teacher')
 router.register(r'subject-teachers', SubjectTeacherViewSet, basename='subject-teacher')
 router.register(r'materials', StudyMaterialViewSet, basename='studymaterial')
+router.register(r'material-uploads', MaterialUploadViewSet, basename='material-upload')
+router.register(r'import-jobs', ImportJobViewSet, basename='import-job')
 
 urlpatterns = [
     path('dashboard/', SchoolDashboardView.as_view(), name='school-dashboard'),
@@ -1,24 +1,30 @@
 """
 Views for School Admin academic management.
 """
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, Prefetch
 
-from apps.accounts.permissions import IsSchoolAdmin, IsSchoolStaff, IsTeacher, IsStudent
+from apps.accounts.permissions import (
+    IsSchoolAdmin, IsSchoolStaff, IsTeacher, IsStudent, NotesFeatureEnabled
+)
+from apps.core.pagination import FlexiblePagination
+from .academic_year_utils import get_current_academic_year
 from .models import (
     AcademicYear, Class, Section, Subject,
-    Teacher, ClassTeacher, SubjectTeacher, Student
+    Teacher, ClassTeacher, SubjectTeacher, Student, ImportJob, ImportRowFile, MaterialUpload
 )
 from .serializers import (
     AcademicYearSerializer, ClassSerializer, SectionSerializer, SubjectSerializer,
     TeacherSerializer, TeacherListSerializer, TeacherCreateSerializer,
     StudentSerializer, StudentListSerializer, StudentCreateSerializer,
-    ClassTeacherSerializer, SubjectTeacherSerializer, SchoolDashboardSerializer
+    ClassTeacherSerializer, SubjectTeacherSerializer, SchoolDashboardSerializer,
+    ImportJobSerializer, PromotionSerializer, BulkAssignmentSerializer,
+    CopyAssignmentsSerializer, MaterialUploadSerializer, teacher_detail_prefetches
 )
 
 User = get_user_model()
@@ -110,6 +116,35 @@ class AcademicYearViewSet(viewsets.ModelViewSet):
         year.is_current = True
         year.save()
         return Response({'message': 'Academic year set as current.'})
+    
+    @action(detail=True, methods=['post'])
+    def promote(self, request, pk=None):
+        """
+        Promote students into this academic year.
+        Moves whole classes or sections in bulk; use dry_run to preview the counts.
+        """
+        from .promotion_utils import PromotionError, promote_students
+        
+        year = self.get_object()
+        serializer = PromotionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            summary = promote_students(
+                request.user.school, year,
+                serializer.validated_data['moves'],
+                dry_run=serializer.validated_data['dry_run'],
+                set_current=serializer.validated_data['set_current']
+            )
+        except PromotionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(summary)
+
+
+def _active_student_count():
+    """Annotation backing student_count on classes and sections."""
+    return Count('students', filter=Q(students__status=Student.Status.ACTIVE))
 
 
 class ClassViewSet(viewsets.ModelViewSet):
@@ -118,7 +153,13 @@ class ClassViewSet(viewsets.ModelViewSet):
     serializer_class = ClassSerializer
     
     def get_queryset(self):
-        return Class.objects.filter(school=self.request.user.school).prefetch_related('sections')
+        # The GROUP BY of the counts drops Meta.ordering, so order explicitly
+        sections = Section.objects.annotate(
+            active_student_count=_active_student_count()
+        ).order_by('name')
+        return Class.objects.filter(school=self.request.user.school).annotate(
+            active_student_count=_active_student_count()
+        ).prefetch_related(Prefetch('sections', queryset=sections)).order_by('numeric_value', 'id')
     
     def perform_create(self, serializer):
         serializer.save(school=self.request.user.school)
@@ -149,7 +190,11 @@ class SectionViewSet(viewsets.ModelViewSet):
     serializer_class = SectionSerializer
     
     def get_queryset(self):
-        return Section.objects.filter(school_class__school=self.request.user.school)
+        return Section.objects.filter(
+            school_class__school=self.request.user.school
+        ).select_related('school_class').annotate(
+            active_student_count=_active_student_count()
+        ).order_by('name', 'id')
 
 
 class SubjectViewSet(viewsets.ModelViewSet):
@@ -169,9 +214,10 @@ class TeacherViewSet(viewsets.ModelViewSet):
     permission_classes = [IsSchoolAdmin]
     
     def get_queryset(self):
-        return Teacher.objects.filter(
-            school=self.request.user.school
-        ).select_related('user').prefetch_related('subjects')
+        queryset = Teacher.objects.filter(school=self.request.user.school).select_related('user')
+        if self.action in ('retrieve', 'update', 'partial_update'):
+            return queryset.prefetch_related(*teacher_detail_prefetches())
+        return queryset.prefetch_related('subjects')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -206,7 +252,7 @@ class TeacherViewSet(viewsets.ModelViewSet):
         Excludes teachers already assigned as class teacher in current academic year.
         """
         school = request.user.school
-        current_year = AcademicYear.objects.filter(school=school, is_current=True).first()
+        current_year = get_current_academic_year(school)
         
         # Get all active teachers
         teachers = Teacher.objects.filter(
@@ -249,67 +295,12 @@ class TeacherViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def preview_import(self, request):
         """Parse and validate CSV file for bulk teacher import preview."""
-        from .teacher_import_utils import parse_teacher_csv
-        
-        if 'file' not in request.FILES:
-            return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        uploaded_file = request.FILES['file']
-        if not uploaded_file.name.endswith('.csv'):
-            return Response({'error': 'Only CSV files are supported.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            file_content = uploaded_file.read()
-            result = parse_teacher_csv(file_content, request.user.school)
-            
-            if 'error' in result:
-                return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Clean result for JSON
-            valid_rows = []
-            for row in result['valid_rows']:
-                clean_data = {k: v for k, v in row['data'].items() 
-                             if not k.endswith('_resolved') and not k.endswith('_parsed') and not k.endswith('_normalized')}
-                valid_rows.append({'row_number': row['row_number'], 'data': clean_data})
-            
-            return Response({
-                'valid_count': len(valid_rows),
-                'invalid_count': len(result['invalid_rows']),
-                'valid_rows': valid_rows,
-                'invalid_rows': result['invalid_rows']
-            })
-        except Exception as e:
-            return Response({'error': f'Failed to parse file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        return _preview_import(request, ImportJob.ImportType.TEACHERS)
     
     @action(detail=False, methods=['post'])
     def confirm_import(self, request):
-        """Confirm and create teachers from validated data."""
-        from .teacher_import_utils import parse_teacher_csv, create_teachers_from_rows
-        
-        if 'file' not in request.FILES:
-            return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            file_content = request.FILES['file'].read()
-            parse_result = parse_teacher_csv(file_content, request.user.school)
-            
-            if 'error' in parse_result:
-                return Response({'error': parse_result['error']}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if not parse_result['valid_rows']:
-                return Response({'error': 'No valid rows to import.'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            result = create_teachers_from_rows(parse_result['valid_rows'], request.user.school)
-            
-            return Response({
-                'message': f"Import completed. {result['success_count']} teachers created.",
-                'success_count': result['success_count'],
-                'error_count': result['error_count'],
-                'errors': result['errors'],
-                'skipped_count': len(parse_result['invalid_rows'])
-            })
-        except Exception as e:
-            return Response({'error': f'Import failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        """Queue creation of teachers from a previewed import job."""
+        return _confirm_import(request, ImportJob.ImportType.TEACHERS)
     
     @action(detail=False, methods=['get'])
     def sample_csv(self, request):
@@ -395,108 +386,57 @@ class StudentViewSet(viewsets.ModelViewSet):
         student.user.save()
         return Response({'message': 'Password reset successfully.'})
     
-    @action(detail=False, methods=['post'])
-    def preview_import(self, request):
-        """Parse and validate CSV file for bulk import preview."""
-        from .bulk_import_utils import parse_csv_file
+    @action(detail=False, methods=['get'], permission_classes=[IsSchoolStaff])
+    def search(self, request):
+        """
+        Find students by partial name, admission number, roll number or parent phone.
+        Returns the top matches (?q=...&limit=20) without pagination.
+        """
+        from .search_utils import STUDENT_SEARCH_LIMIT, search_students
         
-        if 'file' not in request.FILES:
-            return Response(
-                {'error': 'No file uploaded.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        try:
+            limit = min(int(request.query_params.get('limit', STUDENT_SEARCH_LIMIT)), STUDENT_SEARCH_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        students = search_students(request.user.school, request.query_params.get('q', ''), limit=limit)
+        return Response(StudentListSerializer(students, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Download the student directory, filtered like the list.
         
-        uploaded_file = request.FILES['file']
+        Query params: file_type=csv|xlsx (default csv), columns=<comma-separated keys>,
+        class, section, status
+        """
+        from apps.core.exports import EXPORT_FILE_TYPES, export_response
+        from .directory import build_student_directory, parse_directory_columns
         
-        # Check file type
-        if not uploaded_file.name.endswith('.csv'):
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORT_FILE_TYPES:
             return Response(
-                {'error': 'Only CSV files are supported.'},
+                {'error': f'file_type must be one of: {", ".join(EXPORT_FILE_TYPES)}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Read file content
         try:
-            file_content = uploaded_file.read()
-            result = parse_csv_file(file_content, request.user.school)
-            
-            if 'error' in result:
-                return Response(
-                    {'error': result['error']},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Clean result for JSON serialization (remove Django objects)
-            valid_rows = []
-            for row in result['valid_rows']:
-                clean_data = {k: v for k, v in row['data'].items() 
-                             if not k.endswith('_obj') and not k.endswith('_parsed')}
-                valid_rows.append({
-                    'row_number': row['row_number'],
-                    'data': clean_data
-                })
-            
-            return Response({
-                'valid_count': len(valid_rows),
-                'invalid_count': len(result['invalid_rows']),
-                'valid_rows': valid_rows,
-                'invalid_rows': result['invalid_rows']
-            })
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to parse file: {str(e)}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            columns = parse_directory_columns(request.query_params.get('columns'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        header, rows = build_student_directory(self.filter_queryset(self.get_queryset()), columns)
+        return export_response(file_type, header, rows, 'student_directory', sheet_title='Students')
+    
+    @action(detail=False, methods=['post'])
+    def preview_import(self, request):
+        """Parse and validate CSV file for bulk import preview."""
+        return _preview_import(request, ImportJob.ImportType.STUDENTS)
     
     @action(detail=False, methods=['post'])
     def confirm_import(self, request):
-        """Confirm and create students from validated data."""
-        from .bulk_import_utils import parse_csv_file, create_students_from_rows
-        
-        if 'file' not in request.FILES:
-            return Response(
-                {'error': 'No file uploaded.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        uploaded_file = request.FILES['file']
-        
-        try:
-            file_content = uploaded_file.read()
-            parse_result = parse_csv_file(file_content, request.user.school)
-            
-            if 'error' in parse_result:
-                return Response(
-                    {'error': parse_result['error']},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            if not parse_result['valid_rows']:
-                return Response(
-                    {'error': 'No valid rows to import.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Create students
-            result = create_students_from_rows(
-                parse_result['valid_rows'],
-                request.user.school
-            )
-            
-            return Response({
-                'message': f"Import completed. {result['success_count']} students created.",
-                'success_count': result['success_count'],
-                'error_count': result['error_count'],
-                'errors': result['errors'],
-                'skipped_count': len(parse_result['invalid_rows'])
-            })
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Import failed: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """Queue creation of students from a previewed import job."""
+        return _confirm_import(request, ImportJob.ImportType.STUDENTS)
     
     @action(detail=False, methods=['get'])
     def sample_csv(self, request):
@@ -510,6 +450,131 @@ class StudentViewSet(viewsets.ModelViewSet):
         return response
 
 
+def _preview_import(request, import_type):
+    """
+    Validate an uploaded CSV/XLSX file once and store it as an ImportJob.
+    Returns the first page of valid and invalid rows; further pages come from
+    the import job's rows endpoint. The job_id is passed to confirm_import.
+    """
+    from .import_files import is_supported_import_file, read_rows_page
+    from .import_jobs import create_import_job, preview_row, row_data
+    
+    if 'file' not in request.FILES:
+        return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    uploaded_file = request.FILES['file']
+    if not is_supported_import_file(uploaded_file.name):
+        return Response(
+            {'error': 'Only CSV and XLSX files are supported.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        job = create_import_job(uploaded_file, request.user.school, request.user, import_type)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Failed to parse file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'job_id': job.id,
+        'valid_count': job.valid_count,
+        'invalid_count': job.invalid_count,
+        'valid_rows': [
+            preview_row(row) for row in read_rows_page(row_data(job, ImportRowFile.Kind.VALID), 1)
+        ],
+        'invalid_rows': read_rows_page(row_data(job, ImportRowFile.Kind.INVALID), 1)
+    })
+
+
+def _confirm_import(request, import_type):
+    """Queue the background commit of a previewed ImportJob."""
+    from .import_jobs import queue_import_job
+    
+    job_id = request.data.get('job_id')
+    job = None
+    if job_id:
+        job = ImportJob.objects.filter(
+            id=job_id, school=request.user.school, import_type=import_type
+        ).first()
+    if not job:
+        return Response({'error': 'Import job not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if job.status != ImportJob.Status.PREVIEWED:
+        return Response(
+            {'error': f'Import job is already {job.status}.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not job.valid_count:
+        return Response({'error': 'No valid rows to import.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    queue_import_job(job)
+    return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of bulk import jobs; failed and stalled jobs can be resumed."""
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsSchoolAdmin]
+    
+    def get_queryset(self):
+        queryset = ImportJob.objects.filter(school=self.request.user.school)
+        import_type = self.request.query_params.get('type')
+        if import_type:
+            queryset = queryset.filter(import_type=import_type)
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def rows(self, request, pk=None):
+        """
+        Paginated preview rows of an import job.
+        Query params: kind=valid|invalid (default valid), page=<n>
+        """
+        from .import_files import PREVIEW_PAGE_SIZE, read_rows_page
+        from .import_jobs import preview_row, row_data
+        
+        job = self.get_object()
+        kind = request.query_params.get('kind', 'valid')
+        if kind not in ('valid', 'invalid'):
+            return Response(
+                {'error': 'kind must be valid or invalid.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            return Response({'error': 'Invalid page.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = read_rows_page(row_data(job, kind), page)
+        if kind == ImportRowFile.Kind.VALID:
+            count = job.valid_count
+            rows = [preview_row(row) for row in rows]
+        else:
+            count = job.invalid_count
+        
+        return Response({
+            'count': count,
+            'page': page,
+            'page_size': PREVIEW_PAGE_SIZE,
+            'results': rows
+        })
+    
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Resume a failed or stalled import from its last committed chunk."""
+        from .import_jobs import is_resumable, queue_import_job
+        
+        job = self.get_object()
+        if not is_resumable(job):
+            return Response(
+                {'error': 'Only failed or stalled import jobs can be resumed.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queue_import_job(job)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
 class ClassTeacherViewSet(viewsets.ModelViewSet):
     """ViewSet for class teacher assignments."""
     permission_classes = [IsSchoolAdmin]
@@ -525,12 +590,10 @@ class ClassTeacherViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(section_id=section_id)
         
         # Filter for current academic year if available
-        current_year = AcademicYear.objects.filter(
-            school=self.request.user.school, is_current=True
-        ).first()
+        current_year = get_current_academic_year(self.request.user.school)
         if current_year:
             queryset = queryset.filter(academic_year=current_year)
-            
+        
         return queryset
 
 
@@ -547,8 +610,64 @@ class SubjectTeacherViewSet(viewsets.ModelViewSet):
         section_id = self.request.query_params.get('section')
         if section_id:
             queryset = queryset.filter(section_id=section_id)
-            
+        
         return queryset
+    
+    @action(detail=False, methods=['post'])
+    def bulk_assign(self, request):
+        """
+        Save a whole matrix of subject teacher and class teacher assignments.
+        
+        Body: {academic_year (default: current), subject_teachers: [{section, subject, teacher}],
+        class_teachers: [{section, teacher}]}. Nothing is saved if any row conflicts.
+        """
+        from .assignment_utils import AssignmentError, bulk_assign
+        
+        serializer = BulkAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        school = request.user.school
+        if 'academic_year' in data:
+            academic_year = AcademicYear.objects.filter(school=school, id=data['academic_year']).first()
+        else:
+            academic_year = get_current_academic_year(school)
+        if not academic_year:
+            return Response({'error': 'Academic year not found.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            summary = bulk_assign(school, academic_year, data['subject_teachers'], data['class_teachers'])
+        except AssignmentError as e:
+            return Response({'error': str(e), 'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(summary)
+    
+    @action(detail=False, methods=['post'])
+    def copy_from_year(self, request):
+        """Copy subject and class teacher assignments from one academic year to another."""
+        from .assignment_utils import AssignmentError, copy_assignments
+        
+        serializer = CopyAssignmentsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        school = request.user.school
+        years = AcademicYear.objects.filter(school=school).in_bulk([
+            serializer.validated_data['from_year'], serializer.validated_data['to_year']
+        ])
+        from_year = years.get(serializer.validated_data['from_year'])
+        to_year = years.get(serializer.validated_data['to_year'])
+        if not from_year or not to_year or from_year == to_year:
+            return Response(
+                {'error': 'from_year and to_year must be two different academic years.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            summary = copy_assignments(school, from_year, to_year)
+        except AssignmentError as e:
+            return Response({'error': str(e), 'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(summary)
 
 
 # Teacher Panel Views
@@ -558,21 +677,22 @@ class TeacherDashboardView(APIView):
     
     def get(self, request):
         try:
-            teacher = request.user.teacher_profile
+            teacher = Teacher.objects.select_related('user', 'school').prefetch_related(
+                *teacher_detail_prefetches()
+            ).get(user=request.user)
         except Teacher.DoesNotExist:
             return Response({'error': 'Teacher profile not found.'}, status=404)
         
-        # Get class teacher assignment
-        class_teacher_of = None
-        current_academic_year = AcademicYear.objects.filter(school=teacher.school, is_current=True).first()
+        current_academic_year = get_current_academic_year(teacher.school_id)
         
-        # Filter by current year if possible, else take first (legacy)
-        ct_assignments = teacher.class_teacher_of.all()
-        if current_academic_year:
-            ct_assignments = ct_assignments.filter(academic_year=current_academic_year)
-            
-        ct_assignment = ct_assignments.first()
+        def in_current_year(assignment):
+            # No current year set: keep every assignment (legacy)
+            return not current_academic_year or assignment.academic_year_id == current_academic_year.id
+        
+        # Assignments come from the prefetches TeacherSerializer also uses
+        ct_assignment = next(filter(in_current_year, teacher.class_teacher_of.all()), None)
         
+        class_teacher_of = None
         if ct_assignment:
             class_teacher_of = {
                 'id': ct_assignment.section.id,
@@ -583,21 +703,16 @@ class TeacherDashboardView(APIView):
                 ).count()
             }
         
-        # Get subject assignments
-        st_assignments = teacher.subject_assignments.select_related('section', 'subject')
-        if current_academic_year:
-            st_assignments = st_assignments.filter(academic_year=current_academic_year)
-
         subject_assignments = [{
             'section_id': a.section.id,
             'section': str(a.section),
             'subject_id': a.subject.id,
             'subject': a.subject.name
-        } for a in st_assignments]
+        } for a in filter(in_current_year, teacher.subject_assignments.all())]
         
         # Tuition Owner Stats
         tuition_stats = None
-        if request.user.is_owner and request.user.school.account_type == 'tuition':
+        if request.user.is_owner and teacher.school.account_type == 'tuition':
             tuition_stats = {
                 'total_students': Student.objects.filter(school=teacher.school, status='active').count(),
                 'total_batches': Section.objects.filter(school_class__school=teacher.school).count(),
@@ -613,8 +728,16 @@ class TeacherDashboardView(APIView):
 
 
 class TeacherStudentsView(APIView):
-    """Get students for teacher's class/subjects."""
+    """
+    Get students for teacher's class/subjects in the current academic year.
+    
+    Students come from one query filtered by subqueries on the teacher's
+    class and subject assignments, with user, class and section joined in.
+    Paginated; ?section=<id> narrows to one section and ?group_by=section
+    groups each page by section.
+    """
     permission_classes = [IsTeacher]
+    pagination_class = FlexiblePagination
     
     def get(self, request):
         try:
@@ -622,23 +745,41 @@ class TeacherStudentsView(APIView):
         except Teacher.DoesNotExist:
             return Response({'error': 'Teacher profile not found.'}, status=404)
         
-        # Get sections the teacher is associated with
-        section_ids = set()
-        
-        # Class teacher sections
-        for ct in teacher.class_teacher_of.all():
-            section_ids.add(ct.section_id)
-        
-        # Subject teacher sections
-        for st in teacher.subject_assignments.all():
-            section_ids.add(st.section_id)
+        class_sections = ClassTeacher.objects.filter(teacher=teacher)
+        subject_sections = SubjectTeacher.objects.filter(teacher=teacher)
+        current_year = get_current_academic_year(teacher.school_id)
+        if current_year:
+            class_sections = class_sections.filter(academic_year=current_year)
+            subject_sections = subject_sections.filter(academic_year=current_year)
         
         students = Student.objects.filter(
-            current_section_id__in=section_ids,
-            status='active'
-        ).select_related('current_class', 'current_section')
+            Q(current_section__in=class_sections.values('section_id'))
+            | Q(current_section__in=subject_sections.values('section_id')),
+            school_id=teacher.school_id,
+            status=Student.Status.ACTIVE
+        ).select_related('user', 'current_class', 'current_section')
         
-        return Response(StudentListSerializer(students, many=True).data)
+        section_id = request.query_params.get('section')
+        if section_id:
+            students = students.filter(current_section_id=section_id)
+        
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(students, request, view=self)
+        data = StudentListSerializer(page, many=True).data
+        
+        if request.query_params.get('group_by') == 'section':
+            # Keyed by section: classes sharing a numeric_value can interleave in the page order
+            groups = {}
+            for student, student_data in zip(page, data):
+                group = groups.setdefault(student.current_section_id, {
+                    'section_id': student.current_section_id,
+                    'section': student.class_name,
+                    'students': []
+                })
+                group['students'].append(student_data)
+            data = list(groups.values())
+        
+        return paginator.get_paginated_response(data)
 
 
 # Student Panel Views
@@ -696,7 +837,7 @@ class StudyMaterialViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not user.school:
             return self.serializer_class.Meta.model.objects.none()
-            
+        
         queryset = self.serializer_class.Meta.model.objects.filter(school=user.school)
         
         # Student filtering
@@ -707,10 +848,166 @@ class StudyMaterialViewSet(viewsets.ModelViewSet):
             else:
                 return queryset.none()
         
-        return queryset.select_related('section', 'subject', 'created_by')
+        return queryset.select_related('section__school_class', 'subject', 'created_by')
+    
+    def perform_create(self, serializer):
+        serializer.save(
+            school=self.request.user.school,
+            created_by=self.request.user
+        )
+    
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Cached material feed of a section, newest first.
+        
+        Students get their own section; staff pass ?section=. Optional ?subject=.
+        Responses carry an ETag (If-None-Match gives 304 while nothing changed).
+        With ?since=<cursor> only materials changed since that cursor are returned,
+        with the ids of all current materials so clients can drop deleted ones,
+        or 304 if nothing changed.
+        """
+        from django.http import HttpResponseNotModified
+        from .material_feed import (
+            InvalidCursor, feed_changes, feed_cursor, feed_etag,
+            get_feed_version, get_material_feed, parse_feed_cursor
+        )
+        
+        user = request.user
+        if user.role == 'student':
+            section_id = Student.objects.filter(user=user).values_list('current_section_id', flat=True).first()
+            if not section_id:
+                return Response({'cursor': None, 'results': []})
+        else:
+            section_id = request.query_params.get('section')
+            if not section_id or not section_id.isdigit() or not Section.objects.filter(
+                id=section_id, school_class__school=user.school
+            ).exists():
+                return Response({'error': 'A valid section is required.'}, status=status.HTTP_400_BAD_REQUEST)
+            section_id = int(section_id)
+        
+        subject_id = request.query_params.get('subject')
+        if subject_id and not subject_id.isdigit():
+            return Response({'error': 'Invalid subject.'}, status=status.HTTP_400_BAD_REQUEST)
+        subject_id = int(subject_id) if subject_id else None
+        
+        version = get_feed_version(section_id)
+        etag = feed_etag(section_id, subject_id, version)
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since_version, built_at = parse_feed_cursor(since)
+            except InvalidCursor as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            unchanged = since_version == version
+        else:
+            unchanged = etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+        if unchanged:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        
+        feed = get_material_feed(section_id, subject_id, version)
+        if since:
+            return Response(feed_changes(feed, built_at))
+        response = Response({'cursor': feed_cursor(feed), 'results': feed['items']})
+        response['ETag'] = etag
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Redirect to a signed direct URL for the file instead of streaming it through Django."""
+        from django.http import HttpResponseRedirect
+        from .material_uploads import signed_file_url
+        
+        material = self.get_object()
+        url = signed_file_url(material.file)
+        if not url:
+            return Response({'error': 'This material has no file.'}, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponseRedirect(request.build_absolute_uri(url))
+
+
+class MaterialUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet
+):
+    """
+    Chunked, resumable study material uploads.
+    
+    POST opens a session with {title, description, section, subject, file_name, total_size}.
+    PUT chunk/?offset=<received_bytes> sends the next raw chunk (application/octet-stream);
+    after a dropped connection, GET the session and continue from received_bytes.
+    POST complete/ queues the transfer to media storage, which creates the StudyMaterial.
+    """
+    permission_classes = [IsSchoolStaff, NotesFeatureEnabled]
+    serializer_class = MaterialUploadSerializer
+    
+    def get_queryset(self):
+        return MaterialUpload.objects.filter(
+            school=self.request.user.school,
+            created_by=self.request.user
+        )
     
     def perform_create(self, serializer):
         serializer.save(
             school=self.request.user.school,
             created_by=self.request.user
         )
+    
+    def destroy(self, request, *args, **kwargs):
+        """Cancel an upload; its received chunks are deleted with it."""
+        upload = self.get_object()
+        if upload.status in (MaterialUpload.Status.QUEUED, MaterialUpload.Status.TRANSFERRING):
+            return Response(
+                {'error': 'Upload is being transferred.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Append a raw chunk at ?offset=, which must equal received_bytes."""
+        from .material_uploads import UploadOffsetError, append_chunk
+        
+        upload = self.get_object()
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'offset must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            upload = append_chunk(upload, offset, request.stream, length)
+        except UploadOffsetError as e:
+            return Response(
+                {'error': str(e), 'received_bytes': e.received_bytes},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(MaterialUploadSerializer(upload).data)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Queue the transfer of a fully received file; also retries a failed transfer."""
+        from .material_uploads import queue_material_upload
+        
+        upload = self.get_object()
+        if upload.status not in (MaterialUpload.Status.UPLOADING, MaterialUpload.Status.FAILED):
+            return Response(
+                {'error': f'Upload is already {upload.status}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if upload.received_bytes != upload.total_size:
+            return Response(
+                {'error': f'Received {upload.received_bytes} of {upload.total_size} bytes.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queue_material_upload(upload)
+        return Response(MaterialUploadSerializer(upload).data, status=status.HTTP_202_ACCEPTED)
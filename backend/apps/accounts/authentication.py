@@ -0,0 +1,83 @@
+"""
+JWT authentication for the API.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class SchoolJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user's school and feature toggle in the
+    same query as the user.
+
+    request.user then carries both for the rest of the request, so the
+    permission classes (which all check the school and often the feature
+    toggle) run without further queries.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        try:
+            user = self.user_model.objects.select_related('school__feature_toggle').get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+
+class StatelessJWTAuthentication(SchoolJWTAuthentication):
+    """
+    JWT authentication that serves read requests without the users table.
+
+    For GET/HEAD/OPTIONS, request.user is built from the short-lived tenant
+    cache (see tenant_cache), which is checked for is_active and carries the
+    school's status and feature toggle. Writes may save request.user or
+    rely on its current state, so they load the full user from the database
+    as SchoolJWTAuthentication does.
+    """
+
+    def authenticate(self, request):
+        self.stateless = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        from .tenant_cache import get_cached_user
+
+        # Revocation compares the password hash, which is never cached
+        if not self.stateless or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        user = get_cached_user(user_id, validated_token.get('school_id'))
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        # The school was deleted (cached as missing) while the user row was still cached
+        if user.school_id and user.school is None:
+            raise AuthenticationFailed(_('School not found'), code='school_not_found')
+
+        return user
@@ -6,6 +6,8 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.utils import timezone
 
+from apps.core.tracking import FieldTrackerMixin
+
 
 class UserManager(BaseUserManager):
     """Custom user manager for email-based authentication."""
@@ -30,14 +32,22 @@ class UserManager(BaseUserManager):
             raise ValueError('Superuser must have is_superuser=True.')
         
         return self.create_user(email, password, **extra_fields)
+    
+    def get_by_natural_key(self, username):
+        # Used by the login backend; the login response needs the school and its feature toggle
+        return self.select_related('school__feature_toggle').get(**{self.model.USERNAME_FIELD: username})
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(FieldTrackerMixin, AbstractBaseUser, PermissionsMixin):
     """
     Custom User model with role-based access control.
     Uses email as the username field.
     """
     
+    # Name changes reorder student roll numbers; the rest decide whether
+    # cached authentication state must be cleared after commit
+    tracked_fields = ['first_name', 'last_name', 'is_active', 'role', 'school_id', 'is_owner']
+    
     class Role(models.TextChoices):
         PLATFORM_ADMIN = 'platform_admin', 'Platform Admin'
         SCHOOL_ADMIN = 'school_admin', 'School Admin'
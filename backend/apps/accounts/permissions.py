@@ -1,9 +1,31 @@
 """
 Custom permissions for role-based access control.
+
+The school and feature toggle are read from request.user, which
+SchoolJWTAuthentication loads together with the user, so checking several
+permissions on a request costs no further queries.
 """
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import permissions
 
 
+def get_active_school(request):
+    """The authenticated user's school if it is active, else None."""
+    user = request.user
+    if not user.is_authenticated or not user.school_id:
+        return None
+    school = user.school
+    return school if school is not None and school.is_active else None
+
+
+def get_feature_toggle(school):
+    """The school's FeatureToggle, or None if it has none."""
+    try:
+        return school.feature_toggle
+    except ObjectDoesNotExist:
+        return None
+
+
 class IsPlatformAdmin(permissions.BasePermission):
     """Only platform admins can access."""
     
@@ -18,7 +40,8 @@ class IsSchoolAdmin(permissions.BasePermission):
     """Only school admins can access."""
     
     def has_permission(self, request, view):
-        if not (request.user.is_authenticated and request.user.school and request.user.school.is_active):
+        school = get_active_school(request)
+        if not school:
             return False
             
         # Standard School Admin
@@ -28,7 +51,7 @@ class IsSchoolAdmin(permissions.BasePermission):
         # Tuition Owner (Role is Teacher, but owns the Tuition)
         if (request.user.role == 'teacher' and 
             request.user.is_owner and 
-            request.user.school.account_type == 'tuition'):
+            school.account_type == 'tuition'):
             return True
             
         return False
@@ -38,11 +61,9 @@ class IsAccountAdmin(permissions.BasePermission):
     """Only account admins can access."""
     
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            request.user.role == 'account_admin' and
-            request.user.school and
-            request.user.school.is_active
+        return bool(
+            get_active_school(request) and
+            request.user.role == 'account_admin'
         )
 
 
@@ -50,11 +71,9 @@ class IsTeacher(permissions.BasePermission):
     """Only teachers can access."""
     
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            request.user.role == 'teacher' and
-            request.user.school and
-            request.user.school.is_active
+        return bool(
+            get_active_school(request) and
+            request.user.role == 'teacher'
         )
 
 
@@ -62,18 +81,13 @@ class IsStudent(permissions.BasePermission):
     """Only students can access."""
     
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        if request.user.role != 'student':
-            return False
-        if not request.user.school:
-            return False
-        if not request.user.school.is_active:
+        school = get_active_school(request)
+        if not school or request.user.role != 'student':
             return False
         # Check if student login feature is enabled
-        if hasattr(request.user.school, 'feature_toggle'):
-            if not request.user.school.feature_toggle.student_login_enabled:
-                return False
+        toggle = get_feature_toggle(school)
+        if toggle and not toggle.student_login_enabled:
+            return False
         return True
 
 
@@ -81,11 +95,9 @@ class IsSchoolStaff(permissions.BasePermission):
     """School Admin, Account Admin, or Teacher can access."""
     
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            request.user.role in ['school_admin', 'account_admin', 'teacher'] and
-            request.user.school and
-            request.user.school.is_active
+        return bool(
+            get_active_school(request) and
+            request.user.role in ['school_admin', 'account_admin', 'teacher']
         )
 
 
@@ -93,11 +105,7 @@ class IsSchoolMember(permissions.BasePermission):
     """Any member of the school can access."""
     
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            request.user.school and
-            request.user.school.is_active
-        )
+        return get_active_school(request) is not None
 
 
 class FeatureEnabled(permissions.BasePermission):
@@ -115,16 +123,13 @@ class FeatureEnabled(permissions.BasePermission):
         if request.user.role == 'platform_admin':
             return True
         
-        if not request.user.school:
+        if not request.user.school_id:
             return False
         
         # Check if feature is enabled
-        try:
-            toggle = request.user.school.feature_toggle
-            if self.feature_name:
-                return getattr(toggle, f'{self.feature_name}_enabled', True)
-        except Exception:
-            pass
+        toggle = get_feature_toggle(request.user.school)
+        if toggle and self.feature_name:
+            return getattr(toggle, f'{self.feature_name}_enabled', True)
         
         return True
 
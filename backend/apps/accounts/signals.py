@@ -0,0 +1,42 @@
+"""
+Signals for the accounts app.
+Keeps the tenant cache used by StatelessJWTAuthentication in sync with users,
+schools and feature toggles.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender='accounts.User')
+def handle_user_save(sender, instance, created, **kwargs):
+    """
+    Drop the cached user on any change. Changes to what permissions depend
+    on (deactivation, role, school) are also cleared after commit.
+    """
+    if created:
+        return
+    from .tenant_cache import clear_user_state
+    clear_user_state(instance.pk, after_commit=any(
+        instance.has_changed(field) for field in ('is_active', 'role', 'school_id', 'is_owner')
+    ))
+
+
+@receiver(post_delete, sender='accounts.User')
+def handle_user_delete(sender, instance, **kwargs):
+    from .tenant_cache import clear_user_state
+    clear_user_state(instance.pk)
+
+
+@receiver(post_save, sender='schools.School')
+@receiver(post_delete, sender='schools.School')
+def handle_school_change(sender, instance, **kwargs):
+    """Drop the cached school on any change, including suspension and activation."""
+    from .tenant_cache import clear_school_state
+    clear_school_state(instance.pk)
+
+
+@receiver(post_save, sender='schools.FeatureToggle')
+@receiver(post_delete, sender='schools.FeatureToggle')
+def handle_feature_toggle_change(sender, instance, **kwargs):
+    from .tenant_cache import clear_school_state
+    clear_school_state(instance.school_id)
@@ -0,0 +1,98 @@
+"""
+Short-lived cache of the user and school state that authentication needs.
+
+StatelessJWTAuthentication builds request.user from these entries instead
+of querying the users table: one entry per user (the user row without the
+password) and one per school (the School with its FeatureToggle). Both
+expire after TENANT_CACHE_TIMEOUT and are cleared by signals when a user,
+school or feature toggle is saved or deleted, so suspensions, toggle
+changes and deactivations apply on the next request in this process and
+within the timeout everywhere else.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+TENANT_CACHE_TIMEOUT = 60  # seconds
+
+# Cached for ids that no longer exist, since None means a cache miss
+MISSING = 'missing'
+
+
+def _user_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def _school_key(school_id):
+    return f'auth_school:{school_id}'
+
+
+def _user_fields():
+    User = get_user_model()
+    return [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def _load_user_values(user_id):
+    User = get_user_model()
+    values = User.objects.filter(pk=user_id).values(*_user_fields()).first()
+    cache.set(_user_key(user_id), values or MISSING, TENANT_CACHE_TIMEOUT)
+    return values or MISSING
+
+
+def _load_school(school_id):
+    from apps.schools.models import School
+
+    school = School.objects.select_related('feature_toggle').filter(pk=school_id).first()
+    cache.set(_school_key(school_id), school or MISSING, TENANT_CACHE_TIMEOUT)
+    return school or MISSING
+
+
+def get_cached_user(user_id, school_id=None):
+    """
+    Build a User from the cache, with its school and feature toggle attached.
+
+    The instance is a regular User whose password is deferred (loaded from
+    the database if accessed). It must not be used for writes to the user,
+    as the cached values may be up to TENANT_CACHE_TIMEOUT old.
+
+    Args:
+        user_id: User ID
+        school_id: Expected school ID (from the token), fetched in the same
+            cache round trip as the user
+
+    Returns:
+        User instance, or None if the user does not exist
+    """
+    User = get_user_model()
+    keys = [_user_key(user_id)] + ([_school_key(school_id)] if school_id else [])
+    cached = cache.get_many(keys)
+
+    values = cached.get(_user_key(user_id)) or _load_user_values(user_id)
+    if values == MISSING:
+        return None
+    user = User.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
+    if user.school_id:
+        if user.school_id == school_id:
+            school = cached.get(_school_key(school_id)) or _load_school(school_id)
+        else:
+            school = cache.get(_school_key(user.school_id)) or _load_school(user.school_id)
+        User.school.field.set_cached_value(user, None if school == MISSING else school)
+    return user
+
+
+def clear_user_state(user_id, after_commit=True):
+    """
+    Drop a cached user now and, with after_commit, again once the surrounding
+    transaction commits, so a concurrent request cannot re-cache the old row.
+    """
+    cache.delete(_user_key(user_id))
+    if after_commit:
+        transaction.on_commit(lambda: cache.delete(_user_key(user_id)))
+
+
+def clear_school_state(school_id):
+    """Drop a cached school now and again after commit."""
+    cache.delete(_school_key(school_id))
+    transaction.on_commit(lambda: cache.delete(_school_key(school_id)))
@@ -1,11 +1,23 @@
 """
 Tests for authentication and user management.
 """
+import os
+from unittest import skipUnless
+
 import pytest
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.accounts.authentication import SchoolJWTAuthentication, StatelessJWTAuthentication
+from apps.accounts.permissions import (
+    IsSchoolAdmin, IsSchoolMember, IsSchoolStaff, IsStudent, NotesFeatureEnabled
+)
 
 User = get_user_model()
 
@@ -167,3 +179,217 @@ class SchoolIsolationTests(TestCase):
             response.data['user']['school']['name'],
             'School One'
         )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RequestAuthenticationTests(TestCase):
+    """Test cases for loading the user's school and feature toggle with the user."""
+    
+    def setUp(self):
+        from apps.schools.models import School
+        
+        self.school = School.objects.create(name='School One', code='SCH001')
+        self.admin = User.objects.create_user(
+            email='admin@school1.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='One',
+            role='school_admin',
+            school=self.school
+        )
+        self.token = str(RefreshToken.for_user(self.admin).access_token)
+    
+    def test_permission_checks_reuse_authenticated_user(self):
+        """Test that authentication and every permission check cost a single query."""
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}'))
+        
+        with self.assertNumQueries(1):
+            request.user, request.auth = SchoolJWTAuthentication().authenticate(request)
+            results = [
+                permission().has_permission(request, None)
+                for permission in (IsSchoolAdmin, IsSchoolStaff, IsSchoolMember, IsStudent, NotesFeatureEnabled)
+            ]
+        
+        self.assertEqual(results, [True, True, True, False, False])
+    
+    def test_suspended_school_is_rejected(self):
+        """Test that users of a suspended school fail the school permissions."""
+        self.school.status = self.school.Status.SUSPENDED
+        self.school.save()
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}'))
+        request.user, request.auth = SchoolJWTAuthentication().authenticate(request)
+        
+        self.assertFalse(IsSchoolAdmin().has_permission(request, None))
+        self.assertFalse(IsSchoolMember().has_permission(request, None))
+    
+    def test_api_requests_use_school_authentication(self):
+        """Test that API requests authenticate through SchoolJWTAuthentication."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        
+        response = client.get('/api/school/academic-years/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        authenticator = response.renderer_context['request'].successful_authenticator
+        self.assertIsInstance(authenticator, SchoolJWTAuthentication)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatelessAuthenticationTests(TestCase):
+    """Test cases for authenticating reads from the tenant cache."""
+    
+    def setUp(self):
+        from apps.schools.models import School
+        
+        self.school = School.objects.create(name='School One', code='SCH001')
+        self.admin = User.objects.create_user(
+            email='admin@school1.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='One',
+            role='school_admin',
+            school=self.school
+        )
+        self.token = str(RefreshToken.for_user(self.admin).access_token)
+        cache.clear()
+    
+    def _authenticate(self, method='get'):
+        factory_method = getattr(APIRequestFactory(), method)
+        request = Request(factory_method('/', HTTP_AUTHORIZATION=f'Bearer {self.token}'))
+        request.user, request.auth = StatelessJWTAuthentication().authenticate(request)
+        return request
+    
+    def test_reads_are_served_from_the_cache(self):
+        """Test that once cached, reads authenticate and pass permissions without queries."""
+        self._authenticate()
+        
+        with self.assertNumQueries(0):
+            request = self._authenticate()
+            self.assertTrue(IsSchoolAdmin().has_permission(request, None))
+            self.assertFalse(NotesFeatureEnabled().has_permission(request, None))
+        
+        self.assertEqual(request.user, self.admin)
+        self.assertEqual(request.user.email, 'admin@school1.com')
+        self.assertEqual(request.user.school, self.school)
+    
+    def test_writes_load_the_user_from_the_database(self):
+        """Test that unsafe methods get the full user from the database."""
+        self._authenticate()
+        
+        with self.assertNumQueries(1):
+            request = self._authenticate('post')
+        self.assertTrue(request.user.check_password('AdminPass123!'))
+    
+    def test_deactivation_is_applied_immediately(self):
+        """Test that deactivating a user clears the cached state."""
+        self._authenticate()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = False
+            self.admin.save()
+        
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+    
+    def test_school_status_and_toggles_are_applied_immediately(self):
+        """Test that suspending a school and changing toggles clear the cached school."""
+        self._authenticate()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.school.feature_toggle.notes_enabled = True
+            self.school.feature_toggle.save()
+        self.assertTrue(NotesFeatureEnabled().has_permission(self._authenticate(), None))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.school.status = self.school.Status.SUSPENDED
+            self.school.save(update_fields=['status'])
+        self.assertFalse(IsSchoolMember().has_permission(self._authenticate(), None))
+    
+    def test_missing_school_is_rejected(self):
+        """Test that a school cached as missing fails authentication instead of erroring."""
+        from apps.accounts.tenant_cache import MISSING, TENANT_CACHE_TIMEOUT, _school_key
+        
+        self._authenticate()
+        cache.set(_school_key(self.school.id), MISSING, TENANT_CACHE_TIMEOUT)
+        
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+    
+    def test_api_read_and_write(self):
+        """Test that API reads and writes work with the cached user."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        
+        response = client.post('/api/school/academic-years/', {
+            'name': '2024-25', 'start_date': '2024-04-01', 'end_date': '2025-03-31', 'is_current': True
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = client.get('/api/school/academic-years/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['name'], '2024-25')
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+class LoginQueryTests(TestCase):
+    """Test cases for the queries of the login flow."""
+    
+    login_url = '/api/auth/login/'
+    
+    def setUp(self):
+        from apps.schools.models import School
+        
+        self.school = School.objects.create(name='School One', code='SCH001')
+        self.admin = User.objects.create_user(
+            email='admin@school1.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='One',
+            role='school_admin',
+            school=self.school
+        )
+        self.client = APIClient()
+        cache.clear()
+    
+    def _login(self):
+        return self.client.post(self.login_url, {
+            'email': 'admin@school1.com',
+            'password': 'AdminPass123!'
+        }, format='json')
+    
+    def test_login_loads_user_once(self):
+        """Test that login loads the user with school and toggles, then updates last_login."""
+        with self.assertNumQueries(2) as context:
+            response = self._login()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['school_id'], self.school.id)
+        self.assertIn('notes', response.data['user']['feature_toggles'])
+        self.assertIn('JOIN "feature_toggles"', context.captured_queries[0]['sql'])
+        self.assertTrue(context.captured_queries[1]['sql'].startswith('UPDATE'))
+        self.admin.refresh_from_db()
+        self.assertIsNotNone(self.admin.last_login)
+    
+    @skipUnless(os.environ.get('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS=1 to run benchmarks')
+    def test_repeated_logins_use_two_queries(self):
+        """Benchmark: every one of 200 logins costs two queries, with nothing cached between them."""
+        for _ in range(200):
+            cache.clear()  # Login throttle
+            with self.assertNumQueries(2):
+                response = self._login()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    @skipUnless(os.environ.get('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS=1 to run benchmarks')
+    def test_login_throughput(self):
+        """Benchmark: 200 logins in under 5 seconds."""
+        import time
+        
+        started = time.perf_counter()
+        for _ in range(200):
+            cache.clear()  # Login throttle
+            response = self._login()
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 5, f'200 logins took {elapsed:.2f} s')
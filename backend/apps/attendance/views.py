@@ -13,6 +13,7 @@ from apps.accounts.permissions import (
     AttendanceFeatureEnabled
 )
 from apps.academic.models import Student, Teacher, Section, ClassTeacher
+from apps.core.pagination import FlexiblePagination
 from .models import StudentAttendance, TeacherAttendance, AbsentAlert
 from .serializers import (
     StudentAttendanceSerializer, BulkStudentAttendanceSerializer,
@@ -25,6 +26,8 @@ from .tasks import schedule_absent_alert, cancel_absent_alert
 class StudentAttendanceViewSet(viewsets.ModelViewSet):
     """ViewSet for student attendance."""
     serializer_class = StudentAttendanceSerializer
+    pagination_class = FlexiblePagination
+    keyset_ordering = ('-date', '-id')
     
     def get_permissions(self):
         return [AttendanceFeatureEnabled(), IsSchoolStaff()]
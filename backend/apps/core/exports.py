@@ -0,0 +1,76 @@
+"""
+CSV/XLSX export helpers.
+
+Rows are consumed from a generator. CSV exports are streamed to the client
+row by row and use constant memory regardless of how many rows they
+contain. XLSX exports are not streamed: the workbook is written to a
+temporary file on disk and sent once it is complete.
+"""
+import csv
+import re
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+
+
+EXPORT_FILE_TYPES = ['csv', 'xlsx']
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Characters Excel does not allow in sheet titles
+INVALID_SHEET_TITLE_CHARS = re.compile(r'[\\/*?:\[\]]')
+
+
+class Echo:
+    """File-like object that returns written values instead of buffering them."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows, filename):
+    """Stream rows as a CSV download."""
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def stream_xlsx(header, rows, filename, sheet_title='Sheet1'):
+    """
+    Write rows to an XLSX download.
+    Not streaming: the whole workbook is saved to a temporary file before the
+    first byte is sent. openpyxl's write-only mode keeps memory low while the
+    rows are written, but the response waits for the last row.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=INVALID_SHEET_TITLE_CHARS.sub('-', sheet_title)[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type=XLSX_CONTENT_TYPE
+    )
+
+
+def export_response(file_type, header, rows, filename, sheet_title='Sheet1'):
+    """Build an export response for the requested file type."""
+    if file_type == 'xlsx':
+        return stream_xlsx(header, rows, filename, sheet_title)
+    return stream_csv(header, rows, filename)
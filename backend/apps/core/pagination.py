@@ -0,0 +1,200 @@
+"""
+Pagination for high-volume list endpoints.
+
+FlexiblePagination keeps the default page-number responses and adds two
+opt-ins per request:
+
+- ?pagination=cursor (or following a returned cursor link) switches to
+  keyset pagination on the viewset's keyset_ordering. Each page is a
+  WHERE (key) < (last key) ... LIMIT query, so deep pages cost the same as
+  page 1 and no COUNT(*) is run.
+- ?count=false keeps page numbers but skips the COUNT(*); the response
+  then has next/previous links and no count.
+
+A viewset opts in by setting pagination_class = FlexiblePagination and
+keyset_ordering, a tuple of non-null model fields ending in a unique one
+(usually id).
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite key such as ('-date', '-id').
+
+    The cursor holds the key values of the row a page ends at, so the next
+    page is filtered with a row comparison instead of an OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self._flip(field) for field in self.ordering] if reverse else list(self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(ordering, cursor['key']))
+
+        # One extra row tells whether another page follows
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going backwards, the page we came from follows; going forwards, one precedes
+        has_next = reverse or has_more
+        has_previous = has_more if reverse else cursor is not None
+        self.next_key = self._key(rows[-1]) if rows and has_next else None
+        self.previous_key = self._key(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        return self.encode_cursor(self.next_key, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_key is None:
+            return None
+        return self.encode_cursor(self.previous_key, reverse=True)
+
+    def encode_cursor(self, key, reverse):
+        # str() keeps full microsecond precision for datetimes, unlike DjangoJSONEncoder
+        payload = json.dumps({'k': key, 'r': reverse}, default=str, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            key, reverse = payload['k'], payload['r']
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(key, list) or len(key) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'key': key, 'reverse': bool(reverse)}
+
+    def _key(self, instance):
+        return [instance.serializable_value(field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _after(ordering, key):
+        """Rows after key in ordering: (a > x) OR (a = x AND b > y) OR ..."""
+        conditions = []
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = [Q(**{ordering[i].lstrip('-'): key[i]}) for i in range(position)]
+            conditions.append(reduce(and_, equal + [Q(**{f'{name}__{lookup}': key[position]})]))
+        return reduce(or_, conditions)
+
+
+class FlexiblePagination(PageNumberPagination):
+    """
+    Page-number pagination with per-request opt-ins for keyset pagination
+    (?pagination=cursor) and for skipping the total count (?count=false).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.counted = True
+
+        if self._wants_keyset(request, view):
+            self.keyset = KeysetPagination(view.keyset_ordering, self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if request.query_params.get(self.count_query_param, '').lower() in ('false', '0'):
+            self.counted = False
+            return self._paginate_without_count(queryset, request)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def _wants_keyset(self, request, view):
+        if not getattr(view, 'keyset_ordering', None):
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def _paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound('Invalid page.')
+
+        self.request = request
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        if not self.counted:
+            return Response({
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data
+            })
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.counted:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.counted:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
@@ -0,0 +1,59 @@
+"""
+In-memory field change tracking for models.
+"""
+
+
+class FieldTrackerMixin:
+    """
+    Snapshot selected fields when an instance is loaded from the database so
+    changes can be detected on save without re-reading the row.
+    
+    Usage:
+        class Student(FieldTrackerMixin, models.Model):
+            tracked_fields = ['current_section_id', 'status']
+    
+    Fields are given by attname (e.g. 'current_section_id' for a ForeignKey).
+    Fields that were deferred when the instance was loaded are never
+    reported as changed.
+    """
+    tracked_fields = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+    
+    def _snapshot_tracked_fields(self, fields=None):
+        if fields is None or not hasattr(self, '_tracked_values'):
+            self._tracked_values = {}
+            fields = self.tracked_fields
+        for field in fields:
+            if field in self.__dict__:
+                self._tracked_values[field] = self.__dict__[field]
+    
+    def has_changed(self, field):
+        """Whether a tracked field differs from its value when loaded or last saved."""
+        tracked_values = getattr(self, '_tracked_values', {})
+        if field not in tracked_values:
+            return False
+        return tracked_values[field] != self.__dict__.get(field)
+    
+    def get_original(self, field, default=None):
+        """Value of a tracked field when loaded or last saved."""
+        return getattr(self, '_tracked_values', {}).get(field, default)
+    
+    @property
+    def changed_fields(self):
+        """Names of tracked fields that have changed."""
+        return [field for field in self.tracked_fields if self.has_changed(field)]
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save handlers have seen the old values; the saved values are the new baseline
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._snapshot_tracked_fields()
+        else:
+            attnames = {self._meta.get_field(name).attname for name in update_fields}
+            self._snapshot_tracked_fields([f for f in self.tracked_fields if f in attnames])
@@ -1,5 +1,17 @@
 from django.contrib import admin
-from .models import Exam, ExamSubject, ExamResult, ReportCard
+from .models import Exam, ExamSubject, ExamResult, ReportCard, GradingScale, GradeBand
+
+
+class GradeBandInline(admin.TabularInline):
+    model = GradeBand
+    extra = 0
+
+
+@admin.register(GradingScale)
+class GradingScaleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'school', 'scale_type', 'pass_percentage', 'is_default']
+    list_filter = ['scale_type', 'school']
+    inlines = [GradeBandInline]
 
 
 @admin.register(Exam)
@@ -16,7 +28,7 @@ class ExamSubjectAdmin(admin.ModelAdmin):
 
 @admin.register(ExamResult)
 class ExamResultAdmin(admin.ModelAdmin):
-    list_display = ['student', 'exam_subject', 'marks_obtained', 'is_absent']
+    list_display = ['student', 'exam_subject', 'marks_obtained', 'percentage', 'grade', 'is_absent']
     list_filter = ['exam_subject__exam', 'is_absent']
     search_fields = ['student__user__first_name', 'student__admission_number']
 
@@ -0,0 +1,258 @@
+"""
+Exam analytics engine.
+
+Pulls every result of an exam with a single values_list query and computes
+distributions, percentiles, pass rates, grade histograms and subject
+difficulty with NumPy arrays. Results are cached per exam and invalidated
+through a results-version counter that is bumped whenever marks change. The
+counter is kept in the shared cache (CACHE_URL), so a bump made by any web or
+worker process is seen by all of them.
+"""
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+from .grading import get_exam_scale
+from .models import ExamResult
+
+
+ANALYTICS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+PERCENTILE_BANDS = [10, 25, 50, 75, 90]
+TOP_PERFORMERS_COUNT = 5
+
+RESULT_FIELDS = (
+    'student_id',
+    'student__user__first_name',
+    'student__user__last_name',
+    'student__admission_number',
+    'exam_subject__school_class_id',
+    'exam_subject__school_class__name',
+    'exam_subject__subject_id',
+    'exam_subject__subject__name',
+    'exam_subject__max_marks',
+    'exam_subject__passing_marks',
+    'marks_obtained',
+    'is_absent',
+)
+
+
+def _version_key(exam_id):
+    return f'exam_results_version:{exam_id}'
+
+
+def get_results_version(exam_id):
+    """Return the current results version for an exam."""
+    # Seed with a timestamp (ms) so an expired or evicted counter never reuses an old version
+    return cache.get_or_set(_version_key(exam_id), int(time.time() * 1000), ANALYTICS_CACHE_TIMEOUT)
+
+
+def bump_results_version(exam_id):
+    """Invalidate cached analytics after results of an exam change."""
+    try:
+        cache.incr(_version_key(exam_id))
+    except ValueError:
+        cache.set(_version_key(exam_id), int(time.time() * 1000), ANALYTICS_CACHE_TIMEOUT)
+
+
+def get_exam_analytics(exam):
+    """
+    Return analytics for an exam, served from cache when results are unchanged.
+
+    Args:
+        exam: Exam instance
+
+    Returns:
+        dict with overall, per-class and per-subject statistics
+    """
+    version = get_results_version(exam.id)
+    cache_key = f'exam_analytics:{exam.id}:{version}'
+
+    data = cache.get(cache_key)
+    if data is None:
+        data = compute_exam_analytics(exam)
+        data['version'] = version
+        cache.set(cache_key, data, ANALYTICS_CACHE_TIMEOUT)
+    return data
+
+
+def compute_exam_analytics(exam):
+    """Compute analytics for an exam from a single results query."""
+    rows = list(
+        ExamResult.objects.filter(exam_subject__exam=exam).values_list(*RESULT_FIELDS)
+    )
+
+    scale = get_exam_scale(exam)
+    exam_data = {'id': exam.id, 'name': exam.name}
+    if not rows:
+        return {
+            'exam': exam_data,
+            'overall': _summary(np.empty(0), scale),
+            'classes': [],
+            'subjects': [],
+        }
+
+    (student_ids, first_names, last_names, admission_numbers,
+     class_ids, class_names, subject_ids, subject_names,
+     max_marks, passing_marks, marks, absent) = zip(*rows)
+
+    student_ids = np.array(student_ids, dtype=np.int64)
+    class_ids = np.array(class_ids, dtype=np.int64)
+    subject_ids = np.array(subject_ids, dtype=np.int64)
+    max_marks = np.array(max_marks, dtype=float)
+    passing_marks = np.array(passing_marks, dtype=float)
+    absent = np.array(absent, dtype=bool) | np.array([m is None for m in marks])
+    marks = np.array([0 if m is None else m for m in marks], dtype=float)
+    marks[absent] = 0
+
+    subject_pct = _safe_percentage(marks, max_marks)
+    subject_passed = ~absent & (marks >= passing_marks)
+
+    # Per-student totals, aggregated with bincount instead of Python loops
+    students, first_index, student_idx = np.unique(
+        student_ids, return_index=True, return_inverse=True
+    )
+    student_obtained = np.bincount(student_idx, weights=marks)
+    student_max = np.bincount(student_idx, weights=max_marks)
+    student_pct = _safe_percentage(student_obtained, student_max)
+    student_class = class_ids[first_index]
+    student_info = {
+        int(student_ids[i]): {
+            'student_id': int(student_ids[i]),
+            'student_name': f'{first_names[i]} {last_names[i]}'.strip(),
+            'admission_number': admission_numbers[i],
+            'class_name': class_names[i],
+        }
+        for i in first_index
+    }
+
+    overall = _summary(student_pct, scale)
+    overall.update(_performers(students, student_pct, student_info))
+
+    class_name_by_id = dict(zip(class_ids.tolist(), class_names))
+    subject_name_by_id = dict(zip(subject_ids.tolist(), subject_names))
+
+    classes = []
+    for class_id in np.unique(class_ids):
+        in_class = student_class == class_id
+        row_in_class = class_ids == class_id
+        class_data = {
+            'class_id': int(class_id),
+            'class_name': class_name_by_id[int(class_id)],
+        }
+        class_data.update(_summary(student_pct[in_class], scale))
+        class_data.update(_performers(students[in_class], student_pct[in_class], student_info))
+        class_data['subjects'] = _subject_breakdown(
+            subject_ids[row_in_class], subject_name_by_id, scale,
+            subject_pct[row_in_class], subject_passed[row_in_class], absent[row_in_class]
+        )
+        classes.append(class_data)
+
+    return {
+        'exam': exam_data,
+        'overall': overall,
+        'classes': classes,
+        'subjects': _subject_breakdown(
+            subject_ids, subject_name_by_id, scale,
+            subject_pct, subject_passed, absent
+        ),
+    }
+
+
+def compare_exams(exams):
+    """Return headline analytics for several exams side by side."""
+    comparison = []
+    for exam in exams:
+        overall = get_exam_analytics(exam)['overall']
+        comparison.append({
+            'exam_id': exam.id,
+            'exam_name': exam.name,
+            'start_date': exam.start_date,
+            'students': overall['count'],
+            'mean': overall['mean'],
+            'median': overall['median'],
+            'std_dev': overall['std_dev'],
+            'pass_rate': overall['pass_rate'],
+        })
+    return comparison
+
+
+def _safe_percentage(obtained, maximum):
+    pct = np.zeros_like(obtained, dtype=float)
+    np.divide(obtained, maximum, out=pct, where=maximum > 0)
+    return pct * 100
+
+
+def _round(value):
+    return round(float(value), 2)
+
+
+def _summary(percentages, scale, passed=None):
+    """Descriptive statistics for an array of percentages."""
+    count = int(percentages.size)
+    if count == 0:
+        return {
+            'count': 0,
+            'mean': None,
+            'median': None,
+            'std_dev': None,
+            'min': None,
+            'max': None,
+            'percentiles': {f'p{p}': None for p in PERCENTILE_BANDS},
+            'pass_rate': None,
+            'grade_distribution': scale.distribution(percentages),
+        }
+
+    if passed is None:
+        passed = percentages >= scale.pass_percentage
+
+    return {
+        'count': count,
+        'mean': _round(percentages.mean()),
+        'median': _round(np.median(percentages)),
+        'std_dev': _round(percentages.std()),
+        'min': _round(percentages.min()),
+        'max': _round(percentages.max()),
+        'percentiles': {
+            f'p{p}': _round(value)
+            for p, value in zip(PERCENTILE_BANDS, np.percentile(percentages, PERCENTILE_BANDS))
+        },
+        'pass_rate': _round(passed.mean() * 100),
+        'grade_distribution': scale.distribution(percentages),
+    }
+
+
+def _performers(students, percentages, student_info):
+    """Top and bottom performers by overall percentage."""
+    order = np.argsort(-percentages, kind='stable')
+
+    def describe(indices):
+        return [
+            {**student_info[int(students[i])], 'percentage': _round(percentages[i])}
+            for i in indices
+        ]
+
+    count = min(TOP_PERFORMERS_COUNT, order.size)
+    return {
+        'top_performers': describe(order[:count]),
+        'bottom_performers': describe(order[::-1][:count]),
+    }
+
+
+def _subject_breakdown(subject_ids, names, scale, percentages, passed, absent):
+    """Per-subject statistics, hardest subject first."""
+    subjects = []
+    for subject_id in np.unique(subject_ids):
+        in_subject = subject_ids == subject_id
+        data = {
+            'subject_id': int(subject_id),
+            'subject_name': names[int(subject_id)],
+            'absent_count': int(absent[in_subject].sum()),
+        }
+        data.update(_summary(percentages[in_subject], scale, passed[in_subject]))
+        # 0 = everyone scored full marks, 1 = everyone scored zero
+        data['difficulty_index'] = _round(1 - data['mean'] / 100)
+        subjects.append(data)
+
+    subjects.sort(key=lambda s: s['difficulty_index'], reverse=True)
+    return subjects
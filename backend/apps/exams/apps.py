@@ -5,3 +5,7 @@ class ExamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.exams'
     verbose_name = 'Exam Management'
+    
+    def ready(self):
+        # Import signals to register them
+        from . import signals  # noqa: F401
@@ -0,0 +1,180 @@
+"""
+Grading scale utilities.
+
+A GradingScale is compiled into a sorted threshold table once and then
+queried with bisect for single values or numpy.searchsorted for batches,
+replacing the if/elif grade chains.
+"""
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from .models import ExamResult, GradingScale
+
+
+# (min_percentage, label, grade_point)
+PERCENTAGE_BANDS = [
+    (90, 'A+', None),
+    (80, 'A', None),
+    (70, 'B+', None),
+    (60, 'B', None),
+    (50, 'C', None),
+    (35, 'D', None),
+    (0, 'F', None),
+]
+
+CBSE_9_POINT_BANDS = [
+    (91, 'A1', 10),
+    (81, 'A2', 9),
+    (71, 'B1', 8),
+    (61, 'B2', 7),
+    (51, 'C1', 6),
+    (41, 'C2', 5),
+    (33, 'D', 4),
+    (21, 'E1', 0),
+    (0, 'E2', 0),
+]
+
+GPA_BANDS = [
+    (90, 'A', 4),
+    (80, 'B', 3),
+    (70, 'C', 2),
+    (60, 'D', 1),
+    (0, 'F', 0),
+]
+
+PRESETS = {
+    GradingScale.ScaleType.PERCENTAGE: {
+        'name': 'Percentage Bands', 'pass_percentage': 35, 'bands': PERCENTAGE_BANDS
+    },
+    GradingScale.ScaleType.CBSE_9_POINT: {
+        'name': 'CBSE 9-Point', 'pass_percentage': 33, 'bands': CBSE_9_POINT_BANDS
+    },
+    GradingScale.ScaleType.GPA: {
+        'name': 'GPA (4.0)', 'pass_percentage': 60, 'bands': GPA_BANDS
+    },
+}
+
+REGRADE_BATCH_SIZE = 500
+
+
+class CompiledScale:
+    """Grading scale compiled into parallel arrays sorted by threshold."""
+
+    def __init__(self, bands, pass_percentage):
+        bands = sorted(bands, key=lambda band: band[0])
+        self.thresholds = [float(band[0]) for band in bands]
+        self.labels = [band[1] for band in bands]
+        self.points = [None if band[2] is None else float(band[2]) for band in bands]
+        self.pass_percentage = float(pass_percentage)
+        self._threshold_array = np.array(self.thresholds)
+        self._label_array = np.array(self.labels, dtype=object)
+
+    def _index(self, percentage):
+        # Anything below the lowest threshold gets the lowest grade
+        return max(bisect_right(self.thresholds, float(percentage)) - 1, 0)
+
+    def grade_for(self, percentage):
+        """Grade label for a single percentage."""
+        return self.labels[self._index(percentage)]
+
+    def grade_point_for(self, percentage):
+        """Grade point for a single percentage (None for scales without points)."""
+        return self.points[self._index(percentage)]
+
+    def is_pass(self, percentage):
+        return float(percentage) >= self.pass_percentage
+
+    def indices_for(self, percentages):
+        """Band index for each value of a percentage array."""
+        indices = np.searchsorted(self._threshold_array, percentages, side='right') - 1
+        return np.clip(indices, 0, len(self.thresholds) - 1)
+
+    def grades_for(self, percentages):
+        """Grade labels for an array of percentages."""
+        return self._label_array[self.indices_for(percentages)]
+
+    def distribution(self, percentages):
+        """Grade histogram for an array of percentages, highest grade first."""
+        counts = np.bincount(self.indices_for(percentages), minlength=len(self.labels))
+        return dict(zip(reversed(self.labels), reversed(counts.tolist())))
+
+
+DEFAULT_SCALE = CompiledScale(PERCENTAGE_BANDS, 35)
+
+
+def calculate_percentage(marks_obtained, max_marks, is_absent=False):
+    """Percentage of max marks, rounded to two places (0 for absent)."""
+    if is_absent or marks_obtained is None or not max_marks:
+        return Decimal('0.00')
+    percentage = Decimal(marks_obtained) / Decimal(max_marks) * 100
+    return percentage.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def get_exam_scale(exam):
+    """
+    Resolve the compiled grading scale for an exam.
+    Uses the exam's own scale, then the school default, then the built-in bands.
+    """
+    scales = GradingScale.objects.prefetch_related('bands')
+    if exam.grading_scale_id:
+        scale = scales.filter(pk=exam.grading_scale_id).first()
+    else:
+        scale = scales.filter(school_id=exam.school_id, is_default=True).first()
+
+    if scale and scale.bands.all():
+        return scale.compile()
+    return DEFAULT_SCALE
+
+
+def create_scale_from_preset(school, scale_type, name=None, is_default=False):
+    """Create a school grading scale from one of the built-in presets."""
+    preset = PRESETS[scale_type]
+    scale = GradingScale.objects.create(
+        school=school,
+        name=name or preset['name'],
+        scale_type=scale_type,
+        pass_percentage=preset['pass_percentage'],
+        is_default=is_default
+    )
+    scale.bands.bulk_create([
+        scale.bands.model(scale=scale, min_percentage=min_pct, label=label, grade_point=point)
+        for min_pct, label, point in preset['bands']
+    ])
+    return scale
+
+
+def regrade_results(queryset, scale):
+    """
+    Recompute stored percentage and grade for a queryset of results.
+    Reads raw values once, grades the batch with numpy and writes back in bulk.
+    """
+    rows = list(queryset.values_list(
+        'id', 'marks_obtained', 'is_absent', 'exam_subject__max_marks'
+    ))
+    if not rows:
+        return 0
+
+    results = [
+        ExamResult(id=result_id, percentage=calculate_percentage(marks, max_marks, is_absent))
+        for result_id, marks, is_absent, max_marks in rows
+    ]
+    grades = scale.grades_for(np.array([float(r.percentage) for r in results]))
+    for result, grade in zip(results, grades):
+        result.grade = grade
+
+    ExamResult.objects.bulk_update(results, ['percentage', 'grade'], batch_size=REGRADE_BATCH_SIZE)
+    return len(results)
+
+
+def regrade_exam(exam, scale=None):
+    """Recompute stored grades for every result of an exam."""
+    from .analytics import bump_results_version
+
+    count = regrade_results(
+        ExamResult.objects.filter(exam_subject__exam=exam),
+        scale or get_exam_scale(exam)
+    )
+    bump_results_version(exam.id)
+    return count
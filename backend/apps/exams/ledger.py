@@ -0,0 +1,147 @@
+"""
+Exam marks ledger (tabulation sheet).
+
+Pivots ExamResult rows into a students x subjects matrix with totals,
+percentage, grade and class rank. Rows come from a single ordered queryset
+iterated in chunks and are yielded one student at a time; class ranks are
+computed by the database and read from a second queryset in the same
+order, so the export does not hold the exam's results or ranks in memory.
+
+A student with results under two classes of the exam (e.g. after a
+mid-term promotion) gets one row per class, ranked within each class.
+"""
+from itertools import groupby
+
+from django.db.models import F, FloatField, Q, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, Length, NullIf, Rank, Round
+
+from .grading import calculate_percentage, get_exam_scale
+from .models import ExamResult, ExamSubject
+
+
+LEDGER_CHUNK_SIZE = 2000
+
+ROW_FIELDS = (
+    'student_id',
+    'exam_subject__school_class_id',
+    'exam_subject__school_class__name',
+    'student__current_section__name',
+    'student__roll_number',
+    'student__admission_number',
+    'student__user__first_name',
+    'student__user__last_name',
+    'exam_subject__subject_id',
+    'marks_obtained',
+    'is_absent',
+    'exam_subject__max_marks',
+)
+
+LEDGER_ORDERING = (
+    'exam_subject__school_class__numeric_value',
+    'exam_subject__school_class_id',
+    'student__current_section__name',
+    # Roll numbers are numeric strings: order by length first so 10 sorts after 9
+    Length('student__roll_number'),
+    'student__roll_number',
+    'student_id',
+)
+
+
+def get_ledger_subjects(exam, class_id=None):
+    """Ordered (subject_id, subject_name) columns for the ledger."""
+    exam_subjects = ExamSubject.objects.filter(exam=exam)
+    if class_id:
+        exam_subjects = exam_subjects.filter(school_class_id=class_id)
+    return list(
+        exam_subjects.order_by('subject__name')
+        .values_list('subject_id', 'subject__name')
+        .distinct()
+    )
+
+
+def get_class_ranks(results):
+    """
+    (student_id, class_id, rank) per student and class, in ledger order.
+    Students are ranked within their class by overall percentage; equal
+    percentages share a rank (1, 2, 2, 4).
+    """
+    # Float rather than decimal arithmetic: SQLite cannot order a window by a decimal cast
+    obtained = Coalesce(Cast(Sum('marks_obtained', filter=Q(is_absent=False)), FloatField()), Value(0.0))
+    maximum = NullIf(Cast(Sum('exam_subject__max_marks'), FloatField()), Value(0.0))
+    return results.order_by().values('student_id', 'exam_subject__school_class_id').annotate(
+        percentage=Round(obtained * 100 / maximum, 2)
+    ).annotate(
+        rank=Window(
+            Rank(),
+            partition_by=[F('exam_subject__school_class_id')],
+            order_by=F('percentage').desc(nulls_last=True)
+        )
+    ).order_by(*LEDGER_ORDERING).values_list('student_id', 'exam_subject__school_class_id', 'rank')
+
+
+def build_exam_ledger(exam, class_id=None):
+    """
+    Build the ledger header and a generator of rows for an exam.
+
+    Args:
+        exam: Exam instance
+        class_id: Optional class ID to restrict the ledger to
+
+    Returns:
+        (header, rows) where rows is a generator of lists
+    """
+    subjects = get_ledger_subjects(exam, class_id)
+    subject_index = {subject_id: i for i, (subject_id, _) in enumerate(subjects)}
+    scale = get_exam_scale(exam)
+
+    results = ExamResult.objects.filter(exam_subject__exam=exam)
+    if class_id:
+        results = results.filter(exam_subject__school_class_id=class_id)
+
+    header = [
+        'Class', 'Section', 'Roll No.', 'Admission No.', 'Student Name',
+        *[name for _, name in subjects],
+        'Total', 'Max Marks', 'Percentage', 'Grade', 'Result', 'Rank'
+    ]
+
+    ordered = results.order_by(*LEDGER_ORDERING).values_list(*ROW_FIELDS)
+    ranks = get_class_ranks(results)
+
+    def rows():
+        student_rows = groupby(
+            ordered.iterator(chunk_size=LEDGER_CHUNK_SIZE),
+            key=lambda row: (row[0], row[1])
+        )
+        # Both querysets list each (student, class) once, in the same order
+        rank_rows = ranks.iterator(chunk_size=LEDGER_CHUNK_SIZE)
+        for (_, _, rank), (_, student_results) in zip(rank_rows, student_rows):
+            marks = [''] * len(subjects)
+            total = 0
+            maximum = 0
+            for row in student_results:
+                (_, _, class_name, section_name, roll_number, admission_number,
+                 first_name, last_name, subject_id, obtained, is_absent, max_marks) = row
+                maximum += max_marks
+                if is_absent or obtained is None:
+                    marks[subject_index[subject_id]] = 'AB'
+                else:
+                    marks[subject_index[subject_id]] = obtained
+                    total += obtained
+
+            percentage = calculate_percentage(total, maximum)
+            yield [
+                class_name,
+                section_name or '',
+                roll_number or '',
+                admission_number,
+                f'{first_name} {last_name}'.strip(),
+                *marks,
+                total,
+                maximum,
+                percentage,
+                scale.grade_for(percentage),
+                'PASS' if scale.is_pass(percentage) else 'FAIL',
+                rank,
+            ]
+
+    return header, rows()
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:27
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Grade bands in use before grading scales became configurable
+LEGACY_BANDS = [(90, 'A+'), (80, 'A'), (70, 'B+'), (60, 'B'), (50, 'C'), (35, 'D'), (0, 'F')]
+
+
+def backfill_percentage_and_grade(apps, schema_editor):
+    ExamResult = apps.get_model('exams', 'ExamResult')
+    
+    batch = []
+    results = ExamResult.objects.select_related('exam_subject').iterator(chunk_size=2000)
+    for result in results:
+        max_marks = result.exam_subject.max_marks
+        if result.is_absent or result.marks_obtained is None or not max_marks:
+            percentage = Decimal('0.00')
+        else:
+            percentage = (result.marks_obtained / max_marks * 100).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP
+            )
+        result.percentage = percentage
+        result.grade = next(label for threshold, label in LEGACY_BANDS if percentage >= threshold)
+        batch.append(result)
+        
+        if len(batch) >= 2000:
+            ExamResult.objects.bulk_update(batch, ['percentage', 'grade'])
+            batch = []
+    
+    if batch:
+        ExamResult.objects.bulk_update(batch, ['percentage', 'grade'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0002_featuretoggle_notes_enabled_school_account_type'),
+        ('exams', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examresult',
+            name='grade',
+            field=models.CharField(blank=True, max_length=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='examresult',
+            name='percentage',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.CreateModel(
+            name='GradingScale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('scale_type', models.CharField(choices=[('cbse_9_point', 'CBSE 9-Point'), ('percentage', 'Percentage Bands'), ('gpa', 'GPA')], default='percentage', max_length=20)),
+                ('pass_percentage', models.DecimalField(decimal_places=2, default=35, max_digits=5)),
+                ('is_default', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_scales', to='schools.school')),
+            ],
+            options={
+                'db_table': 'grading_scales',
+                'ordering': ['name'],
+                'unique_together': {('school', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='grading_scale',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exams', to='exams.gradingscale'),
+        ),
+        migrations.CreateModel(
+            name='GradeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=5)),
+                ('min_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('grade_point', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('scale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='exams.gradingscale')),
+            ],
+            options={
+                'db_table': 'grade_bands',
+                'ordering': ['-min_percentage'],
+                'unique_together': {('scale', 'min_percentage')},
+            },
+        ),
+        migrations.RunPython(backfill_percentage_and_grade, migrations.RunPython.noop),
+    ]
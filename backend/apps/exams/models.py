@@ -5,6 +5,74 @@ from django.db import models
 from django.conf import settings
 
 
+class GradingScale(models.Model):
+    """Grading scale configured by a school (CBSE 9-point, percentage bands, GPA)."""
+    
+    class ScaleType(models.TextChoices):
+        CBSE_9_POINT = 'cbse_9_point', 'CBSE 9-Point'
+        PERCENTAGE = 'percentage', 'Percentage Bands'
+        GPA = 'gpa', 'GPA'
+    
+    school = models.ForeignKey(
+        'schools.School',
+        on_delete=models.CASCADE,
+        related_name='grading_scales'
+    )
+    name = models.CharField(max_length=100)
+    scale_type = models.CharField(
+        max_length=20,
+        choices=ScaleType.choices,
+        default=ScaleType.PERCENTAGE
+    )
+    pass_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=35)
+    is_default = models.BooleanField(default=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'grading_scales'
+        unique_together = ['school', 'name']
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} - {self.school.name}"
+    
+    def save(self, *args, **kwargs):
+        # Ensure only one default scale per school
+        if self.is_default:
+            GradingScale.objects.filter(school=self.school, is_default=True).exclude(pk=self.pk).update(is_default=False)
+        super().save(*args, **kwargs)
+    
+    def compile(self):
+        """Compile bands into a sorted threshold table for fast lookups."""
+        from .grading import CompiledScale
+        return CompiledScale(
+            [(band.min_percentage, band.label, band.grade_point) for band in self.bands.all()],
+            self.pass_percentage
+        )
+
+
+class GradeBand(models.Model):
+    """A grade and the minimum percentage needed to earn it."""
+    scale = models.ForeignKey(
+        GradingScale,
+        on_delete=models.CASCADE,
+        related_name='bands'
+    )
+    label = models.CharField(max_length=5)
+    min_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    grade_point = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    
+    class Meta:
+        db_table = 'grade_bands'
+        unique_together = ['scale', 'min_percentage']
+        ordering = ['-min_percentage']
+    
+    def __str__(self):
+        return f"{self.label} (>= {self.min_percentage}%)"
+
+
 class Exam(models.Model):
     """Exam definition."""
     
@@ -48,6 +116,15 @@ class Exam(models.Model):
     
     description = models.TextField(blank=True, null=True)
     
+    # Falls back to the school's default scale when not set
+    grading_scale = models.ForeignKey(
+        GradingScale,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='exams'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -107,6 +184,10 @@ class ExamResult(models.Model):
     marks_obtained = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     is_absent = models.BooleanField(default=False)
     
+    # Stored when marks are written so list views don't recompute them per row
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    grade = models.CharField(max_length=5, blank=True, null=True)
+    
     remarks = models.CharField(max_length=200, blank=True, null=True)
     
     entered_by = models.ForeignKey(
@@ -131,30 +212,30 @@ class ExamResult(models.Model):
             return False
         return self.marks_obtained >= self.exam_subject.passing_marks
     
-    @property
-    def percentage(self):
-        if self.is_absent or self.marks_obtained is None:
-            return 0
-        return round((self.marks_obtained / self.exam_subject.max_marks) * 100, 2)
+    def save(self, *args, scale=None, **kwargs):
+        """
+        Keep the stored percentage and grade in step with the marks.
+        Callers saving several results pass the exam's compiled scale so it
+        is not looked up for every row.
+        """
+        if scale is None:
+            from .grading import get_exam_scale
+            if not ExamResult.exam_subject.is_cached(self):
+                self.exam_subject = ExamSubject.objects.select_related('exam').get(pk=self.exam_subject_id)
+            scale = get_exam_scale(self.exam_subject.exam)
+        self.apply_grade(scale)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'percentage', 'grade'}
+        super().save(*args, **kwargs)
     
-    @property
-    def grade(self):
-        """Calculate grade based on percentage."""
-        pct = self.percentage
-        if pct >= 90:
-            return 'A+'
-        elif pct >= 80:
-            return 'A'
-        elif pct >= 70:
-            return 'B+'
-        elif pct >= 60:
-            return 'B'
-        elif pct >= 50:
-            return 'C'
-        elif pct >= 35:
-            return 'D'
-        else:
-            return 'F'
+    def apply_grade(self, scale):
+        """Set percentage and grade from the marks using a compiled grading scale."""
+        from .grading import calculate_percentage
+        self.percentage = calculate_percentage(
+            self.marks_obtained, self.exam_subject.max_marks, self.is_absent
+        )
+        self.grade = scale.grade_for(self.percentage)
 
 
 class ReportCard(models.Model):
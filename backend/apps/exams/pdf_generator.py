@@ -39,6 +39,8 @@ def generate_report_card_pdf(report_card):
     
     # Get exam results
     from .models import ExamResult
+    from .grading import get_exam_scale
+    scale = get_exam_scale(exam)
     results = ExamResult.objects.filter(
         exam_subject__exam=exam,
         student=student
@@ -195,10 +197,10 @@ def generate_report_card_pdf(report_card):
     content.append(Spacer(1, 0.3*inch))
     
     # Summary Section
-    overall_grade = get_overall_grade(percentage)
+    overall_grade = get_overall_grade(percentage, scale)
     summary_data = [
         ['Overall Percentage:', f'{percentage}%', 'Overall Grade:', overall_grade],
-        ['Rank in Class:', str(report_card.rank) if report_card.rank else 'N/A', 'Result:', 'PASS' if percentage >= 35 else 'FAIL'],
+        ['Rank in Class:', str(report_card.rank) if report_card.rank else 'N/A', 'Result:', 'PASS' if scale.is_pass(percentage) else 'FAIL'],
     ]
     
     summary_table = Table(summary_data, colWidths=[3.5*cm, 4*cm, 3.5*cm, 4*cm])
@@ -262,19 +264,7 @@ def generate_report_card_pdf(report_card):
     return buffer
 
 
-def get_overall_grade(percentage):
+def get_overall_grade(percentage, scale=None):
     """Calculate overall grade based on percentage."""
-    if percentage >= 90:
-        return 'A+'
-    elif percentage >= 80:
-        return 'A'
-    elif percentage >= 70:
-        return 'B+'
-    elif percentage >= 60:
-        return 'B'
-    elif percentage >= 50:
-        return 'C'
-    elif percentage >= 35:
-        return 'D'
-    else:
-        return 'F'
+    from .grading import DEFAULT_SCALE
+    return (scale or DEFAULT_SCALE).grade_for(percentage)
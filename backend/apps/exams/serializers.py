@@ -1,8 +1,65 @@
 """
 Serializers for Exam Management.
 """
+from collections import Counter
+
+from django.db import transaction
 from rest_framework import serializers
-from .models import Exam, ExamSubject, ExamResult, ReportCard
+from .models import Exam, ExamSubject, ExamResult, ReportCard, GradingScale, GradeBand
+
+
+class GradeBandSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GradeBand
+        fields = ['id', 'label', 'min_percentage', 'grade_point']
+        read_only_fields = ['id']
+    
+    def validate_min_percentage(self, value):
+        if not 0 <= value <= 100:
+            raise serializers.ValidationError('Minimum percentage must be between 0 and 100.')
+        return value
+
+
+class GradingScaleSerializer(serializers.ModelSerializer):
+    scale_type_display = serializers.CharField(source='get_scale_type_display', read_only=True)
+    bands = GradeBandSerializer(many=True)
+    
+    class Meta:
+        model = GradingScale
+        fields = [
+            'id', 'name', 'scale_type', 'scale_type_display',
+            'pass_percentage', 'is_default', 'bands',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_bands(self, value):
+        if not value:
+            raise serializers.ValidationError('At least one grade band is required.')
+        thresholds = [band['min_percentage'] for band in value]
+        if len(set(thresholds)) != len(thresholds):
+            raise serializers.ValidationError('Each band must have a different minimum percentage.')
+        if min(thresholds) != 0:
+            raise serializers.ValidationError('The lowest band must start at 0%.')
+        return value
+    
+    @transaction.atomic
+    def create(self, validated_data):
+        bands = validated_data.pop('bands')
+        scale = GradingScale.objects.create(**validated_data)
+        GradeBand.objects.bulk_create([GradeBand(scale=scale, **band) for band in bands])
+        return scale
+    
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        bands = validated_data.pop('bands', None)
+        instance = super().update(instance, validated_data)
+        if bands is not None:
+            instance.bands.all().delete()
+            GradeBand.objects.bulk_create([GradeBand(scale=instance, **band) for band in bands])
+            # Drop bands prefetched by the viewset so compile() sees the new ones
+            getattr(instance, '_prefetched_objects_cache', {}).pop('bands', None)
+        return instance
 
 
 class ExamSubjectSerializer(serializers.ModelSerializer):
@@ -28,7 +85,7 @@ class ExamSerializer(serializers.ModelSerializer):
         model = Exam
         fields = [
             'id', 'name', 'exam_type', 'exam_type_display',
-            'academic_year', 'academic_year_name',
+            'academic_year', 'academic_year_name', 'grading_scale',
             'classes', 'class_names', 'start_date', 'end_date',
             'is_published', 'published_at', 'description',
             'exam_subjects', 'created_at', 'updated_at'
@@ -38,15 +95,27 @@ class ExamSerializer(serializers.ModelSerializer):
     def get_class_names(self, obj):
         return [c.name for c in obj.classes.all()]
 
+    def validate_grading_scale(self, value):
+        request = self.context.get('request')
+        if value and request and value.school_id != request.user.school_id:
+            raise serializers.ValidationError('Grading scale not found.')
+        return value
+
 
 class ExamCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exam
         fields = [
             'name', 'exam_type', 'academic_year', 'classes',
-            'start_date', 'end_date', 'description'
+            'start_date', 'end_date', 'description', 'grading_scale'
         ]
 
+    def validate_grading_scale(self, value):
+        request = self.context.get('request')
+        if value and request and value.school_id != request.user.school_id:
+            raise serializers.ValidationError('Grading scale not found.')
+        return value
+
 
 class ExamResultSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.full_name', read_only=True)
@@ -76,12 +145,39 @@ class ExamResultSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'entered_by', 'entered_at', 'updated_at']
 
 
+class MarksEntrySerializer(serializers.Serializer):
+    """A single row of a bulk marks sheet."""
+    student_id = serializers.IntegerField()
+    marks_obtained = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=0,
+        required=False, allow_null=True
+    )
+    is_absent = serializers.BooleanField(required=False, default=False)
+    remarks = serializers.CharField(
+        max_length=200, required=False, allow_blank=True, allow_null=True, default=''
+    )
+    
+    def validate(self, data):
+        if not data['is_absent'] and data.get('marks_obtained') is None:
+            raise serializers.ValidationError(
+                {'marks_obtained': 'Marks are required unless the student is absent.'}
+            )
+        return data
+
+
 class BulkMarksEntrySerializer(serializers.Serializer):
     """Serializer for entering marks for multiple students."""
     exam_subject = serializers.IntegerField()
-    results = serializers.ListField(
-        child=serializers.DictField()
-    )
+    results = MarksEntrySerializer(many=True, allow_empty=False)
+    
+    def validate_results(self, value):
+        counts = Counter(row['student_id'] for row in value)
+        duplicates = sorted(sid for sid, count in counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(
+                f"Duplicate student IDs in marks sheet: {', '.join(map(str, duplicates))}"
+            )
+        return value
     # Expected format:
     # {
     #   "exam_subject": 1,
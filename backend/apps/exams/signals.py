@@ -0,0 +1,24 @@
+"""
+Django signals for the exams app.
+Keeps the per-exam results version current so cached analytics are invalidated.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .analytics import bump_results_version
+
+
+@receiver(post_save, sender='exams.ExamResult')
+def handle_exam_result_saved(sender, instance, **kwargs):
+    """
+    Invalidate analytics when a single result is written.
+    Bulk writes and deletes bump the version explicitly in the views.
+    """
+    bump_results_version(instance.exam_subject.exam_id)
+
+
+@receiver(post_save, sender='exams.ExamSubject')
+@receiver(post_delete, sender='exams.ExamSubject')
+def handle_exam_subject_change(sender, instance, **kwargs):
+    """Invalidate analytics when max or passing marks change."""
+    bump_results_version(instance.exam_id)
@@ -0,0 +1,520 @@
+"""
+Tests for exam marks entry and results.
+"""
+import csv
+import io
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.academic.models import AcademicYear, Class, Section, Subject, Student
+from apps.schools.models import School
+from apps.exams.models import Exam, ExamSubject, ExamResult, ReportCard, GradingScale
+from apps.exams.grading import create_scale_from_preset
+
+User = get_user_model()
+
+
+class ExamFixtureMixin:
+    """Shared fixtures: a school with one exam subject and a class roster."""
+
+    bulk_url = '/api/exams/results/bulk_entry/'
+
+    def setUp(self):
+        """Set up a school with one exam subject and a class roster."""
+        cache.clear()
+        self.school = School.objects.create(name='Test School', code='TST001')
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='AdminPass123!',
+            first_name='Admin',
+            last_name='User',
+            role='school_admin',
+            school=self.school
+        )
+        self.year = AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+            is_current=True
+        )
+        self.school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.other_class = Class.objects.create(school=self.school, name='Class 6', numeric_value=6)
+        self.section = Section.objects.create(school_class=self.school_class, name='A')
+        self.subject = Subject.objects.create(school=self.school, name='Mathematics')
+
+        self.exam = Exam.objects.create(
+            school=self.school, academic_year=self.year, name='Unit Test 1',
+            start_date=date(2024, 7, 1), end_date=date(2024, 7, 5)
+        )
+        self.exam.classes.add(self.school_class)
+        self.exam_subject = ExamSubject.objects.create(
+            exam=self.exam, subject=self.subject, school_class=self.school_class,
+            max_marks=50, passing_marks=18
+        )
+
+        self.students = [self._create_student(i, self.school_class) for i in range(3)]
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def _create_student(self, index, school_class, section=None):
+        user = User.objects.create_user(
+            email=f'student{school_class.id}_{index}@test.com',
+            password='StudentPass123!',
+            first_name=f'Student{index}',
+            last_name='Test',
+            role='student',
+            school=self.school
+        )
+        return Student.objects.create(
+            user=user,
+            school=self.school,
+            admission_number=f'ADM-{school_class.id}-{index}',
+            current_class=school_class,
+            current_section=section
+        )
+
+    def _sheet(self, students, marks=40):
+        return {
+            'exam_subject': self.exam_subject.id,
+            'results': [
+                {'student_id': s.id, 'marks_obtained': marks} for s in students
+            ]
+        }
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkMarksEntryTests(ExamFixtureMixin, TestCase):
+    """Test cases for set-based bulk marks entry."""
+
+    def test_bulk_entry_creates_then_updates(self):
+        """Test first submission creates rows and resubmission updates them."""
+        response = self.client.post(self.bulk_url, self._sheet(self.students), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['updated'], 0)
+
+        response = self.client.post(self.bulk_url, self._sheet(self.students, marks=45), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(
+            set(ExamResult.objects.values_list('marks_obtained', flat=True)),
+            {45}
+        )
+
+    def test_bulk_entry_rejects_student_outside_class(self):
+        """Test that students from another class invalidate the whole sheet."""
+        outsider = self._create_student(0, self.other_class)
+        response = self.client.post(
+            self.bulk_url, self._sheet(self.students + [outsider]), format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['student_id'], outsider.id)
+        self.assertFalse(ExamResult.objects.exists())
+
+    def test_bulk_entry_rejects_marks_above_maximum(self):
+        """Test that marks above max_marks are rejected before writing."""
+        response = self.client.post(self.bulk_url, self._sheet(self.students, marks=51), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data['errors']), 3)
+        self.assertFalse(ExamResult.objects.exists())
+
+    def test_bulk_entry_absent_clears_marks(self):
+        """Test that absent students are stored without marks."""
+        sheet = {
+            'exam_subject': self.exam_subject.id,
+            'results': [{'student_id': self.students[0].id, 'is_absent': True}]
+        }
+        response = self.client.post(self.bulk_url, sheet, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = ExamResult.objects.get(student=self.students[0])
+        self.assertTrue(result.is_absent)
+        self.assertIsNone(result.marks_obtained)
+
+    def test_bulk_entry_query_count_is_constant(self):
+        """Test that a larger sheet does not issue more queries."""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.bulk_url, self._sheet(self.students), format='json')
+
+        more_students = self.students + [
+            self._create_student(i, self.school_class) for i in range(3, 30)
+        ]
+        ExamResult.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.bulk_url, self._sheet(more_students), format='json')
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StudentExamResultsTests(TestCase):
+    """Test cases for the student results view."""
+
+    results_url = '/api/exams/student/results/'
+
+    def setUp(self):
+        """Set up a student with results in several published exams."""
+        self.school = School.objects.create(name='Test School', code='TST002')
+        self.year = AcademicYear.objects.create(
+            school=self.school, name='2024-25',
+            start_date=date(2024, 4, 1), end_date=date(2025, 3, 31)
+        )
+        self.school_class = Class.objects.create(school=self.school, name='Class 5', numeric_value=5)
+        self.subjects = [
+            Subject.objects.create(school=self.school, name=name)
+            for name in ('English', 'Mathematics', 'Science')
+        ]
+        self.user = User.objects.create_user(
+            email='student@test.com',
+            password='StudentPass123!',
+            first_name='Student',
+            last_name='Test',
+            role='student',
+            school=self.school
+        )
+        self.student = Student.objects.create(
+            user=self.user, school=self.school, admission_number='ADM-1',
+            current_class=self.school_class
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _publish_exam(self, index):
+        exam = Exam.objects.create(
+            school=self.school, academic_year=self.year, name=f'Unit Test {index}',
+            start_date=date(2024, 7, index), end_date=date(2024, 7, index),
+            is_published=True, published_at=timezone.now()
+        )
+        for subject in self.subjects:
+            exam_subject = ExamSubject.objects.create(
+                exam=exam, subject=subject, school_class=self.school_class
+            )
+            ExamResult.objects.create(
+                exam_subject=exam_subject, student=self.student, marks_obtained=80
+            )
+        return ReportCard.objects.create(
+            exam=exam, student=self.student, total_marks=300,
+            obtained_marks=240, percentage=80, grade='A', rank=1
+        )
+
+    def test_results_are_read_from_report_cards(self):
+        """Test that totals come from the report card with nested results."""
+        report_card = self._publish_exam(1)
+        response = self.client.get(self.results_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        exam_data = response.data['results'][0]
+        self.assertEqual(exam_data['report_card_id'], report_card.id)
+        self.assertEqual(exam_data['grade'], 'A')
+        self.assertEqual(len(exam_data['results']), 3)
+
+    def test_exams_without_report_card_are_listed(self):
+        """Test that an exam without a report card gets totals from its results."""
+        report_card = self._publish_exam(1)
+        report_card.delete()
+        response = self.client.get(self.results_url)
+
+        exam_data = response.data['results'][0]
+        self.assertIsNone(exam_data['report_card_id'])
+        self.assertIsNone(exam_data['grade'])
+        self.assertEqual(exam_data['total_marks'], 300)
+        self.assertEqual(exam_data['obtained_marks'], 240)
+        self.assertEqual(exam_data['percentage'], 80)
+        self.assertEqual(len(exam_data['results']), 3)
+
+    def test_next_page_lists_older_exams(self):
+        """Test that following next reaches every exam past the first page."""
+        for index in range(1, 13):
+            self._publish_exam(index)
+
+        first = self.client.get(self.results_url).data
+        second = self.client.get(first['next']).data
+
+        names = [exam['exam_name'] for exam in first['results'] + second['results']]
+        self.assertEqual(names, [f'Unit Test {index}' for index in range(12, 0, -1)])
+        self.assertIsNone(second['next'])
+
+    def test_query_count_does_not_grow_with_exams(self):
+        """Test that more exams do not add queries."""
+        self._publish_exam(1)
+        with CaptureQueriesContext(connection) as one_exam:
+            self.client.get(self.results_url)
+
+        for index in range(2, 6):
+            self._publish_exam(index)
+        with CaptureQueriesContext(connection) as many_exams:
+            response = self.client.get(self.results_url)
+
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(one_exam.captured_queries), len(many_exams.captured_queries))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExamAnalyticsTests(ExamFixtureMixin, TestCase):
+    """Test cases for the exam analytics action."""
+
+    def _analytics_url(self):
+        return f'/api/exams/exams/{self.exam.id}/analytics/'
+
+    def test_analytics_statistics(self):
+        """Test distribution figures computed from entered marks."""
+        sheet = {
+            'exam_subject': self.exam_subject.id,
+            'results': [
+                {'student_id': self.students[0].id, 'marks_obtained': 50},
+                {'student_id': self.students[1].id, 'marks_obtained': 25},
+                {'student_id': self.students[2].id, 'is_absent': True},
+            ]
+        }
+        self.client.post(self.bulk_url, sheet, format='json')
+
+        response = self.client.get(self._analytics_url())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        overall = response.data['overall']
+        self.assertEqual(overall['count'], 3)
+        self.assertEqual(overall['mean'], 50.0)
+        self.assertEqual(overall['median'], 50.0)
+        self.assertEqual(overall['grade_distribution']['A+'], 1)
+        self.assertEqual(overall['grade_distribution']['F'], 1)
+        self.assertEqual(overall['top_performers'][0]['student_id'], self.students[0].id)
+        subject = response.data['subjects'][0]
+        self.assertEqual(subject['absent_count'], 1)
+        self.assertAlmostEqual(subject['pass_rate'], 66.67)
+
+    def test_analytics_cache_invalidated_on_marks_change(self):
+        """Test that new marks bump the results version."""
+        self.client.post(self.bulk_url, self._sheet(self.students, marks=40), format='json')
+        first = self.client.get(self._analytics_url()).data
+
+        with CaptureQueriesContext(connection) as cached:
+            self.assertEqual(self.client.get(self._analytics_url()).data, first)
+
+        self.client.post(self.bulk_url, self._sheet(self.students, marks=20), format='json')
+        second = self.client.get(self._analytics_url()).data
+
+        self.assertNotEqual(first['version'], second['version'])
+        self.assertEqual(second['overall']['mean'], 40.0)
+        self.assertFalse(any('exam_results' in q['sql'] for q in cached.captured_queries))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class GradingScaleTests(ExamFixtureMixin, TestCase):
+    """Test cases for configurable grading scales."""
+
+    def test_compiled_scale_lookups_agree(self):
+        """Test bisect and vectorised lookups return the same grades."""
+        scale = create_scale_from_preset(self.school, GradingScale.ScaleType.CBSE_9_POINT).compile()
+        percentages = [0, 20, 21, 32.99, 33, 40.5, 90.99, 91, 100]
+
+        self.assertEqual(
+            [scale.grade_for(p) for p in percentages],
+            list(scale.grades_for(percentages))
+        )
+        self.assertEqual(scale.grade_for(91), 'A1')
+        self.assertEqual(scale.grade_for(90.99), 'A2')
+        self.assertEqual(scale.grade_point_for(91), 10)
+
+    def test_bulk_entry_stores_percentage_and_grade(self):
+        """Test that marks entry stores grades from the school's default scale."""
+        create_scale_from_preset(self.school, GradingScale.ScaleType.CBSE_9_POINT, is_default=True)
+        self.client.post(self.bulk_url, self._sheet(self.students[:1], marks=46), format='json')
+
+        result = ExamResult.objects.get(student=self.students[0])
+        self.assertEqual(result.percentage, 92)
+        self.assertEqual(result.grade, 'A1')
+
+    def test_save_uses_a_given_scale(self):
+        """Test that saving with a compiled scale grades the result without looking it up."""
+        scale = create_scale_from_preset(self.school, GradingScale.ScaleType.CBSE_9_POINT).compile()
+        result = ExamResult(exam_subject=self.exam_subject, student=self.students[0], marks_obtained=46)
+
+        with self.assertNumQueries(1):
+            result.save(scale=scale)
+        self.assertEqual(result.grade, 'A1')
+
+        result = ExamResult.objects.get(pk=result.pk)
+        result.marks_obtained = 20
+        with self.assertNumQueries(3):  # Exam subject with exam, default scale, update
+            result.save(update_fields=['marks_obtained'])
+        self.assertEqual(ExamResult.objects.get(pk=result.pk).percentage, 40)
+
+    def test_changing_default_scale_regrades_unpublished_exams(self):
+        """Test that editing the default scale re-grades stored results."""
+        self.client.post(self.bulk_url, self._sheet(self.students[:1], marks=46), format='json')
+        self.assertEqual(ExamResult.objects.get().grade, 'A+')
+
+        response = self.client.post('/api/exams/grading-scales/create_from_preset/', {
+            'scale_type': 'gpa', 'is_default': True
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ExamResult.objects.get().grade, 'A')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExamLedgerTests(ExamFixtureMixin, TestCase):
+    """Test cases for the streaming marks ledger export."""
+
+    def setUp(self):
+        super().setUp()
+        science = Subject.objects.create(school=self.school, name='Science')
+        self.science_subject = ExamSubject.objects.create(
+            exam=self.exam, subject=science, school_class=self.school_class,
+            max_marks=50, passing_marks=18
+        )
+        self.client.post(self.bulk_url, {
+            'exam_subject': self.exam_subject.id,
+            'results': [
+                {'student_id': self.students[0].id, 'marks_obtained': 40},
+                {'student_id': self.students[1].id, 'marks_obtained': 45},
+                {'student_id': self.students[2].id, 'is_absent': True},
+            ]
+        }, format='json')
+        self.client.post(self.bulk_url, {
+            'exam_subject': self.science_subject.id,
+            'results': [
+                {'student_id': self.students[0].id, 'marks_obtained': 45},
+                {'student_id': self.students[1].id, 'marks_obtained': 40},
+                {'student_id': self.students[2].id, 'marks_obtained': 10},
+            ]
+        }, format='json')
+
+    def _ledger_url(self):
+        return f'/api/exams/exams/{self.exam.id}/ledger/'
+
+    def test_csv_ledger_pivots_marks_and_ranks(self):
+        """Test one row per student with subject columns, totals and shared ranks."""
+        response = self.client.get(self._ledger_url())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content).decode()
+        header, *rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(header[5:7], ['Mathematics', 'Science'])
+        self.assertEqual(len(rows), 3)
+
+        by_admission = {row[3]: dict(zip(header, row)) for row in rows}
+        first = by_admission[self.students[0].admission_number]
+        absent = by_admission[self.students[2].admission_number]
+        self.assertEqual(first['Total'], '85.00')
+        self.assertEqual(first['Percentage'], '85.00')
+        self.assertEqual(first['Rank'], '1')
+        self.assertEqual(by_admission[self.students[1].admission_number]['Rank'], '1')
+        self.assertEqual(absent['Mathematics'], 'AB')
+        self.assertEqual(absent['Result'], 'FAIL')
+        self.assertEqual(absent['Rank'], '3')
+
+    def test_xlsx_ledger(self):
+        """Test the ledger as a workbook download."""
+        from openpyxl import load_workbook
+
+        response = self.client.get(self._ledger_url(), {'file_type': 'xlsx'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][5:7], ('Mathematics', 'Science'))
+        self.assertEqual(len(rows), 4)
+
+    def test_student_in_two_classes_ranked_per_class(self):
+        """Test one row per class for a student with results under two classes."""
+        self.exam.classes.add(self.other_class)
+        other_subject = ExamSubject.objects.create(
+            exam=self.exam, subject=self.subject, school_class=self.other_class,
+            max_marks=50, passing_marks=18
+        )
+        ExamResult.objects.create(exam_subject=other_subject, student=self.students[2], marks_obtained=30)
+
+        response = self.client.get(self._ledger_url())
+
+        content = b''.join(response.streaming_content).decode()
+        header, *rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(len(rows), 4)
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([row['Class'] for row in rows], ['Class 5'] * 3 + ['Class 6'])
+        self.assertEqual(rows[2]['Rank'], '3')
+        self.assertEqual(rows[3]['Admission No.'], self.students[2].admission_number)
+        self.assertEqual(rows[3]['Total'], '30.00')
+        self.assertEqual(rows[3]['Rank'], '1')
+
+    def test_invalid_file_type(self):
+        """Test that unknown export types are rejected."""
+        response = self.client.get(self._ledger_url(), {'file_type': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']
+)
+class ExamResultPaginationTests(ExamFixtureMixin, TestCase):
+    """Test cases for opt-in keyset pagination and countless pages."""
+
+    results_url = '/api/exams/results/'
+
+    def setUp(self):
+        super().setUp()
+        self.students += [self._create_student(i, self.school_class) for i in range(3, 25)]
+        self.client.post(self.bulk_url, self._sheet(self.students), format='json')
+        self.result_ids = sorted(ExamResult.objects.values_list('id', flat=True), reverse=True)
+
+    def _get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = [q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql']]
+        return response.data, counts
+
+    def test_cursor_pages_walk_every_result_without_count(self):
+        """Test that cursor pages cover every row once, newest first, with no COUNT."""
+        data, counts = self._get(self.results_url, {'pagination': 'cursor', 'page_size': 10})
+        seen = [row['id'] for row in data['results']]
+        self.assertIsNone(data['previous'])
+        self.assertNotIn('count', data)
+
+        while data['next']:
+            first_of_page = data['results'][0]['id']
+            data, page_counts = self._get(data['next'])
+            counts += page_counts
+            seen += [row['id'] for row in data['results']]
+
+        self.assertEqual(seen, self.result_ids)
+        self.assertEqual(counts, [])
+
+        previous, _ = self._get(data['previous'])
+        self.assertEqual(previous['results'][0]['id'], first_of_page)
+
+    def test_page_numbers_without_count(self):
+        """Test that count=false keeps page numbers but skips the COUNT query."""
+        data, counts = self._get(self.results_url, {'count': 'false', 'page': 2, 'page_size': 10})
+
+        self.assertEqual(counts, [])
+        self.assertNotIn('count', data)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIn('page=3', data['next'])
+        self.assertNotIn('page=', data['previous'])
+
+        last, _ = self._get(data['next'])
+        self.assertEqual(len(last['results']), 5)
+        self.assertIsNone(last['next'])
+
+    def test_default_pagination_is_unchanged(self):
+        """Test that requests without opt-ins still get page numbers and a count."""
+        data, counts = self._get(self.results_url)
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(len(counts), 1)
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected."""
+        response = self.client.get(self.results_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
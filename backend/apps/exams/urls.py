@@ -5,11 +5,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import (
-    ExamViewSet, ExamSubjectViewSet, ExamResultViewSet, ReportCardViewSet,
+    GradingScaleViewSet, ExamViewSet, ExamSubjectViewSet, ExamResultViewSet, ReportCardViewSet,
     StudentExamResultsView, StudentReportCardDownloadView
 )
 
 router = DefaultRouter()
+router.register(r'grading-scales', GradingScaleViewSet, basename='grading-scale')
 router.register(r'exams', ExamViewSet, basename='exam')
 router.register(r'exam-subjects', ExamSubjectViewSet, basename='exam-subject')
 router.register(r'results', ExamResultViewSet, basename='exam-result')
@@ -5,23 +5,110 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import CursorPagination
 from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q, Sum
+from collections import defaultdict
 from decimal import Decimal
 
 from apps.accounts.permissions import (
     IsSchoolAdmin, IsSchoolStaff, IsTeacher, IsStudent,
     ExamsFeatureEnabled
 )
-from apps.academic.models import Student, Class, Section
-from .models import Exam, ExamSubject, ExamResult, ReportCard
+from apps.academic.models import Student, Class, Section, Teacher
+from apps.core.exports import EXPORT_FILE_TYPES, export_response
+from apps.core.pagination import FlexiblePagination
+from .models import Exam, ExamSubject, ExamResult, ReportCard, GradingScale
 from .serializers import (
+    GradingScaleSerializer,
     ExamSerializer, ExamCreateSerializer, ExamSubjectSerializer,
     ExamResultSerializer, BulkMarksEntrySerializer,
     ReportCardSerializer, StudentExamResultSerializer
 )
 from .pdf_generator import generate_report_card_pdf
+from .analytics import get_exam_analytics, compare_exams, bump_results_version
+from .ledger import build_exam_ledger
+from .grading import (
+    PRESETS, get_exam_scale, create_scale_from_preset, regrade_exam, regrade_results
+)
+
+
+class GradingScaleViewSet(viewsets.ModelViewSet):
+    """ViewSet for school grading scales."""
+    serializer_class = GradingScaleSerializer
+    permission_classes = [ExamsFeatureEnabled, IsSchoolAdmin]
+    
+    def get_queryset(self):
+        return GradingScale.objects.filter(
+            school=self.request.user.school
+        ).prefetch_related('bands')
+    
+    def perform_create(self, serializer):
+        serializer.save(school=self.request.user.school)
+        if serializer.instance.is_default:
+            self._regrade_unpublished(serializer.instance)
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        self._regrade_unpublished(serializer.instance)
+    
+    def _regrade_unpublished(self, scale):
+        """Re-grade unpublished exams that use this scale; published grades stay frozen."""
+        exams = Exam.objects.filter(school=scale.school_id, is_published=False)
+        if scale.is_default:
+            exams = exams.filter(Q(grading_scale=scale) | Q(grading_scale__isnull=True))
+        else:
+            exams = exams.filter(grading_scale=scale)
+        
+        compiled = scale.compile()
+        for exam in exams:
+            regrade_exam(exam, compiled)
+    
+    @action(detail=False, methods=['get'])
+    def presets(self, request):
+        """List built-in grading scale presets."""
+        return Response([
+            {
+                'scale_type': scale_type,
+                'name': preset['name'],
+                'pass_percentage': preset['pass_percentage'],
+                'bands': [
+                    {'label': label, 'min_percentage': min_pct, 'grade_point': point}
+                    for min_pct, label, point in preset['bands']
+                ]
+            }
+            for scale_type, preset in PRESETS.items()
+        ])
+    
+    @action(detail=False, methods=['post'])
+    def create_from_preset(self, request):
+        """Create a grading scale from a built-in preset."""
+        scale_type = request.data.get('scale_type')
+        if scale_type not in PRESETS:
+            return Response(
+                {'error': f"scale_type must be one of: {', '.join(PRESETS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        name = request.data.get('name') or PRESETS[scale_type]['name']
+        if GradingScale.objects.filter(school=request.user.school, name=name).exists():
+            return Response(
+                {'error': f'Grading scale "{name}" already exists.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        scale = create_scale_from_preset(
+            request.user.school,
+            scale_type,
+            name=name,
+            is_default=bool(request.data.get('is_default', False))
+        )
+        if scale.is_default:
+            self._regrade_unpublished(scale)
+        
+        return Response(GradingScaleSerializer(scale).data, status=status.HTTP_201_CREATED)
 
 
 class ExamViewSet(viewsets.ModelViewSet):
@@ -41,6 +128,12 @@ class ExamViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(school=self.request.user.school)
     
+    def perform_update(self, serializer):
+        old_scale_id = serializer.instance.grading_scale_id
+        exam = serializer.save()
+        if exam.grading_scale_id != old_scale_id and not exam.is_published:
+            regrade_exam(exam)
+    
     @action(detail=True, methods=['post'])
     def publish(self, request, pk=None):
         """Publish exam results."""
@@ -60,6 +153,8 @@ class ExamViewSet(viewsets.ModelViewSet):
     
     def _generate_report_cards(self, exam):
         """Generate report cards for all students in the exam."""
+        scale = get_exam_scale(exam)
+        
         for school_class in exam.classes.all():
             students = Student.objects.filter(
                 current_class=school_class,
@@ -84,7 +179,7 @@ class ExamViewSet(viewsets.ModelViewSet):
                 
                 percentage = round((total_obtained / total_max * 100), 2) if total_max > 0 else 0
                 
-                grade = self._get_grade(percentage)
+                grade = scale.grade_for(percentage)
                 
                 report_card, _ = ReportCard.objects.update_or_create(
                     exam=exam,
@@ -106,21 +201,57 @@ class ExamViewSet(viewsets.ModelViewSet):
                     exam=exam, student_id=student_id
                 ).update(rank=rank)
     
-    def _get_grade(self, percentage):
-        if percentage >= 90:
-            return 'A+'
-        elif percentage >= 80:
-            return 'A'
-        elif percentage >= 70:
-            return 'B+'
-        elif percentage >= 60:
-            return 'B'
-        elif percentage >= 50:
-            return 'C'
-        elif percentage >= 35:
-            return 'D'
-        else:
-            return 'F'
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """
+        Exam analytics: distributions, percentiles, pass rates, grade
+        histograms, subject difficulty and top/bottom performers.
+        
+        Pass ?compare=<id>,<id> to include headline figures for other exams.
+        """
+        exam = self.get_object()
+        data = get_exam_analytics(exam)
+        
+        compare_ids = request.query_params.get('compare')
+        if compare_ids:
+            try:
+                ids = [int(i) for i in compare_ids.split(',') if i.strip()]
+            except ValueError:
+                return Response(
+                    {'error': 'compare must be a comma-separated list of exam IDs.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            others = Exam.objects.filter(
+                school=request.user.school, id__in=ids
+            ).exclude(id=exam.id)
+            exams = sorted([exam, *others], key=lambda e: e.start_date)
+            data = {**data, 'comparison': compare_exams(exams)}
+        
+        return Response(data)
+    
+    @action(detail=True, methods=['get'])
+    def ledger(self, request, pk=None):
+        """
+        Download the marks ledger (students x subjects) for an exam.
+        
+        Query params: file_type=csv|xlsx (default csv), class=<class_id>
+        """
+        exam = self.get_object()
+        
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORT_FILE_TYPES:
+            return Response(
+                {'error': f'file_type must be one of: {", ".join(EXPORT_FILE_TYPES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        class_id = request.query_params.get('class')
+        if class_id and not Class.objects.filter(id=class_id, school=request.user.school).exists():
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        header, rows = build_exam_ledger(exam, class_id)
+        filename = f"marks_ledger_{exam.name}"
+        return export_response(file_type, header, rows, filename, sheet_title=exam.name)
     
     @action(detail=True, methods=['post'])
     def add_subjects(self, request, pk=None):
@@ -157,11 +288,21 @@ class ExamSubjectViewSet(viewsets.ModelViewSet):
         return ExamSubject.objects.filter(
             exam__school=self.request.user.school
         ).select_related('subject', 'school_class', 'exam')
+    
+    def perform_update(self, serializer):
+        old_max_marks = serializer.instance.max_marks
+        exam_subject = serializer.save()
+        
+        # Stored percentages depend on max marks
+        if exam_subject.max_marks != old_max_marks:
+            regrade_results(exam_subject.results.all(), get_exam_scale(exam_subject.exam))
 
 
 class ExamResultViewSet(viewsets.ModelViewSet):
     """ViewSet for exam results."""
     serializer_class = ExamResultSerializer
+    pagination_class = FlexiblePagination
+    keyset_ordering = ('-id',)
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'bulk_entry']:
@@ -171,7 +312,7 @@ class ExamResultViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = ExamResult.objects.filter(
             exam_subject__exam__school=self.request.user.school
-        ).select_related('student', 'exam_subject', 'exam_subject__subject', 'entered_by')
+        ).select_related('student', 'exam_subject__exam', 'exam_subject__subject', 'entered_by')
         
         exam_id = self.request.query_params.get('exam')
         exam_subject_id = self.request.query_params.get('exam_subject')
@@ -186,9 +327,20 @@ class ExamResultViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def perform_destroy(self, instance):
+        exam_id = instance.exam_subject.exam_id
+        instance.delete()
+        bump_results_version(exam_id)
+    
     @action(detail=False, methods=['post'])
     def bulk_entry(self, request):
-        """Enter marks for multiple students at once."""
+        """
+        Enter marks for multiple students at once.
+        
+        The whole sheet is validated up front (roster membership and
+        max marks) and written with a single upsert, so the number of
+        queries does not grow with the number of students.
+        """
         serializer = BulkMarksEntrySerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
@@ -198,50 +350,90 @@ class ExamResultViewSet(viewsets.ModelViewSet):
         
         # Verify exam subject exists
         try:
-            exam_subject = ExamSubject.objects.get(id=exam_subject_id)
+            exam_subject = ExamSubject.objects.select_related('exam').get(
+                id=exam_subject_id,
+                exam__school=request.user.school
+            )
         except ExamSubject.DoesNotExist:
             return Response({'error': 'Exam subject not found.'}, status=404)
         
         # Check if teacher has permission
         if request.user.role == 'teacher':
-            try:
-                teacher = request.user.teacher_profile
-                if exam_subject.subject not in teacher.subjects.all():
-                    return Response(
-                        {'error': 'You are not assigned to teach this subject.'},
-                        status=403
-                    )
-            except Exception:
-                return Response({'error': 'Teacher profile not found.'}, status=403)
+            is_assigned = Teacher.objects.filter(
+                user=request.user,
+                subjects__id=exam_subject.subject_id
+            ).exists()
+            if not is_assigned:
+                return Response(
+                    {'error': 'You are not assigned to teach this subject.'},
+                    status=403
+                )
         
-        created = 0
-        updated = 0
+        student_ids = [row['student_id'] for row in results_data]
+        
+        # Validate the whole sheet against the class roster in one query
+        roster_ids = set(Student.objects.filter(
+            id__in=student_ids,
+            school=request.user.school,
+            current_class_id=exam_subject.school_class_id
+        ).values_list('id', flat=True))
+        
+        errors = []
+        for row in results_data:
+            student_id = row['student_id']
+            marks = row.get('marks_obtained')
+            if student_id not in roster_ids:
+                errors.append({
+                    'student_id': student_id,
+                    'error': 'Student does not belong to this class.'
+                })
+            elif not row['is_absent'] and marks > exam_subject.max_marks:
+                errors.append({
+                    'student_id': student_id,
+                    'error': f'Marks cannot exceed maximum marks ({exam_subject.max_marks}).'
+                })
+        
+        if errors:
+            return Response(
+                {'error': 'Marks sheet contains invalid rows.', 'errors': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for result_data in results_data:
-            student_id = result_data.get('student_id')
-            marks = result_data.get('marks_obtained')
-            is_absent = result_data.get('is_absent', False)
-            remarks = result_data.get('remarks', '')
-            
-            _, was_created = ExamResult.objects.update_or_create(
-                exam_subject_id=exam_subject_id,
-                student_id=student_id,
-                defaults={
-                    'marks_obtained': None if is_absent else marks,
-                    'is_absent': is_absent,
-                    'remarks': remarks,
-                    'entered_by': request.user
-                }
+        existing_ids = set(ExamResult.objects.filter(
+            exam_subject=exam_subject,
+            student_id__in=student_ids
+        ).values_list('student_id', flat=True))
+        
+        scale = get_exam_scale(exam_subject.exam)
+        results = []
+        for row in results_data:
+            result = ExamResult(
+                exam_subject=exam_subject,
+                student_id=row['student_id'],
+                marks_obtained=None if row['is_absent'] else row['marks_obtained'],
+                is_absent=row['is_absent'],
+                remarks=row.get('remarks') or '',
+                entered_by=request.user
             )
-            
-            if was_created:
-                created += 1
-            else:
-                updated += 1
+            result.apply_grade(scale)
+            results.append(result)
+        
+        with transaction.atomic():
+            ExamResult.objects.bulk_create(
+                results,
+                update_conflicts=True,
+                unique_fields=['exam_subject', 'student'],
+                update_fields=[
+                    'marks_obtained', 'is_absent', 'percentage', 'grade',
+                    'remarks', 'entered_by', 'updated_at'
+                ]
+            )
+        bump_results_version(exam_subject.exam_id)
         
+        updated = len(existing_ids)
         return Response({
             'message': 'Marks entered successfully.',
-            'created': created,
+            'created': len(results) - updated,
             'updated': updated
         })
     
@@ -345,9 +537,23 @@ class ReportCardViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(ReportCardSerializer(report_card).data)
 
 
+class StudentExamResultsPagination(CursorPagination):
+    """Cursor pagination over a student's published exams, newest first."""
+    page_size = 10
+    ordering = ('-published_at', '-id')
+
+
 class StudentExamResultsView(APIView):
-    """View exam results for a student (Student/Parent view)."""
+    """
+    View exam results for a student (Student/Parent view).
+    
+    Lists every published exam the student has results in. Totals, grade and
+    rank come from the ReportCard generated at publish time; an exam without
+    one gets totals summed from its results and no grade or rank. Report
+    cards and subject results for the whole page are fetched in one query each.
+    """
     permission_classes = [ExamsFeatureEnabled, IsStudent]
+    pagination_class = StudentExamResultsPagination
     
     def get(self, request):
         try:
@@ -355,52 +561,57 @@ class StudentExamResultsView(APIView):
         except Exception:
             return Response({'error': 'Student profile not found.'}, status=404)
         
-        # Get published exams with results
-        exams_data = []
-        
         exams = Exam.objects.filter(
+            Exists(ExamResult.objects.filter(student=student, exam_subject__exam=OuterRef('pk'))),
             school=student.school,
             is_published=True
-        ).order_by('-published_at')
+        ).prefetch_related(
+            Prefetch(
+                'report_cards',
+                queryset=ReportCard.objects.filter(student=student),
+                to_attr='student_report_cards'
+            )
+        )
         
-        for exam in exams:
-            results = ExamResult.objects.filter(
-                exam_subject__exam=exam,
-                student=student
-            ).select_related('exam_subject', 'exam_subject__subject')
-            
-            if not results.exists():
-                continue
-            
-            total_max = results.aggregate(
-                total=Sum('exam_subject__max_marks')
-            )['total'] or 0
-            
-            total_obtained = results.aggregate(
-                total=Sum('marks_obtained')
-            )['total'] or 0
-            
-            percentage = round((total_obtained / total_max * 100), 2) if total_max > 0 else 0
-            
-            # Get report card
-            report_card = ReportCard.objects.filter(
-                exam=exam, student=student
-            ).first()
-            
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(exams, request, view=self)
+        
+        # Get subject results for every exam on this page in one query
+        results_by_exam = defaultdict(list)
+        results = ExamResult.objects.filter(
+            student=student,
+            exam_subject__exam_id__in=[exam.id for exam in page]
+        ).select_related('exam_subject', 'exam_subject__subject', 'entered_by')
+        for result in results:
+            result.student = student
+            results_by_exam[result.exam_subject.exam_id].append(result)
+        
+        exams_data = []
+        for exam in page:
+            exam_results = results_by_exam[exam.id]
+            report_card = exam.student_report_cards[0] if exam.student_report_cards else None
+            if report_card:
+                total_marks = report_card.total_marks
+                obtained_marks = report_card.obtained_marks
+                percentage = report_card.percentage
+            else:
+                total_marks = sum(result.exam_subject.max_marks for result in exam_results)
+                obtained_marks = sum(result.marks_obtained or 0 for result in exam_results)
+                percentage = round(obtained_marks / total_marks * 100, 2) if total_marks > 0 else 0
             exams_data.append({
                 'exam_id': exam.id,
                 'exam_name': exam.name,
                 'exam_type': exam.get_exam_type_display(),
-                'total_marks': total_max,
-                'obtained_marks': total_obtained,
+                'total_marks': total_marks,
+                'obtained_marks': obtained_marks,
                 'percentage': percentage,
                 'grade': report_card.grade if report_card else None,
                 'rank': report_card.rank if report_card else None,
-                'results': ExamResultSerializer(results, many=True).data,
+                'results': ExamResultSerializer(exam_results, many=True).data,
                 'report_card_id': report_card.id if report_card else None
             })
         
-        return Response(exams_data)
+        return paginator.get_paginated_response(exams_data)
 
 
 class StudentReportCardDownloadView(APIView):
@@ -15,6 +15,7 @@ from apps.accounts.permissions import (
     FeesFeatureEnabled
 )
 from apps.academic.models import Student, Class
+from apps.core.pagination import FlexiblePagination
 from .models import FeeStructure, FeeRecord, FeePayment
 from .serializers import (
     FeeStructureSerializer, FeeRecordSerializer, FeeRecordCreateSerializer,
@@ -46,6 +47,8 @@ class FeeStructureViewSet(viewsets.ModelViewSet):
 class FeeRecordViewSet(viewsets.ModelViewSet):
     """ViewSet for fee records."""
     permission_classes = [FeesFeatureEnabled]
+    pagination_class = FlexiblePagination
+    keyset_ordering = ('-year', '-month', '-id')
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy', 'generate_bulk']:
@@ -195,6 +198,8 @@ class FeeRecordViewSet(viewsets.ModelViewSet):
 class FeePaymentViewSet(viewsets.ModelViewSet):
     """ViewSet for fee payments (Account Admin)."""
     serializer_class = FeePaymentSerializer
+    pagination_class = FlexiblePagination
+    keyset_ordering = ('-payment_date', '-id')
     
     def get_permissions(self):
         if self.action in ['create', 'record_payment']:
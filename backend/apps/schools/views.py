@@ -10,6 +10,7 @@ from django.utils import timezone
 from django.db.models import Count, Max, Q
 
 from apps.accounts.permissions import IsPlatformAdmin, IsSchoolAdmin, IsSchoolMember
+from apps.core.pagination import FlexiblePagination
 from .models import School, FeatureToggle, ActivityLog, SupportRequest
 from .serializers import (
     SchoolSerializer, SchoolCreateSerializer, SchoolListSerializer,
@@ -219,6 +220,8 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing activity logs (Platform Admin only)."""
     permission_classes = [IsPlatformAdmin]
     serializer_class = ActivityLogSerializer
+    pagination_class = FlexiblePagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         queryset = ActivityLog.objects.all().select_related('school', 'performed_by')
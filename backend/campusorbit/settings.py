@@ -120,13 +120,24 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': config('CLOUDINARY_API_SECRET', default=''),
 }
 
+# Former private location of import files, only read by the migration that
+# moved their rows into the database (academic 0014)
+IMPORT_FILES_ROOT = config('IMPORT_FILES_ROOT', default=str(BASE_DIR / 'private' / 'imports'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Stateless JWT mode serves read requests from a short-lived user/school cache
+# instead of the users table (see apps/accounts/tenant_cache.py). Only enable
+# it with a shared cache (CACHE_URL): deactivating a user or school clears the
+# cache from signals, which otherwise only reach the process that saved it
+JWT_STATELESS_AUTH = config('JWT_STATELESS_AUTH', default=False, cast=bool)
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.StatelessJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'apps.accounts.authentication.SchoolJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -190,6 +201,25 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Cache - shared by the web and worker processes (e.g. the Redis instance used
+# by Celery), so cache invalidation in one process is seen by all of them.
+# Without CACHE_URL each process gets its own in-memory cache, which is only
+# suitable for a single process (development and tests).
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Absent Alert Settings
 ABSENT_ALERT_DELAY_MINUTES = 20
 
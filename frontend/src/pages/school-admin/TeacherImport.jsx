@@ -1,9 +1,10 @@
 import { useState, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import api from '../../services/api'
+import { fetchMoreImportRows, pollImportJob } from '../../services/importJobs'
 import {
     Upload, FileText, Download, AlertCircle, CheckCircle,
-    XCircle, ArrowLeft, Users, Loader2
+    XCircle, ArrowLeft, Users, Loader2, Clock, RefreshCw
 } from 'lucide-react'
 
 export default function TeacherImport() {
@@ -17,6 +18,8 @@ export default function TeacherImport() {
     const [error, setError] = useState('')
     const [preview, setPreview] = useState(null)
     const [importResult, setImportResult] = useState(null)
+    const [pendingJob, setPendingJob] = useState(null)
+    const [loadingRows, setLoadingRows] = useState(false)
 
     const handleDrag = (e) => {
         e.preventDefault()
@@ -48,8 +51,8 @@ export default function TeacherImport() {
         setPreview(null)
         setImportResult(null)
 
-        if (!selectedFile.name.endsWith('.csv')) {
-            setError('Please upload a CSV file')
+        if (!/\.(csv|xlsx)$/i.test(selectedFile.name)) {
+            setError('Please upload a CSV or XLSX file')
             return
         }
 
@@ -72,28 +75,66 @@ export default function TeacherImport() {
         }
     }
 
+    const waitForImport = async (jobId) => {
+        // The import runs in the background; a job still running when polling
+        // stops is shown as pending and can be checked again
+        const job = await pollImportJob(jobId)
+        setPreview(null)
+        setFile(null)
+        if (job.status === 'completed') {
+            setPendingJob(null)
+            setImportResult(job)
+        } else {
+            setPendingJob(job)
+        }
+    }
+
     const handleConfirmImport = async () => {
-        if (!file) return
+        if (!preview?.job_id) return
+
         setImporting(true)
         setError('')
 
         try {
-            const formData = new FormData()
-            formData.append('file', file)
-
-            const response = await api.post('/api/school/teachers/confirm_import/', formData, {
-                headers: { 'Content-Type': 'multipart/form-data' }
+            const response = await api.post('/api/school/teachers/confirm_import/', {
+                job_id: preview.job_id
             })
-            setImportResult(response.data)
-            setPreview(null)
-            setFile(null)
+
+            await waitForImport(response.data.id)
+        } catch (err) {
+            setError(err.response?.data?.error || err.message || 'Import failed')
+        } finally {
+            setImporting(false)
+        }
+    }
+
+    const handleCheckAgain = async () => {
+        setImporting(true)
+        setError('')
+
+        try {
+            await waitForImport(pendingJob.id)
         } catch (err) {
-            setError(err.response?.data?.error || 'Import failed')
+            setPendingJob(null)
+            setError(err.response?.data?.error || err.message || 'Import failed')
         } finally {
             setImporting(false)
         }
     }
 
+    const handleLoadMoreInvalid = async () => {
+        setLoadingRows(true)
+
+        try {
+            const rows = await fetchMoreImportRows(preview.job_id, 'invalid', preview.invalid_rows.length)
+            setPreview((current) => ({ ...current, invalid_rows: [...current.invalid_rows, ...rows] }))
+        } catch (err) {
+            setError(err.response?.data?.error || 'Failed to load more records')
+        } finally {
+            setLoadingRows(false)
+        }
+    }
+
     const handleDownloadTemplate = () => {
         window.open('/api/school/teachers/sample_csv/', '_blank')
     }
@@ -102,6 +143,7 @@ export default function TeacherImport() {
         setFile(null)
         setPreview(null)
         setImportResult(null)
+        setPendingJob(null)
         setError('')
     }
 
@@ -120,7 +162,7 @@ export default function TeacherImport() {
                     <div>
                         <h1 className="text-2xl font-bold text-gray-900">Import Teachers</h1>
                         <p className="mt-1 text-sm text-gray-500">
-                            Upload a CSV file to add multiple teachers at once
+                            Upload a CSV or XLSX file to add multiple teachers at once
                         </p>
                     </div>
                     <button onClick={handleDownloadTemplate} className="btn btn-secondary">
@@ -165,6 +207,42 @@ export default function TeacherImport() {
                 </div>
             )}
 
+            {/* Pending Import */}
+            {pendingJob && (
+                <div className="card mb-6 p-6 bg-amber-50 border-amber-200">
+                    <div className="flex items-start gap-4">
+                        <div className="w-12 h-12 rounded-full bg-amber-100 flex items-center justify-center">
+                            <Clock className="w-6 h-6 text-amber-600" />
+                        </div>
+                        <div className="flex-1">
+                            <h3 className="text-lg font-semibold text-amber-800">Still Processing</h3>
+                            <p className="text-amber-700 mt-1">
+                                The import is {pendingJob.status} ({pendingJob.progress}% done) and continues in
+                                the background. Check back later.
+                            </p>
+                            <div className="flex gap-3 mt-6">
+                                <button onClick={handleCheckAgain} className="btn btn-primary" disabled={importing}>
+                                    {importing ? (
+                                        <>
+                                            <Loader2 className="w-5 h-5 animate-spin" />
+                                            Checking...
+                                        </>
+                                    ) : (
+                                        <>
+                                            <RefreshCw className="w-5 h-5" />
+                                            Check Again
+                                        </>
+                                    )}
+                                </button>
+                                <button onClick={resetForm} className="btn btn-secondary">
+                                    Import More
+                                </button>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            )}
+
             {/* Error Message */}
             {error && (
                 <div className="mb-6 p-4 bg-red-50 border border-red-200 rounded-xl flex items-center gap-3">
@@ -174,7 +252,7 @@ export default function TeacherImport() {
             )}
 
             {/* Upload Area */}
-            {!preview && !importResult && (
+            {!preview && !importResult && !pendingJob && (
                 <div className="card">
                     <div className="p-6">
                         <div
@@ -188,7 +266,7 @@ export default function TeacherImport() {
                             <input
                                 ref={fileInputRef}
                                 type="file"
-                                accept=".csv"
+                                accept=".csv,.xlsx"
                                 onChange={handleFileInput}
                                 className="absolute inset-0 w-full h-full opacity-0 cursor-pointer"
                             />
@@ -201,11 +279,11 @@ export default function TeacherImport() {
                             ) : (
                                 <>
                                     <Upload className="w-12 h-12 text-gray-500 mx-auto mb-4" />
-                                    <p className="text-lg font-medium text-gray-900 mb-2">Drop your CSV file here</p>
+                                    <p className="text-lg font-medium text-gray-900 mb-2">Drop your CSV or XLSX file here</p>
                                     <p className="text-sm text-gray-500 mb-4">or click to browse</p>
                                     <button type="button" onClick={() => fileInputRef.current?.click()} className="btn btn-secondary">
                                         <FileText className="w-5 h-5" />
-                                        Select CSV File
+                                        Select File
                                     </button>
                                 </>
                             )}
@@ -296,6 +374,19 @@ export default function TeacherImport() {
                                         ))}
                                     </tbody>
                                 </table>
+                                {preview.invalid_rows.length < preview.invalid_count && (
+                                    <div className="px-6 py-3 bg-gray-50 text-sm text-gray-500 flex items-center justify-center gap-4">
+                                        Showing {preview.invalid_rows.length} of {preview.invalid_count} records
+                                        <button
+                                            onClick={handleLoadMoreInvalid}
+                                            className="btn btn-secondary"
+                                            disabled={loadingRows}
+                                        >
+                                            {loadingRows && <Loader2 className="w-5 h-5 animate-spin" />}
+                                            Load More
+                                        </button>
+                                    </div>
+                                )}
                             </div>
                         </div>
                     )}
@@ -1,12 +1,20 @@
-import { useQuery } from '@tanstack/react-query'
+import { useInfiniteQuery } from '@tanstack/react-query'
 import api from '../../services/api'
 import { Download } from 'lucide-react'
 
+// Results come in cursor pages of the newest exams; next links to older ones
+const cursorOf = (next) => (next ? new URL(next).searchParams.get('cursor') : undefined)
+
 export default function StudentResults() {
-    const { data, isLoading } = useQuery({
+    const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery({
         queryKey: ['student-results'],
-        queryFn: () => api.get('/api/exams/student/results/').then(res => res.data)
+        queryFn: ({ pageParam }) => api.get('/api/exams/student/results/', {
+            params: pageParam ? { cursor: pageParam } : {}
+        }).then(res => res.data),
+        initialPageParam: null,
+        getNextPageParam: (lastPage) => cursorOf(lastPage.next)
     })
+    const exams = data?.pages.flatMap((page) => page.results) ?? []
 
     const handleDownload = async (reportCardId) => {
         window.open(`/api/exams/student/report-card/${reportCardId}/download/`, '_blank')
@@ -18,7 +26,7 @@ export default function StudentResults() {
         <div>
             <div className="page-header"><h1 className="page-title">My Results</h1></div>
 
-            {data?.map((exam) => (
+            {exams.map((exam) => (
                 <div key={exam.exam_id} className="card" style={{ marginBottom: 'var(--space-6)' }}>
                     <div className="card-header flex justify-between items-center">
                         <div>
@@ -61,7 +69,15 @@ export default function StudentResults() {
                 </div>
             ))}
 
-            {!data?.length && <div className="empty-state"><p>No exam results available yet.</p></div>}
+            {hasNextPage && (
+                <div className="text-center">
+                    <button onClick={() => fetchNextPage()} className="btn btn-secondary" disabled={isFetchingNextPage}>
+                        {isFetchingNextPage ? 'Loading...' : 'Load Older Results'}
+                    </button>
+                </div>
+            )}
+
+            {!exams.length && <div className="empty-state"><p>No exam results available yet.</p></div>}
         </div>
     )
 }
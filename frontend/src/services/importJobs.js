@@ -0,0 +1,45 @@
+/**
+ * Background import job helpers shared by the student and teacher import pages.
+ */
+import api from './api'
+
+// Rows per page of a job's stored preview rows (PREVIEW_PAGE_SIZE on the server)
+const IMPORT_ROWS_PAGE_SIZE = 50
+
+const POLL_INTERVAL_MS = 1500
+
+// Stop waiting after this long (e.g. the worker is down); the job keeps its
+// place in the queue and can be checked again later
+const POLL_TIMEOUT_MS = 2 * 60 * 1000
+
+/**
+ * Poll an import job until it completes or fails, for a limited time.
+ * @param {number} jobId - Import job ID
+ * @returns {Promise<object>} The job; still queued or running if polling timed out
+ * @throws {Error} With the job's error message if it failed or expired
+ */
+export async function pollImportJob(jobId, { timeout = POLL_TIMEOUT_MS, interval = POLL_INTERVAL_MS } = {}) {
+    const deadline = Date.now() + timeout
+    while (true) {
+        const { data } = await api.get(`/api/school/import-jobs/${jobId}/`)
+        if (data.status === 'completed') return data
+        if (data.status === 'failed' || data.status === 'expired') {
+            throw new Error(data.error_message || data.message)
+        }
+        if (Date.now() + interval > deadline) return data
+        await new Promise((resolve) => setTimeout(resolve, interval))
+    }
+}
+
+/**
+ * Fetch the next page of a job's stored preview rows.
+ * @param {number} jobId - Import job ID
+ * @param {'valid'|'invalid'} kind - Which rows to fetch
+ * @param {number} loaded - Number of rows already loaded
+ * @returns {Promise<Array>} The rows of the next page
+ */
+export async function fetchMoreImportRows(jobId, kind, loaded) {
+    const page = Math.floor(loaded / IMPORT_ROWS_PAGE_SIZE) + 1
+    const { data } = await api.get(`/api/school/import-jobs/${jobId}/rows/`, { params: { kind, page } })
+    return data.results
+}